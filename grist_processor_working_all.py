@@ -3,18 +3,30 @@ import os
 import sys
 import re
 import json as json_module
+import contextvars
+import itertools
+import threading
+import traceback
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import unicodedata
 import repetable_processor as rp
 from dotenv import load_dotenv
+from dataclasses import dataclass
+from types import SimpleNamespace
 from datetime import datetime, timezone
-from queries import get_demarche, get_dossier, get_demarche_dossiers, dossier_to_flat_data, format_complex_json_for_grist
-from queries_graphql import get_demarche_dossiers_filtered
+from queries import get_demarche, get_dossier, get_dossiers_batch, get_demarche_dossiers, dossier_to_flat_data, format_complex_json_for_grist
+from queries_graphql import DS_DOSSIER_BATCH_SIZE, get_demarche_dossiers_filtered, get_session_with_retries, parse_json_response
 
 
 # Configuration du niveau de log
 LOG_LEVEL = 1  # 0=minimal, 1=normal, 2=verbose
 
+# Types de champs ignorés (purement décoratifs) et types stockés en JSON
+SKIP_CHAMP_TYPES = frozenset({"HeaderSectionChamp", "ExplicationChamp"})
+JSON_FIELD_TYPES = frozenset({"CarteChamp", "AddressChamp", "SiretChamp"})
+
 def log(message, level=1):
     """Fonction de log conditionnelle selon le niveau défini"""
     if level <= LOG_LEVEL:
@@ -34,7 +46,7 @@ try:
     get_demarche_schema, 
     create_columns_from_schema, 
     update_grist_tables_from_schema,
-    get_demarche_schema_enhanced  # NOUVELLE FONCTION OPTIMISÉE
+    get_demarche_schema_cached
 )
     log("Module schema_utils trouvé et chargé avec succès.")
 except ImportError:
@@ -47,7 +59,7 @@ def get_optimized_schema(demarche_number):
     """
     try:
         log("Récupération optimisée du schéma")
-        return get_demarche_schema_enhanced(demarche_number, prefer_robust=True)
+        return get_demarche_schema_cached(demarche_number)
     except Exception as e:
         log_error(f"Erreur version optimisée: {e}")
         log("Fallback vers version classique")
@@ -138,7 +150,7 @@ def filter_record_to_existing_columns(client, table_id, record):
     # Récupérer les colonnes existantes
     try:
         url = f"{client.base_url}/docs/{client.doc_id}/tables/{table_id}/columns"
-        response = requests.get(url, headers=client.headers)
+        response = client.session.get(url, headers=client.headers)
         
         if response.status_code != 200:
             log_error(f"Erreur lors de la récupération des colonnes: {response.status_code}")
@@ -239,7 +251,7 @@ def detect_column_types_from_multiple_dossiers(dossiers_data, problematic_ids=No
         
         for champ in champs:
             # Ignorer les types HeaderSectionChamp et ExplicationChamp
-            if champ["__typename"] in ["HeaderSectionChamp", "ExplicationChamp"]:
+            if champ["__typename"] in SKIP_CHAMP_TYPES:
                 continue
                 
             if champ["__typename"] == "RepetitionChamp":
@@ -249,7 +261,7 @@ def detect_column_types_from_multiple_dossiers(dossiers_data, problematic_ids=No
                     if "champs" in row:
                         for field in row["champs"]:
                             # Ignorer les types HeaderSectionChamp et ExplicationChamp dans les blocs répétables
-                            if field["__typename"] in ["HeaderSectionChamp", "ExplicationChamp"]:
+                            if field["__typename"] in SKIP_CHAMP_TYPES:
                                 continue
                                 
                             if field["__typename"] == "CarteChamp":
@@ -267,7 +279,7 @@ def detect_column_types_from_multiple_dossiers(dossiers_data, problematic_ids=No
         # Collecter les champs
         for champ in flat_data["champs"]:
             # Ignorer les champs de type HeaderSectionChamp et ExplicationChamp
-            if champ["type"] in ["HeaderSectionChamp", "ExplicationChamp"]:
+            if champ["type"] in SKIP_CHAMP_TYPES:
                 continue
 
             # Ignorer les champs dont l'ID est dans la liste des problématiques
@@ -292,7 +304,7 @@ def detect_column_types_from_multiple_dossiers(dossiers_data, problematic_ids=No
         # Collecter les annotations
         for annotation in flat_data["annotations"]:
             # Ignorer les annotations de type HeaderSectionChamp et ExplicationChamp
-            if annotation["type"] in ["HeaderSectionChamp", "ExplicationChamp"]:
+            if annotation["type"] in SKIP_CHAMP_TYPES:
                 continue
                 
             # Enlever le préfixe "annotation_" pour le nom de colonne dans la table des annotations
@@ -340,12 +352,10 @@ def detect_column_types_from_multiple_dossiers(dossiers_data, problematic_ids=No
     # Ne détecter les colonnes des blocs répétables que si nécessaire
     if has_repetable_blocks:
         try:
-            import repetable_processor as rp
             repetable_columns = rp.detect_repetable_columns_from_multiple_dossiers(dossiers_data)
             result["repetable_rows"] = repetable_columns
         except Exception as e:
             log_error(f"Erreur lors de la détection des colonnes des blocs répétables: {str(e)}")
-            import traceback
             traceback.print_exc()
             # Fournir au moins une structure de base en cas d'erreur
             result["repetable_rows"] = [
@@ -362,8 +372,8 @@ def get_problematic_descriptor_ids(demarche_number):
     Récupère les IDs des descripteurs de champs problématiques (HeaderSectionChamp et ExplicationChamp)
     pour une démarche donnée, y compris dans les blocs répétables.
     """
-    from queries_config import API_TOKEN, API_URL
-    import requests
+    from queries_config import get_api_config
+    api_token, api_url = get_api_config()
     
     #  REQUÊTE CORRIGÉE avec exploration des blocs répétables
     query = """
@@ -388,32 +398,33 @@ def get_problematic_descriptor_ids(demarche_number):
     """
     
     headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
-        "Content-Type": "application/json"
+        "Authorization": f"Bearer {api_token}",
     }
     
-    response = requests.post(
-        API_URL,
+    # Session DS partagée : connexions keep-alive, retry sur 429/5xx, compression
+    response = get_session_with_retries().post(
+        api_url,
         json={"query": query, "variables": {"demarcheNumber": int(demarche_number)}},
         headers=headers
     )
     
     response.raise_for_status()
-    result = response.json()
+    result = parse_json_response(response)
     
     problematic_ids = set()
     
     # Vérifier les erreurs
     if "errors" in result:
         log_error(f"GraphQL errors: {', '.join([error.get('message', 'Unknown error') for error in result['errors']])}")
-        return problematic_ids
+        return frozenset(problematic_ids)
     
     #  FONCTION RÉCURSIVE pour explorer tous les descripteurs
     def explore_descriptors(descriptors):
         for descriptor in descriptors:
             # Ajouter si problématique
-            if (descriptor.get("type") in ["header_section", "explication"] or 
-                descriptor.get("__typename") in ["HeaderSectionChampDescriptor", "ExplicationChampDescriptor"]):
+            # Littéraux d'ensemble : compilés en frozenset constants (pas de liste par itération)
+            if (descriptor.get("type") in {"header_section", "explication"} or 
+                descriptor.get("__typename") in {"HeaderSectionChampDescriptor", "ExplicationChampDescriptor"}):
                 problematic_ids.add(descriptor.get("id"))
             
             # Explorer récursivement les blocs répétables
@@ -430,7 +441,7 @@ def get_problematic_descriptor_ids(demarche_number):
         explore_descriptors(descriptors)
     
     log(f"Nombre de descripteurs problématiques identifiés: {len(problematic_ids)}")
-    return problematic_ids
+    return frozenset(problematic_ids)
 
 # ========================================
 # EXTRACTION DES DONNÉES DEMANDEUR
@@ -550,14 +561,80 @@ def format_value_for_grist(value, value_type):
 
     return value
 
+# Taille maximale (en octets JSON) d'un envoi de records vers Grist
+GRIST_MAX_PAYLOAD_BYTES = 64_000
+
+def estimate_record_size(record):
+    """
+    Estimation rapide de la taille JSON d'un record plat, sans le sérialiser :
+    longueur des clés et des valeurs (en caractères) plus les guillemets et séparateurs.
+    Les valeurs imbriquées (rares, les *_json sont déjà des chaînes) sont mesurées via str().
+    """
+    size = 2
+    for key, value in record.items():
+        size += len(key) + 4
+        if isinstance(value, str):
+            size += len(value) + 2
+        elif value is None or isinstance(value, bool):
+            size += 5
+        else:
+            size += len(str(value))
+    return size
+
+def chunk_records_by_size(records, max_bytes=GRIST_MAX_PAYLOAD_BYTES):
+    """
+    Découpe une liste de records en sous-lots dont la taille JSON estimée
+    (voir estimate_record_size) ne dépasse pas max_bytes (un record plus gros
+    que la limite forme son propre lot).
+    """
+    current, size = [], 0
+    for record in records:
+        record_size = estimate_record_size(record)
+        if current and size + record_size > max_bytes:
+            yield current
+            current, size = [], 0
+        current.append(record)
+        size += record_size
+    if current:
+        yield current
+
+@dataclass(slots=True)
+class PreparedDossier:
+    """
+    Records préparés pour un dossier (un par table Grist).
+    Les records restent des dict : leurs colonnes sont dynamiques et c'est
+    le format attendu par l'API Grist.
+    """
+    dossier: dict
+    champ: dict
+    annotation: dict
+    annotations_list: list
+
 class ColumnCache:
     """
     Classe pour mettre en cache les informations sur les colonnes de tables Grist,
     évitant ainsi des requêtes répétées pour obtenir la structure des tables.
+    Invalidation paresseuse : une table est rechargée après une modification de
+    son schéma (invalidate) ou après max_reads lectures de la même entrée.
     """
-    def __init__(self, client):
+    def __init__(self, client, max_reads=1000):
         self.client = client
+        self.max_reads = max_reads
         self.columns_cache = {}  # {table_id: {column_id: column_type}}
+        self._hits = {}  # {table_id: nombre de lectures depuis le chargement}
+        self._lock = threading.RLock()  # upserts des différentes tables envoyés en parallèle
+    
+    def invalidate(self, table_id):
+        """Retire une table du cache (rechargée à la prochaine lecture)."""
+        with self._lock:
+            self.columns_cache.pop(table_id, None)
+            self._hits.pop(table_id, None)
+    
+    def invalidate_tables(self, table_ids):
+        """Invalide uniquement les tables indiquées (pas de vidage global)."""
+        for table_id in table_ids:
+            if table_id:
+                self.invalidate(table_id)
     
     def get_columns(self, table_id, force_refresh=False):
         """
@@ -570,31 +647,40 @@ class ColumnCache:
         Returns:
             set: Ensemble des IDs de colonnes
         """
-        if table_id not in self.columns_cache or force_refresh:
-            log_verbose(f"Récupération des colonnes pour la table {table_id}")
-            url = f"{self.client.base_url}/docs/{self.client.doc_id}/tables/{table_id}/columns"
-            response = requests.get(url, headers=self.client.headers)
+        with self._lock:
+            if table_id in self.columns_cache:
+                hits = self._hits.get(table_id, 0) + 1
+                if self.max_reads and hits > self.max_reads:
+                    self.invalidate(table_id)
+                else:
+                    self._hits[table_id] = hits
+        
+            if table_id not in self.columns_cache or force_refresh:
+                log_verbose(f"Récupération des colonnes pour la table {table_id}")
+                url = f"{self.client.base_url}/docs/{self.client.doc_id}/tables/{table_id}/columns"
+                response = self.client.session.get(url, headers=self.client.headers)
             
-            if response.status_code == 200:
-                columns_data = response.json()
-                column_ids = set()
-                column_types = {}
-                
-                if "columns" in columns_data:
-                    for col in columns_data["columns"]:
-                        col_id = col.get("id")
-                        col_type = col.get("type", "Text")
-                        if col_id:
-                            column_ids.add(col_id)
-                            column_types[col_id] = col_type
-                
-                self.columns_cache[table_id] = {"ids": column_ids, "types": column_types}
-                log_verbose(f"  {len(column_ids)} colonnes en cache pour {table_id}")
-            else:
-                log_error(f"Erreur lors de la récupération des colonnes: {response.status_code}")
-                self.columns_cache[table_id] = {"ids": set(), "types": {}}
+                if response.status_code == 200:
+                    columns_data = response.json()
+                    column_ids = set()
+                    column_types = {}
+                
+                    if "columns" in columns_data:
+                        for col in columns_data["columns"]:
+                            col_id = col.get("id")
+                            col_type = col.get("type", "Text")
+                            if col_id:
+                                column_ids.add(col_id)
+                                column_types[col_id] = col_type
+                
+                    self.columns_cache[table_id] = {"ids": column_ids, "types": column_types}
+                    self._hits[table_id] = 0
+                    log_verbose(f"  {len(column_ids)} colonnes en cache pour {table_id}")
+                else:
+                    log_error(f"Erreur lors de la récupération des colonnes: {response.status_code}")
+                    self.columns_cache[table_id] = {"ids": set(), "types": {}}
         
-        return self.columns_cache[table_id]["ids"]
+            return self.columns_cache[table_id]["ids"]
     
     def get_column_type(self, table_id, column_id):
         """
@@ -607,8 +693,7 @@ class ColumnCache:
         Returns:
             str: Type de la colonne ou "Text" par défaut
         """
-        if table_id not in self.columns_cache:
-            self.get_columns(table_id)
+        self.get_columns(table_id)
         
         return self.columns_cache[table_id]["types"].get(column_id, "Text")
     
@@ -656,7 +741,7 @@ class ColumnCache:
         payload = {"columns": columns_to_add}
         
         log(f"  Ajout de {len(columns_to_add)} colonnes à la table {table_id}")
-        response = requests.post(url, headers=self.client.headers, json=payload)
+        response = self.client.session.post(url, headers=self.client.headers, json=payload)
         
         if response.status_code == 200:
             log(f"  {len(columns_to_add)} colonnes ajoutées avec succès à la table {table_id}")
@@ -675,9 +760,16 @@ class ColumnCache:
 import concurrent.futures
 import time
 
+# Options de récupération des dossiers pour la synchronisation : l'historique des
+# traitements n'est écrit dans aucune table, il n'est donc pas demandé à l'API. (Avec
+# DS_QUERY_CACHE_DOSSIERS=true, des options identiques partout permettent en plus de
+# reprendre du cache les dossiers échantillons de l'analyse du schéma.)
+DS_DOSSIER_FETCH_OPTIONS = {"include_traitements": False}
+
 def fetch_dossiers_in_parallel(dossier_numbers, max_workers=2, timeout=120):
     """
-    Récupère plusieurs dossiers en parallèle.
+    Récupère plusieurs dossiers en parallèle, par requêtes groupées (get_dossiers_batch) :
+    chaque worker traite un lot de dossiers au lieu d'un dossier par requête.
     """
     results = {}
     errors = []
@@ -685,7 +777,7 @@ def fetch_dossiers_in_parallel(dossier_numbers, max_workers=2, timeout=120):
     def fetch_dossier(dossier_number):
         try:
             start_time = time.time()
-            dossier_data = get_dossier(dossier_number)
+            dossier_data = get_dossier(dossier_number, **DS_DOSSIER_FETCH_OPTIONS)
             elapsed = time.time() - start_time
             log_verbose(f"Dossier {dossier_number} récupéré en {elapsed:.2f}s")
             return dossier_number, dossier_data
@@ -693,25 +785,44 @@ def fetch_dossiers_in_parallel(dossier_numbers, max_workers=2, timeout=120):
             log_error(f"Erreur lors de la récupération du dossier {dossier_number}: {str(e)}")
             return dossier_number, None
     
+    def fetch_chunk(chunk):
+        try:
+            start_time = time.time()
+            chunk_data = get_dossiers_batch(chunk, batch_size=len(chunk), **DS_DOSSIER_FETCH_OPTIONS)
+            elapsed = time.time() - start_time
+            log_verbose(f"{len(chunk_data)}/{len(chunk)} dossiers récupérés en {elapsed:.2f}s")
+            return chunk_data
+        except Exception as e:
+            # Lot en échec : reprise dossier par dossier pour ne perdre que les dossiers fautifs
+            log_error(f"Erreur lors de la récupération groupée de {len(chunk)} dossiers: {str(e)}")
+            return dict(fetch_dossier(dossier_number) for dossier_number in chunk)
+    
     log(f"Récupération en parallèle de {len(dossier_numbers)} dossiers avec {max_workers} workers...")
     
+    # Lots répartis entre les workers, sans dépasser DS_DOSSIER_BATCH_SIZE dossiers par requête
+    chunk_size = max(1, min(DS_DOSSIER_BATCH_SIZE, -(-len(dossier_numbers) // max_workers)))
+    chunks = [dossier_numbers[i:i + chunk_size] for i in range(0, len(dossier_numbers), chunk_size)]
+    
+    # Chaque tâche s'exécute dans une copie du contexte appelant (token DS de la démarche)
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_dossier = {
-            executor.submit(fetch_dossier, dossier_num): dossier_num 
-            for dossier_num in dossier_numbers
+        future_to_chunk = {
+            executor.submit(contextvars.copy_context().run, fetch_chunk, chunk): chunk
+            for chunk in chunks
         }
         
-        for future in concurrent.futures.as_completed(future_to_dossier, timeout=timeout):
-            dossier_num = future_to_dossier[future]
+        for future in concurrent.futures.as_completed(future_to_chunk, timeout=timeout):
+            chunk = future_to_chunk[future]
             try:
-                dossier_num, dossier_data = future.result()
+                chunk_data = future.result()
+            except Exception as e:
+                log_error(f"Exception pour le lot de dossiers {chunk[0]}-{chunk[-1]}: {str(e)}")
+                chunk_data = {}
+            for dossier_num in chunk:
+                dossier_data = chunk_data.get(dossier_num)
                 if dossier_data:
                     results[dossier_num] = dossier_data
                 else:
                     errors.append(dossier_num)
-            except Exception as e:
-                log_error(f"Exception pour le dossier {dossier_num}: {str(e)}")
-                errors.append(dossier_num)
     
     success_rate = len(results) / len(dossier_numbers) * 100 if dossier_numbers else 0
     log(f"Récupération parallèle terminée: {len(results)}/{len(dossier_numbers)} dossiers récupérés ({success_rate:.1f}%)")
@@ -725,7 +836,8 @@ def fetch_dossiers_in_parallel(dossier_numbers, max_workers=2, timeout=120):
 # Fonction pour récupérer les labels d'un dossier spécifique
 def get_dossier_labels(dossier_number):
     """Récupère uniquement les labels d'un dossier spécifique"""
-    from queries_config import API_TOKEN, API_URL
+    from queries_config import get_api_config
+    api_token, api_url = get_api_config()
     
     query = """
     query GetDossierLabels($dossierNumber: Int!) {
@@ -744,12 +856,12 @@ def get_dossier_labels(dossier_number):
     variables = {"dossierNumber": int(dossier_number)}
     
     headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
-        "Content-Type": "application/json"
+        "Authorization": f"Bearer {api_token}",
     }
     
-    response = requests.post(
-        API_URL,
+    # Appelé pour chaque dossier : la session DS partagée évite une poignée de main TLS par appel
+    response = get_session_with_retries().post(
+        api_url,
         json={"query": query, "variables": variables},
         headers=headers
     )
@@ -758,7 +870,7 @@ def get_dossier_labels(dossier_number):
         log_error(f"Erreur HTTP lors de la récupération des labels: {response.status_code}")
         return None
     
-    result = response.json()
+    result = parse_json_response(response)
     
     if "errors" in result:
         log_error(f"Erreurs GraphQL lors de la récupération des labels")
@@ -817,14 +929,14 @@ def add_missing_columns_to_table(client, table_id, missing_columns, column_types
         for col in columns_to_add:
             log_verbose(f"  - Ajout de la colonne '{col['id']}' (type: {col['type']})")
             
-        response = requests.post(url, headers=client.headers, json=payload)
+        response = client.session.post(url, headers=client.headers, json=payload)
         
         if response.status_code == 200:
             log(f"  {len(columns_to_add)} colonnes ajoutées avec succès à la table {table_id}")
             
             # Vérifier que les colonnes ont bien été ajoutées
             verify_url = f"{client.base_url}/docs/{client.doc_id}/tables/{table_id}/columns"
-            verify_response = requests.get(verify_url, headers=client.headers)
+            verify_response = client.session.get(verify_url, headers=client.headers)
             
             if verify_response.status_code == 200:
                 columns_data = verify_response.json()
@@ -852,7 +964,6 @@ def add_missing_columns_to_table(client, table_id, missing_columns, column_types
             
     except Exception as e:
         log_error(f"  Erreur lors de l'ajout des colonnes: {str(e)}")
-        import traceback
         traceback.print_exc()
         return False, column_mapping
 
@@ -878,7 +989,7 @@ def add_id_columns_based_on_annotations(client, table_id, annotations):
     if columns_to_add:
         # Vérifier les colonnes existantes pour éviter des doublons
         url = f"{client.base_url}/docs/{client.doc_id}/tables/{table_id}/columns"
-        response = requests.get(url, headers=client.headers)
+        response = client.session.get(url, headers=client.headers)
         
         if response.status_code == 200:
             columns_data = response.json()
@@ -894,7 +1005,7 @@ def add_id_columns_based_on_annotations(client, table_id, annotations):
         if columns_to_add:
             url = f"{client.base_url}/docs/{client.doc_id}/tables/{table_id}/columns"
             payload = {"columns": columns_to_add}
-            response = requests.post(url, headers=client.headers, json=payload)
+            response = client.session.post(url, headers=client.headers, json=payload)
            
             if response.status_code != 200:
                 log_error(f"Erreur lors de l'ajout des colonnes d'ID: {response.text}")
@@ -905,8 +1016,34 @@ def add_id_columns_based_on_annotations(client, table_id, annotations):
 
 
 # Classe pour gérer les opérations avec l'API Grist
+def create_grist_session(pool_maxsize=32):
+    """
+    Crée une session HTTP (keep-alive) avec un pool élargi : les upserts
+    parallèles et les sous-lots réutilisent les mêmes connexions.
+    Pas de retry sur POST (création non idempotente).
+    """
+    session = requests.Session()
+    retry_strategy = Retry(
+        total=3,
+        backoff_factor=0.2,
+        status_forcelist=[429, 502, 503, 504],
+        allowed_methods=["GET", "PATCH"],
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_maxsize, max_retries=retry_strategy)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# Liste des tables par document Grist, partagée par les clients d'un même document
+# (un client par démarche) : {(base_url, doc_id): (horodatage, tables)}.
+# Tenue à jour par create_table, relue depuis l'API après GRIST_TABLES_CACHE_TTL secondes.
+GRIST_TABLES_CACHE_TTL = float(os.getenv("GRIST_TABLES_CACHE_TTL", "30"))
+_tables_cache = {}
+_tables_cache_lock = threading.Lock()
+
 class GristClient:
-    def __init__(self, base_url, api_key, doc_id=None):
+    def __init__(self, base_url, api_key, doc_id=None, session=None):
         self.base_url = base_url.rstrip('/')  # Enlever le / final s'il y en a un
         self.api_key = api_key
         self.doc_id = doc_id
@@ -914,6 +1051,11 @@ class GristClient:
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
+
+        # Session HTTP unique (keep-alive) : une session fournie par l'appelant
+        # est partagée entre plusieurs clients (un par démarche).
+        self.session = session if session is not None else create_grist_session()
+
         log(f"Initialisation du client Grist avec l'URL de base: {self.base_url}")
 
     def set_doc_id(self, doc_id):
@@ -955,7 +1097,7 @@ class GristClient:
         url = f"{self.base_url}/docs/{self.doc_id}/tables/{table_id}/records"
         log_verbose(f"Récupération des enregistrements existants depuis {url}")
 
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         if response.status_code == 200:
             data = response.json()
             
@@ -1000,7 +1142,7 @@ class GristClient:
             raise ValueError("Document ID is required")
 
         url = f"{self.base_url}/docs/{self.doc_id}/tables/{table_id}/records"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
 
         if response.status_code != 200:
             log_error(f"Erreur get_existing_dossier_dates: {response.status_code}")
@@ -1027,7 +1169,7 @@ class GristClient:
         Retourne un dict ou None si pas encore de sync enregistrée.
         """
         url = f"{self.base_url}/docs/{self.doc_id}/tables/Sync_metadata/records"
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
 
         if response.status_code != 200:
             log_error(f"Erreur get_sync_metadata: {response.status_code}")
@@ -1062,7 +1204,7 @@ class GristClient:
         fields = {"demarche_number": int(demarche_number), **metadata}
 
         # Chercher si une ligne existe déjà pour cette démarche
-        get_response = requests.get(url, headers=self.headers)
+        get_response = self.session.get(url, headers=self.headers)
         existing_id = None
         if get_response.status_code == 200:
             for record in get_response.json().get("records", []):
@@ -1072,10 +1214,10 @@ class GristClient:
 
         if existing_id:
             payload = {"records": [{"id": existing_id, "fields": fields}]}
-            response = requests.patch(url, headers=self.headers, json=payload)
+            response = self.session.patch(url, headers=self.headers, json=payload)
         else:
             payload = {"records": [{"fields": fields}]}
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = self.session.post(url, headers=self.headers, json=payload)
 
         if response.status_code in [200, 201]:
             log(f"  Sync_metadata sauvegardée pour démarche {demarche_number}")
@@ -1129,12 +1271,12 @@ class GristClient:
             record_id = existing_records[dossier_number_str]
             log_verbose(f"Dossier {dossier_number_str} trouvé avec ID {record_id}, mise à jour...")
             update_payload = {"records": [{"id": record_id, "fields": formatted_row["fields"]}]}
-            response = requests.patch(url, headers=self.headers, json=update_payload)
+            response = self.session.patch(url, headers=self.headers, json=update_payload)
         else:
             # Création d'un nouvel enregistrement
             log_verbose(f"Dossier {dossier_number_str} non trouvé, création d'un nouvel enregistrement...")
             create_payload = {"records": [formatted_row]}
-            response = requests.post(url, headers=self.headers, json=create_payload)
+            response = self.session.post(url, headers=self.headers, json=create_payload)
 
         if response.status_code in [200, 201]:
             return True
@@ -1145,7 +1287,7 @@ class GristClient:
     def list_documents(self):
         url = f"{self.base_url}/docs"
         log_verbose(f"GET {url}")
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         if response.status_code != 200:
             log_error(f"Erreur {response.status_code}: {response.text}")
             response.raise_for_status()
@@ -1158,7 +1300,7 @@ class GristClient:
             raise ValueError("Document ID is required")
         url = f"{self.base_url}/docs/{self.doc_id}"
         log_verbose(f"GET {url}")
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         if response.status_code != 200:
             log_error(f"Erreur {response.status_code}: {response.text}")
             response.raise_for_status()
@@ -1166,18 +1308,28 @@ class GristClient:
         data = response.json()
         return data
     
-    def list_tables(self):
+    def list_tables(self, force_refresh=False):
         if not self.doc_id:
             raise ValueError("Document ID is required")
 
+        cache_key = (self.base_url, self.doc_id)
+        if not force_refresh:
+            with _tables_cache_lock:
+                cached = _tables_cache.get(cache_key)
+                if cached and time.time() - cached[0] < GRIST_TABLES_CACHE_TTL:
+                    return {"tables": list(cached[1])}
+
         url = f"{self.base_url}/docs/{self.doc_id}/tables"
         log_verbose(f"GET {url}")
-        response = requests.get(url, headers=self.headers)
+        response = self.session.get(url, headers=self.headers)
         if response.status_code != 200:
             log_error(f"Erreur {response.status_code}: {response.text}")
             response.raise_for_status()
 
         data = response.json()
+        if isinstance(data, dict) and isinstance(data.get('tables'), list):
+            with _tables_cache_lock:
+                _tables_cache[cache_key] = (time.time(), list(data['tables']))
         return data
     
     def create_table(self, table_id, columns):
@@ -1201,12 +1353,18 @@ class GristClient:
             if 'type' not in col or not col['type']:
                 raise ValueError(f"Invalid column id '{col['id']}'. Must start with a letter and contain only letters, numbers, and underscores.")
 
-        response = requests.post(url, headers=self.headers, json=data)
+        response = self.session.post(url, headers=self.headers, json=data)
         if response.status_code != 200:
             log_error(f"Erreur {response.status_code}: {response.text}")
             response.raise_for_status()
 
         result = response.json()
+
+        # Ajouter la table créée à la liste en cache plutôt que de la recharger
+        with _tables_cache_lock:
+            cached = _tables_cache.get((self.base_url, self.doc_id))
+            if cached:
+                cached[1].extend(result.get('tables', []))
         return result
 
     def create_or_clear_grist_tables(self, demarche_number, column_types):
@@ -1337,7 +1495,7 @@ class GristClient:
                     try:
                         url = f"{self.base_url}/docs/{self.doc_id}/tables/{repetable_table_id}/columns"
                         add_columns_payload = {"columns": remaining_columns}
-                        response = requests.post(url, headers=self.headers, json=add_columns_payload)
+                        response = self.session.post(url, headers=self.headers, json=add_columns_payload)
                         
                         if response.status_code != 200:
                             log_error(f"Erreur lors de l'ajout des colonnes: {response.text}")
@@ -1345,14 +1503,13 @@ class GristClient:
                             log("Colonnes ajoutées avec succès")
                     except Exception as e:
                         log_error(f"Erreur lors de l'ajout des colonnes: {str(e)}")
-                        import traceback
                         traceback.print_exc()
                         
             elif has_repetable_blocks and repetable_table and repetable_table_id and "repetable_rows" in column_types:
                 # La table existe déjà, vérifier que toutes les colonnes sont présentes
                 try:
                     url = f"{self.base_url}/docs/{self.doc_id}/tables/{repetable_table_id}/columns"
-                    response = requests.get(url, headers=self.headers)
+                    response = self.session.get(url, headers=self.headers)
                     
                     if response.status_code == 200:
                         columns_data = response.json()
@@ -1393,7 +1550,7 @@ class GristClient:
                             log(f"Ajout de {len(missing_columns)} colonnes manquantes à la table des blocs répétables...")
                             add_columns_url = f"{self.base_url}/docs/{self.doc_id}/tables/{repetable_table_id}/columns"
                             add_columns_payload = {"columns": missing_columns}
-                            add_response = requests.post(add_columns_url, headers=self.headers, json=add_columns_payload)
+                            add_response = self.session.post(add_columns_url, headers=self.headers, json=add_columns_payload)
                             
                             if add_response.status_code != 200:
                                 log_error(f"Erreur lors de l'ajout des colonnes: {add_response.text}")
@@ -1403,7 +1560,6 @@ class GristClient:
                         log_error(f"Erreur lors de la récupération des colonnes: {response.text}")
                 except Exception as e:
                     log_error(f"Erreur lors de la vérification des colonnes: {str(e)}")
-                    import traceback
                     traceback.print_exc()
 
             # Retourner les IDs des tables
@@ -1416,13 +1572,34 @@ class GristClient:
 
         except Exception as e:
             log_error(f"Erreur lors de la gestion des tables Grist: {e}")
-            import traceback
             traceback.print_exc()
             raise
 
     # 2. Ensuite, modifiez la méthode upsert_multiple_dossiers_in_grist de la classe GristClient
 
-    def upsert_multiple_dossiers_in_grist(self, table_id, dossiers_list, existing_records=None):
+    def get_table_column_ids(self, table_id):
+        """
+        Retourne l'ensemble des IDs de colonnes d'une table (ensemble vide en cas d'erreur :
+        aucun filtrage des colonnes n'est alors appliqué).
+        """
+        existing_columns = set()
+        try:
+            url = f"{self.base_url}/docs/{self.doc_id}/tables/{table_id}/columns"
+            response = self.session.get(url, headers=self.headers)
+            
+            if response.status_code == 200:
+                columns_data = response.json()
+                if "columns" in columns_data:
+                    for col in columns_data["columns"]:
+                        existing_columns.add(col.get("id"))
+                
+                log_verbose(f"Colonnes existantes dans la table {table_id}: {len(existing_columns)}")
+        except Exception as e:
+            log_error(f"Erreur lors de la récupération des colonnes: {str(e)}")
+        return existing_columns
+
+    def upsert_multiple_dossiers_in_grist(self, table_id, dossiers_list, existing_records=None,
+                                          existing_columns=None):
         """
         Insère ou met à jour plusieurs dossiers en une seule requête.
         Version corrigée avec gestion appropriée des succès/échecs et cache optionnel.
@@ -1430,33 +1607,22 @@ class GristClient:
         Args:
             table_id: ID de la table Grist
             dossiers_list: Liste des enregistrements à traiter
-            existing_records: Cache optionnel des enregistrements existants (dict)
+            existing_records: Cache optionnel des enregistrements existants (dict, éventuellement vide)
+            existing_columns: Cache optionnel des IDs de colonnes de la table (set)
         """
         if not self.doc_id:
             raise ValueError("Document ID is required")
         
-        # Utiliser le cache si fourni, sinon récupérer
-        if not existing_records:
+        # Utiliser le cache si fourni (même vide : table sans enregistrement), sinon récupérer
+        if existing_records is None:
             existing_records = self.get_existing_dossier_numbers(table_id)
             log_verbose(f"Récupération de {len(existing_records)} enregistrements existants pour traitement par lot")
         else:
             log_verbose(f"Utilisation du cache: {len(existing_records)} enregistrements existants")
         
         # Récupérer les colonnes existantes une seule fois
-        existing_columns = set()
-        try:
-            url = f"{self.base_url}/docs/{self.doc_id}/tables/{table_id}/columns"
-            response = requests.get(url, headers=self.headers)
-            
-            if response.status_code == 200:
-                columns_data = response.json()
-                if "columns" in columns_data:
-                    for col in columns_data["columns"]:
-                        existing_columns.add(col.get("id"))
-                
-                log_verbose(f"Colonnes existantes dans la table {table_id}: {len(existing_columns)}")
-        except Exception as e:
-            log_error(f"Erreur lors de la récupération des colonnes: {str(e)}")
+        if existing_columns is None:
+            existing_columns = self.get_table_column_ids(table_id)
         
         # Préparer les listes pour les opérations de création et de mise à jour
         to_create = []
@@ -1507,7 +1673,7 @@ class GristClient:
             # Mise à jour par lot pour toutes les tables
             update_url = f"{self.base_url}/docs/{self.doc_id}/tables/{table_id}/records"
             update_payload = {"records": normalized_updates}
-            update_response = requests.patch(update_url, headers=self.headers, json=update_payload)
+            update_response = self.session.patch(update_url, headers=self.headers, json=update_payload)
             
             if update_response.status_code in [200, 201]:
                 log(f"Mise à jour par lot: {len(normalized_updates)} enregistrements mis à jour avec succès")
@@ -1520,7 +1686,7 @@ class GristClient:
                 update_success = 0
                 for individual_record in normalized_updates:
                     individual_payload = {"records": [individual_record]}
-                    individual_response = requests.patch(update_url, headers=self.headers, json=individual_payload)
+                    individual_response = self.session.patch(update_url, headers=self.headers, json=individual_payload)
                     
                     if individual_response.status_code in [200, 201]:
                         update_success += 1
@@ -1547,7 +1713,7 @@ class GristClient:
             
             create_url = f"{self.base_url}/docs/{self.doc_id}/tables/{table_id}/records"
             create_payload = {"records": normalized_creations}
-            create_response = requests.post(create_url, headers=self.headers, json=create_payload)
+            create_response = self.session.post(create_url, headers=self.headers, json=create_payload)
             
             if create_response.status_code in [200, 201]:
                 log(f"Création par lot: {len(normalized_creations)} enregistrements créés avec succès")
@@ -1572,7 +1738,28 @@ class GristClient:
             log(f"Résumé upsert table {table_id}: {total_success} succès, {total_errors} échecs")
         
         return success
-    
+
+    def upsert_records_by_size(self, table_id, dossiers_list, existing_records=None, column_cache=None):
+        """
+        Upsert découpé en sous-lots de taille bornée (voir chunk_records_by_size),
+        pour ne pas dépasser la taille maximale d'une requête Grist.
+        Retourne True uniquement si tous les sous-lots ont réussi.
+        Les colonnes (via column_cache si fourni) et les enregistrements existants ne sont
+        lus qu'une fois pour la table, puis partagés par tous les sous-lots.
+        """
+        if existing_records is None:
+            existing_records = self.get_existing_dossier_numbers(table_id)
+        if column_cache is not None:
+            existing_columns = column_cache.get_columns(table_id)
+        else:
+            existing_columns = self.get_table_column_ids(table_id)
+        results = [
+            self.upsert_multiple_dossiers_in_grist(table_id, sub_batch, existing_records=existing_records,
+                                                   existing_columns=existing_columns)
+            for sub_batch in chunk_records_by_size(dossiers_list)
+        ]
+        return bool(results) and all(results)
+
 
 def process_demarche_for_grist(client, demarche_number):
     """
@@ -1625,7 +1812,7 @@ def process_demarche_for_grist(client, demarche_number):
         for i in range(max_sample_dossiers):
             sample_dossier_number = dossiers[i]["number"]
             log(f"Récupération du dossier {sample_dossier_number} pour détecter les types de colonnes... ({i+1}/{max_sample_dossiers})")
-            sample_dossier = get_dossier(sample_dossier_number)
+            sample_dossier = get_dossier(sample_dossier_number, **DS_DOSSIER_FETCH_OPTIONS)
             if sample_dossier:
                 sample_dossier_details.append(sample_dossier)
             else:
@@ -1695,7 +1882,7 @@ def process_demarche_for_grist(client, demarche_number):
                 dossier_number = dossier_brief["number"]
                 try:
                     # Récupérer les données complètes du dossier
-                    dossier_data = get_dossier(dossier_number)
+                    dossier_data = get_dossier(dossier_number, **DS_DOSSIER_FETCH_OPTIONS)
                     
                     # Vérifier si le dictionnaire est vide (dossier inaccessible)
                     if not dossier_data:
@@ -1771,14 +1958,14 @@ def process_demarche_for_grist(client, demarche_number):
                     
                     for champ in flat_data["champs"]:
                         # Ignorer les champs problématiques
-                        if champ["type"] in ["HeaderSectionChamp", "ExplicationChamp"]:
+                        if champ["type"] in SKIP_CHAMP_TYPES:
                             continue
                         
                         champ_label = normalize_column_name(champ["label"])
                         value = champ.get("value", "")
                         
                         # Pour les types complexes, utiliser la représentation JSON
-                        if champ["type"] in ["CarteChamp", "AddressChamp", "SiretChamp"] and champ.get("json_value"):
+                        if champ["type"] in JSON_FIELD_TYPES and champ.get("json_value"):
                             try:
                                 value = json_module.dumps(champ["json_value"], ensure_ascii=False)
                             except (TypeError, ValueError):
@@ -1795,7 +1982,7 @@ def process_demarche_for_grist(client, demarche_number):
                     
                     for annotation in flat_data["annotations"]:
                         # Ignorer les annotations problématiques
-                        if annotation["type"] in ["HeaderSectionChamp", "ExplicationChamp"]:
+                        if annotation["type"] in SKIP_CHAMP_TYPES:
                             continue
                         
                         # Pour la table des annotations, enlever le préfixe "annotation_"
@@ -1808,7 +1995,7 @@ def process_demarche_for_grist(client, demarche_number):
                         value = annotation.get("value", "")
                         
                         # Pour les types complexes, utiliser la représentation JSON
-                        if annotation["type"] in ["CarteChamp", "AddressChamp", "SiretChamp"] and annotation.get("json_value"):
+                        if annotation["type"] in JSON_FIELD_TYPES and annotation.get("json_value"):
                             try:
                                 value = json_module.dumps(annotation["json_value"], ensure_ascii=False)
                             except (TypeError, ValueError):
@@ -1822,7 +2009,6 @@ def process_demarche_for_grist(client, demarche_number):
                     batch_success += 1
                 except Exception as e:
                     log_error(f"Exception lors du traitement du dossier {dossier_number}: {str(e)}")
-                    import traceback
                     traceback.print_exc()
                     batch_errors += 1
             
@@ -1859,9 +2045,9 @@ def process_demarche_for_grist(client, demarche_number):
                     dossier_num = record.get("number") or record.get("dossier_number")
                     if dossier_num:
                         if success:
-                            batch_successful_dossiers.add(str(dossier_num))
+                            batch_successful_dossiers.add(int(dossier_num))
                         else:
-                            batch_failed_dossiers.add(str(dossier_num))
+                            batch_failed_dossiers.add(int(dossier_num))
             
             # 2. Table des champs
             if champ_records:
@@ -1918,9 +2104,8 @@ def process_demarche_for_grist(client, demarche_number):
                         log(f"  Traitement du bloc '{block_label}': {len(rows)} lignes")
                         
                         try:
-                            from repetable_processor import process_repetables_batch
     
-                            success, errors = process_repetables_batch(
+                            success, errors = rp.process_repetables_batch(
                                 client,
                                 dossier_batch_data,  #  Passer les dossiers
                                 {normalized_block: block_table_id},
@@ -1932,7 +2117,6 @@ def process_demarche_for_grist(client, demarche_number):
                             total_errors_rep += errors
                         except Exception as e:
                             log_error(f"  Erreur lors du traitement du bloc '{block_label}': {str(e)}")
-                            import traceback
                             traceback.print_exc()
                             total_errors_rep += len(rows)
                     else:
@@ -1962,7 +2146,6 @@ def process_demarche_for_grist(client, demarche_number):
         
     except Exception as e:
         log_error(f"Erreur lors du traitement de la démarche pour Grist: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
@@ -1981,7 +2164,8 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
         parallel: Utiliser le traitement parallèle si True
         batch_size: Taille des lots pour le traitement par lot
         max_workers: Nombre maximum de workers pour le traitement parallèle
-        api_filters: Filtres optimisés à appliquer côté serveur
+        api_filters: Filtres optimisés à appliquer côté serveur ({} : aucun filtre ;
+            None : filtres historiques lus dans l'environnement)
         
     Returns:
         bool: Succès ou échec global
@@ -1989,13 +2173,20 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
     try:
         start_time = time.time()
         
-        # Initialiser des ensembles pour suivre les dossiers traités
+        # Initialiser des ensembles pour suivre les dossiers traités (numéros entiers)
         successful_dossiers = set()
         failed_dossiers = set()
         
         # Initialiser le cache de colonnes
         column_cache = ColumnCache(client)
         
+        # Lancer la récupération du schéma (API DS) pendant la vérification du document (Grist)
+        schema_future = None
+        if 'get_demarche_schema' in globals() and 'create_columns_from_schema' in globals():
+            schema_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+            schema_future = schema_executor.submit(contextvars.copy_context().run, get_optimized_schema, demarche_number)
+            schema_executor.shutdown(wait=False)
+        
         # Vérifier que le document Grist existe
         try:
             doc_info = client.get_document_info()
@@ -2003,6 +2194,8 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
             log(f"Document Grist trouvé: {doc_name}")
         except Exception as e:
             log_error(f"Erreur lors de la vérification du document Grist: {e}")
+            if schema_future is not None:
+                schema_future.cancel()
             return False
         
         # Méthode avancée: Récupérer le schéma complet de la démarche
@@ -2013,8 +2206,8 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
         # Essayer d'abord la méthode basée sur le schéma
         log(f"Récupération du schéma complet de la démarche {demarche_number}...")
         try:
-            if 'get_demarche_schema' in globals() and 'create_columns_from_schema' in globals():
-                demarche_schema = get_optimized_schema(demarche_number)
+            if schema_future is not None:
+                demarche_schema = schema_future.result()
                 log_schema_improvements(demarche_schema, demarche_number)
                 log(f"Schéma récupéré avec succès pour la démarche: {demarche_schema['title']}")
                 
@@ -2042,7 +2235,6 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                 log("Méthode basée sur le schéma non disponible, utilisation de la méthode alternative...")
         except Exception as e:
             log_error(f"Erreur lors de la récupération du schéma: {str(e)}")
-            import traceback
             traceback.print_exc()
             log("Utilisation de la méthode alternative avec échantillons de dossiers...")
         
@@ -2052,6 +2244,11 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                 log("Mise à jour des tables Grist en préservant les données existantes...")
                 table_result = update_grist_tables_from_schema(client, demarche_number, column_types if schema_method_successful else None, problematic_descriptor_ids)
                 
+                # Les tables mises à jour ont pu changer de colonnes : invalider uniquement celles-ci
+                column_cache.invalidate_tables(
+                    table_result.get(key) for key in ("dossiers", "champs", "annotations", "demandeurs", "instructeurs")
+                )
+                
                 # Convertir le format de retour pour compatibilité
                 table_ids = {
                     "dossier_table_id": table_result.get("dossiers"),
@@ -2095,7 +2292,7 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                     sample_dossier_numbers = [all_dossiers_brief[i]["number"] for i in range(sample_size)]
                     
                     for num in sample_dossier_numbers:
-                        dossier = get_dossier(num)
+                        dossier = get_dossier(num, **DS_DOSSIER_FETCH_OPTIONS)
                         if dossier:
                             sample_dossiers.append(dossier)
                 except Exception as e:
@@ -2159,11 +2356,19 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
         else:
             log(f"[ATTENTION] Récupération classique de tous les dossiers (pas de filtres optimisés)")
             
-            # Récupérer les filtres depuis les variables d'environnement pour compatibilité
-            date_debut_str = os.getenv("DATE_DEPOT_DEBUT", "")
-            date_fin_str = os.getenv("DATE_DEPOT_FIN", "")
-            statuts_filter = os.getenv("STATUTS_DOSSIERS", "").split(",") if os.getenv("STATUTS_DOSSIERS") else []
-            groupes_filter = os.getenv("GROUPES_INSTRUCTEURS", "").split(",") if os.getenv("GROUPES_INSTRUCTEURS") else []
+            # Récupérer les filtres depuis les variables d'environnement pour compatibilité,
+            # uniquement si l'appelant n'a transmis aucun filtre (api_filters=None, exécution
+            # autonome via main()) : os.environ est partagé entre les démarches synchronisées
+            # en parallèle, un dict vide signifie « aucun filtre » pour cette démarche
+            if api_filters is None:
+                date_debut_str = os.getenv("DATE_DEPOT_DEBUT", "")
+                date_fin_str = os.getenv("DATE_DEPOT_FIN", "")
+                statuts_filter = os.getenv("STATUTS_DOSSIERS", "").split(",") if os.getenv("STATUTS_DOSSIERS") else []
+                groupes_filter = os.getenv("GROUPES_INSTRUCTEURS", "").split(",") if os.getenv("GROUPES_INSTRUCTEURS") else []
+            else:
+                date_debut_str = date_fin_str = ""
+                statuts_filter = []
+                groupes_filter = []
             
             # Nettoyer les filtres
             if date_debut_str.strip() == "":
@@ -2268,16 +2473,18 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
             return True
 
 
-        # Organiser les dossiers en lots
-        dossier_batches = []
+        # Organiser les dossiers en lots (numéros uniquement : les dossiers complets
+        # sont récupérés lot par lot, la mémoire reste en O(batch_size))
         batch_count = (total_dossiers + batch_size - 1) // batch_size
-        
-        for i in range(0, total_dossiers, batch_size):
-            batch_dossier_numbers = [filtered_dossiers[j]["number"] for j in range(i, min(i+batch_size, total_dossiers))]
-            dossier_batches.append(batch_dossier_numbers)
+        dossier_numbers = (dossier["number"] for dossier in filtered_dossiers)
+        dossier_batches = list(iter(lambda: list(itertools.islice(dossier_numbers, batch_size)), []))
         
         log(f"Dossiers organisés en {batch_count} lots de {batch_size} maximum")
         
+        # Colonnes de champs rencontrées dans les dossiers mais absentes du schéma
+        unknown_champ_columns = set()
+        unknown_champ_columns_logged = False
+        
         # Fonction pour préparer un seul dossier (DÉFINIE AVANT LA BOUCLE)
         def prepare_single_dossier(dossier_num, dossier_data, column_types, problematic_descriptor_ids):
             """Prépare les records pour un dossier (dossier, champ, annotation)"""
@@ -2325,17 +2532,21 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                     champ_record["champ_id"] = "_".join(champ_ids)
                 
                 for champ in flat_data["champs"]:
-                    if champ.get("type") in ["HeaderSectionChamp", "ExplicationChamp"]:
+                    if champ.get("type") in SKIP_CHAMP_TYPES:
                         continue
                     normalized_label = normalize_column_name(champ["label"])
                     value = champ.get("value", "")
-                    if champ["type"] in ["CarteChamp", "AddressChamp", "SiretChamp"] and champ.get("json_value"):
+                    if champ["type"] in JSON_FIELD_TYPES and champ.get("json_value"):
                         try:
                             value = json_module.dumps(champ["json_value"], ensure_ascii=False)
                         except:
                             value = str(champ["json_value"])
                     
-                    column_type = champ_column_types.get(normalized_label, "Text")
+                    column_type = champ_column_types.get(normalized_label)
+                    if column_type is None:
+                        # Champ absent du schéma actif (souvent issu d'une révision antérieure)
+                        unknown_champ_columns.add(normalized_label)
+                        column_type = "Text"
                     champ_record[normalized_label] = format_value_for_grist(value, column_type)
                 
                 # Préparer annotation_record
@@ -2345,17 +2556,15 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                 for col in column_types["annotations"]
                 }
                 
+                # Un seul passage : collecte des IDs et construction du record
                 annotation_ids = []
                 for annotation in flat_data["annotations"]:
+                    if annotation["type"] in SKIP_CHAMP_TYPES:
+                        continue
+
                     if annotation.get("id"):
                         annotation_ids.append(str(annotation["id"]))
-                if annotation_ids:
-                    annotation_record["annotation_id"] = "_".join(annotation_ids)
-                
-                for annotation in flat_data["annotations"]:
-                    if annotation["type"] in ["HeaderSectionChamp", "ExplicationChamp"]:
-                        continue
-                    
+
                     original_label = annotation["label"]
                     if original_label.startswith("annotation_"):
                         normalized_label = normalize_column_name(original_label[11:])
@@ -2363,7 +2572,7 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                         normalized_label = normalize_column_name(original_label)
                     
                     value = annotation.get("value", "")
-                    if annotation["type"] in ["CarteChamp", "AddressChamp", "SiretChamp"] and annotation.get("json_value"):
+                    if annotation["type"] in JSON_FIELD_TYPES and annotation.get("json_value"):
                         try:
                             value = json_module.dumps(annotation["json_value"], ensure_ascii=False)
                         except:
@@ -2375,13 +2584,16 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                     if "id" in annotation:
                         id_column = f"{normalized_label}_id"
                         annotation_record[id_column] = annotation["id"]
-                
-                return {
-                    "dossier": dossier_record,
-                    "champ": champ_record,
-                    "annotation": annotation_record,
-                    "annotations_list": flat_data["annotations"]
-                }
+
+                if annotation_ids:
+                    annotation_record["annotation_id"] = "_".join(annotation_ids)
+
+                return PreparedDossier(
+                    dossier=dossier_record,
+                    champ=champ_record,
+                    annotation=annotation_record,
+                    annotations_list=flat_data["annotations"]
+                )
             except Exception as e:
                 log_error(f"Erreur préparation dossier {dossier_num}: {str(e)}")
                 return None
@@ -2435,6 +2647,10 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
 
         log(f"Skip dossiers: {len(skip_dossiers)} | champs: {len(skip_champs)} | annotations: {len(skip_annotations)}")
 
+        # La liste des dossiers n'est plus utile (lots et skips construits) : la libérer
+        # avant le traitement des lots plutôt que de la garder jusqu'à la fin de la démarche
+        del all_dossiers, filtered_dossiers
+
         # Synchroniser les instructeurs UNE SEULE FOIS (niveau démarche)
         if table_ids.get("instructeurs"):
             log(f"  Récupération des instructeurs de la démarche {demarche_number}...")
@@ -2447,7 +2663,7 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                 
                 # Récupérer les enregistrements existants
                 url = f"{client.base_url}/docs/{client.doc_id}/tables/{table_ids['instructeurs']}/records"
-                response = requests.get(url, headers=client.headers)
+                response = client.session.get(url, headers=client.headers)
                 
                 existing_records = []
                 if response.status_code == 200:
@@ -2504,7 +2720,7 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                 operations_count = 0
                 
                 if to_delete:
-                    delete_response = requests.post(
+                    delete_response = client.session.post(
                         f"{url}/delete",
                         headers=client.headers,
                         json=to_delete
@@ -2516,7 +2732,7 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                         log_error(f"   Erreur suppression instructeurs: {delete_response.text}")
                 
                 if to_update:
-                    update_response = requests.patch(
+                    update_response = client.session.patch(
                         url,
                         headers=client.headers,
                         json={"records": to_update}
@@ -2529,7 +2745,7 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                 
                 if to_create:
                     create_payload = {"records": [{"fields": r} for r in to_create]}
-                    create_response = requests.post(url, headers=client.headers, json=create_payload)
+                    create_response = client.session.post(url, headers=client.headers, json=create_payload)
                     if create_response.status_code in [200, 201]:
                         log(f"   {len(to_create)} instructeur(s) créé(s)")
                         operations_count += len(to_create)
@@ -2545,118 +2761,72 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                 log("   Aucun instructeur trouvé pour cette démarche")
             log(f"[TIMING] Instructeurs synchronisés en {time.time() - start_cache:.1f}s")
 
-        for batch_idx, batch in enumerate(dossier_batches):
-            log(f"Traitement du lot {batch_idx+1}/{batch_count} ({len(batch)} dossiers)...")
-            batch_start = time.time()
-            
-            # Filtrer les dossiers à fetcher (skip si inchangé sur toutes les tables)
-            batch_to_fetch = [num for num in batch if str(num) not in skip_dossiers]
-            skipped_count = len(batch) - len(batch_to_fetch)
-            if skipped_count:
-                log(f"  {skipped_count} dossier(s) inchangés → fetch DS skippé")
-
-            # Récupérer les dossiers complets
-            if batch_to_fetch:
-                if parallel:
-                    batch_dossiers_dict = fetch_dossiers_in_parallel(batch_to_fetch, max_workers=max_workers)
-                else:
-                    batch_dossiers_dict = {}
-                    for num in batch_to_fetch:
-                        dossier = get_dossier(num)
-                        if dossier:
-                            batch_dossiers_dict[num] = dossier
-                        else:
-                            log_error(f"Dossier {num} inaccessible en raison de restrictions de permission, ignoré")
-            else:
-                batch_dossiers_dict = {}
-            
-            log(f"[TIMING] Récupération API DS: {time.time() - batch_start:.1f}s")
-            
-            if not batch_dossiers_dict:
-                if skipped_count == len(batch):
-                    log(f"  Lot {batch_idx+1} entièrement skippé (tous les dossiers sont à jour)")
-                else:
-                    log_error(f"Aucun dossier n'a pu être récupéré pour le lot {batch_idx+1}")
-                continue
-            
-            # Préparer les dossiers EN PARALLÈLE
-            log("Préparation des records en parallèle...")
-            start_prep = time.time()
-            dossier_records = []
-            champ_records = []
-            annotation_records = []
-            all_annotations_for_columns = []
+        # Conditions stables pour toute la démarche : évaluées une seule fois
+        repetable_block_tables = table_ids.get("repetable_blocks") or {}
+        process_repetables = bool(column_types.get("has_repetable_blocks", False)) and bool(repetable_block_tables)
+        repetable_block_column_types = column_types.get("repetable_blocks", {})
 
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_dossier = {
-                    executor.submit(prepare_single_dossier, num, data, column_types, problematic_descriptor_ids): num 
-                    for num, data in batch_dossiers_dict.items()
-                }
-                
-                for future in concurrent.futures.as_completed(future_to_dossier):
-                    result = future.result()
-                    if result:
-                        dossier_records.append(result["dossier"])
-                        champ_records.append(result["champ"])
-                        annotation_records.append(result["annotation"])
-                        all_annotations_for_columns.extend(result["annotations_list"])
-                    else:
-                        log_error(f"Résultat None pour un dossier")  # ← AJOUTE CE LOG
+        def write_batch(batch_idx, batch_start, dossier_records, champ_records, annotation_records, batch_dossiers_dict):
+            """Écrit dans Grist les records préparés d'un lot (exécuté dans le thread d'écriture)"""
+            nonlocal total_success, total_errors
 
-            log(f"Records préparés: {len(dossier_records)} dossiers, {len(champ_records)} champs, {len(annotation_records)} annotations")  # ← AJOUTE APRÈS LA BOUCLE
-            log(f"[TIMING] Préparation parallèle: {time.time() - start_prep:.1f}s")
-            
-            # Créer les colonnes UNE SEULE FOIS après la préparation
-            if table_ids.get("annotations"):
-                
-                #  DÉDUPLICATION : Ne garder qu'une annotation par label unique
-                unique_annotations = {}
-                for ann in all_annotations_for_columns:
-                    label = ann.get("label")
-                    if label and label not in unique_annotations:
-                        unique_annotations[label] = ann
-                
-                unique_annotations_list = list(unique_annotations.values())
-                
-                add_id_columns_based_on_annotations(
-                    client, 
-                    table_ids.get("annotations"), 
-                    unique_annotations_list  #  Passer la liste dédupliquée
-    )
             # Effectuer les opérations d'upsert par lot
             dossier_records = [r for r in dossier_records if str(r.get("dossier_number") or r.get("number")) not in skip_dossiers]
-            if dossier_records:
-                log(f"  Upsert par lot de {len(dossier_records)} dossiers...")
-                success = client.upsert_multiple_dossiers_in_grist(table_ids["dossier_table_id"], dossier_records, existing_records=cache_dossiers)
-
-                # Mettre à jour les ensembles de dossiers
-                for record in dossier_records:
-                    dossier_num = record.get("number") or record.get("dossier_number")
-                    if dossier_num:
-                        if success:
-                            successful_dossiers.add(str(dossier_num))
-                        else:
-                            failed_dossiers.add(str(dossier_num))
-            
             champ_records = [r for r in champ_records if str(r.get("dossier_number")) not in skip_champs]
-            if champ_records:
-                log(f"  Upsert par lot de {len(champ_records)} enregistrements de champs...")
-                success = client.upsert_multiple_dossiers_in_grist(table_ids["champ_table_id"], champ_records, existing_records=cache_champs)
+            annotation_records = [r for r in annotation_records if str(r.get("dossier_number")) not in skip_annotations]
+            if annotation_records and not table_ids.get("annotations"):
+                log("  Annotations présentes mais pas de table - ignorées")
+                annotation_records = []
+
+            # Les tables dossiers, champs et annotations sont indépendantes :
+            # les trois upserts sont envoyés en parallèle (chacun avec son propre cache)
+            upsert_futures = {}
+            with concurrent.futures.ThreadPoolExecutor(max_workers=3) as upsert_executor:
+                if dossier_records:
+                    log(f"  Upsert par lot de {len(dossier_records)} dossiers...")
+                    upsert_futures["dossier"] = upsert_executor.submit(
+                        client.upsert_records_by_size,
+                        table_ids["dossier_table_id"], dossier_records, existing_records=cache_dossiers,
+                        column_cache=column_cache
+                    )
+                if champ_records:
+                    log(f"  Upsert par lot de {len(champ_records)} enregistrements de champs...")
+                    upsert_futures["champ"] = upsert_executor.submit(
+                        client.upsert_records_by_size,
+                        table_ids["champ_table_id"], champ_records, existing_records=cache_champs,
+                        column_cache=column_cache
+                    )
+                if annotation_records:
+                    log(f"  Upsert par lot de {len(annotation_records)} enregistrements d'annotations...")
+                    upsert_futures["annotation"] = upsert_executor.submit(
+                        client.upsert_records_by_size,
+                        table_ids.get("annotations"), annotation_records, existing_records=cache_annotations,
+                        column_cache=column_cache
+                    )
+
+            if "dossier" in upsert_futures:
+                success = upsert_futures["dossier"].result()
+
+                # Mettre à jour l'ensemble concerné en une seule opération
+                target_dossiers = successful_dossiers if success else failed_dossiers
+                target_dossiers.update(
+                    int(dossier_num)
+                    for dossier_num in (r.get("number") or r.get("dossier_number") for r in dossier_records)
+                    if dossier_num
+                )
+
+            if "champ" in upsert_futures:
+                success = upsert_futures["champ"].result()
                 if success:
                     total_success += len(champ_records)
                 else:
                     total_errors += len(champ_records)
-                    
-                log(f"[TIMING] Après upsert champs: {time.time() - batch_start:.1f}s")
-            
-            annotation_records = [r for r in annotation_records if str(r.get("dossier_number")) not in skip_annotations]
-            if annotation_records and table_ids.get("annotations"):
-                log(f"  Upsert par lot de {len(annotation_records)} enregistrements d'annotations...")
-                success = client.upsert_multiple_dossiers_in_grist(table_ids.get("annotations") , annotation_records, existing_records=cache_annotations)
-                
-                log(f"[TIMING] Après upsert annotations: {time.time() - batch_start:.1f}s")
-            elif annotation_records:
-                log("  Annotations présentes mais pas de table - ignorées")
+
+            if "annotation" in upsert_futures:
+                upsert_futures["annotation"].result()
+
+            if upsert_futures:
+                log(f"[TIMING] Après upserts dossiers/champs/annotations: {time.time() - batch_start:.1f}s")
 
             # Traiter les demandeurs par lot
             if table_ids.get("demandeurs") and table_ids.get("demandeur_type"):
@@ -2676,10 +2846,11 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                 
                 if demandeur_records:
                     log(f"  Upsert par lot de {len(demandeur_records)} demandeurs...")
-                    success = client.upsert_multiple_dossiers_in_grist(
+                    success = client.upsert_records_by_size(
                         table_ids["demandeurs"], 
                         demandeur_records, 
-                        existing_records=cache_demandeurs
+                        existing_records=cache_demandeurs,
+                        column_cache=column_cache
                     )
                     if success:
                         log(f"   {len(demandeur_records)} demandeurs traités avec succès")
@@ -2689,7 +2860,7 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                 log(f"[TIMING] Après upsert demandeurs: {time.time() - batch_start:.1f}s")
             
             # Traiter les blocs répétables si nécessaire (tables séparées par bloc)
-            if column_types.get("has_repetable_blocks", False) and table_ids.get("repetable_blocks"):
+            if process_repetables:
                 # Collecter toutes les lignes répétables
                 all_repetable_rows = []
                 filtered_repetable_dict = {
@@ -2714,17 +2885,16 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                 for block_label, rows in rows_by_block.items():
                     normalized_block = normalize_column_name(block_label)
 
-                    if normalized_block in table_ids.get("repetable_blocks", {}):
-                        block_table_id = table_ids["repetable_blocks"][normalized_block]
+                    if normalized_block in repetable_block_tables:
+                        block_table_id = repetable_block_tables[normalized_block]
                         
                         try:
-                            from repetable_processor import process_repetables_batch
                             # Préparer les données pour le batch
-                            success_count, error_count = process_repetables_batch(
+                            success_count, error_count = rp.process_repetables_batch(
                                 client,
                                 list(batch_dossiers_dict.values()),
                                 {normalized_block: block_table_id},
-                                {normalized_block: column_types["repetable_blocks"][normalized_block]},
+                                {normalized_block: repetable_block_column_types[normalized_block]},
                                 problematic_ids=problematic_descriptor_ids,
                                 batch_size=50
                             )
@@ -2733,6 +2903,105 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
                             log_error(f"  Erreur traitement bloc '{block_label}': {str(e)}")
                             
             log(f"[TIMING] Après blocs répétables: {time.time() - batch_start:.1f}s")
+
+        pending_write = None
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as write_executor:
+            for batch_idx, batch in enumerate(dossier_batches):
+                log(f"Traitement du lot {batch_idx+1}/{batch_count} ({len(batch)} dossiers)...")
+                batch_start = time.time()
+            
+                # Filtrer les dossiers à fetcher (skip si inchangé sur toutes les tables)
+                batch_to_fetch = [num for num in batch if str(num) not in skip_dossiers]
+                skipped_count = len(batch) - len(batch_to_fetch)
+                if skipped_count:
+                    log(f"  {skipped_count} dossier(s) inchangés → fetch DS skippé")
+
+                # Récupérer les dossiers complets
+                if batch_to_fetch:
+                    if parallel:
+                        batch_dossiers_dict = fetch_dossiers_in_parallel(batch_to_fetch, max_workers=max_workers)
+                    else:
+                        batch_dossiers_dict = get_dossiers_batch(batch_to_fetch, **DS_DOSSIER_FETCH_OPTIONS)
+                        for num in batch_to_fetch:
+                            if num not in batch_dossiers_dict:
+                                log_error(f"Dossier {num} inaccessible en raison de restrictions de permission, ignoré")
+                else:
+                    batch_dossiers_dict = {}
+            
+                log(f"[TIMING] Récupération API DS: {time.time() - batch_start:.1f}s")
+            
+                if not batch_dossiers_dict:
+                    if skipped_count == len(batch):
+                        log(f"  Lot {batch_idx+1} entièrement skippé (tous les dossiers sont à jour)")
+                    else:
+                        log_error(f"Aucun dossier n'a pu être récupéré pour le lot {batch_idx+1}")
+                    continue
+            
+                # Préparer les dossiers EN PARALLÈLE
+                log("Préparation des records en parallèle...")
+                start_prep = time.time()
+                dossier_records = []
+                champ_records = []
+                annotation_records = []
+                # Une annotation par label unique, dédupliquée au fil de l'eau
+                # (évite de conserver toutes les annotations de tous les dossiers du lot)
+                unique_annotations = {}
+
+                with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    future_to_dossier = {
+                        executor.submit(contextvars.copy_context().run, prepare_single_dossier, num, data, column_types, problematic_descriptor_ids): num 
+                        for num, data in batch_dossiers_dict.items()
+                    }
+                
+                    for future in concurrent.futures.as_completed(future_to_dossier):
+                        result = future.result()
+                        if result:
+                            dossier_records.append(result.dossier)
+                            champ_records.append(result.champ)
+                            annotation_records.append(result.annotation)
+                            for ann in result.annotations_list:
+                                label = ann.get("label")
+                                if label and label not in unique_annotations:
+                                    unique_annotations[label] = ann
+                        else:
+                            log_error(f"Résultat None pour un dossier")  # ← AJOUTE CE LOG
+
+                log(f"Records préparés: {len(dossier_records)} dossiers, {len(champ_records)} champs, {len(annotation_records)} annotations")  # ← AJOUTE APRÈS LA BOUCLE
+                
+                # Champs absents du schéma : simple signalement, une fois par exécution. Les
+                # dossiers déposés sur une révision antérieure en contiennent toujours, ce
+                # n'est pas un signe de schéma périmé (le TTL du cache s'en charge)
+                if unknown_champ_columns and not unknown_champ_columns_logged:
+                    log(f"Champs absents du schéma actif (révisions antérieures ?): {', '.join(sorted(unknown_champ_columns)[:10])}")
+                    unknown_champ_columns_logged = True
+                log(f"[TIMING] Préparation parallèle: {time.time() - start_prep:.1f}s")
+            
+                # Créer les colonnes UNE SEULE FOIS après la préparation
+                if table_ids.get("annotations"):
+                    unique_annotations_list = list(unique_annotations.values())
+                
+                    added_id_columns = add_id_columns_based_on_annotations(
+                        client, 
+                        table_ids.get("annotations"), 
+                        unique_annotations_list  #  Passer la liste dédupliquée
+                    )
+                    # Nouvelles colonnes <label>_id : relire les colonnes de la table à
+                    # l'upsert suivant, sinon leurs valeurs seraient filtrées
+                    if added_id_columns:
+                        column_cache.invalidate(table_ids.get("annotations"))
+
+                # Écriture du lot en arrière-plan : la préparation du lot suivant se
+                # chevauche avec les upserts Grist de celui-ci. On attend l'écriture du
+                # lot précédent avant de soumettre la suivante (ordre conservé, un seul lot en attente).
+                if pending_write is not None:
+                    pending_write.result()
+                pending_write = write_executor.submit(
+                    contextvars.copy_context().run, write_batch, batch_idx, batch_start,
+                    dossier_records, champ_records, annotation_records, batch_dossiers_dict
+                )
+
+            if pending_write is not None:
+                pending_write.result()
         
         # Calculer les statistiques finales
         elapsed_time = time.time() - start_time
@@ -2769,16 +3038,32 @@ def process_demarche_for_grist_optimized(client, demarche_number, parallel=True,
         
     except Exception as e:
         log_error(f"Erreur lors du traitement de la démarche pour Grist: {e}")
-        import traceback
         traceback.print_exc()
         return False
     
-def main():
+def load_env_config():
+    """
+    Lit la configuration d'exécution depuis l'environnement (.env compris),
+    en une seule fois, et la regroupe dans un objet.
+    """
     load_dotenv()
+    return SimpleNamespace(
+        grist_base_url=os.getenv("GRIST_BASE_URL"),
+        grist_api_key=os.getenv("GRIST_API_KEY"),
+        grist_doc_id=os.getenv("GRIST_DOC_ID"),
+        demarche_number=os.getenv("DEMARCHE_NUMBER"),
+        api_filters_json=os.getenv('API_FILTERS_JSON', '{}'),
+        parallel=os.getenv('PARALLEL', 'true').lower() == 'true',
+        batch_size=int(os.getenv('BATCH_SIZE', '50')),
+        max_workers=int(os.getenv('MAX_WORKERS', '3')),
+    )
 
-    grist_base_url = os.getenv("GRIST_BASE_URL")
-    grist_api_key = os.getenv("GRIST_API_KEY")
-    grist_doc_id = os.getenv("GRIST_DOC_ID")
+def main():
+    cfg = load_env_config()
+
+    grist_base_url = cfg.grist_base_url
+    grist_api_key = cfg.grist_api_key
+    grist_doc_id = cfg.grist_doc_id
 
     if not all([grist_base_url, grist_api_key, grist_doc_id]):
         log_error("Configuration Grist incomplète dans le fichier .env")
@@ -2793,7 +3078,7 @@ def main():
     log(f"  ID du document: {grist_doc_id}")
 
     # Récupérer le numéro de démarche
-    demarche_number = os.getenv("DEMARCHE_NUMBER")
+    demarche_number = cfg.demarche_number
     if not demarche_number:
         log_error("DEMARCHE_NUMBER non défini dans le fichier .env")
         return 1
@@ -2810,27 +3095,22 @@ def main():
     client = GristClient(grist_base_url, grist_api_key, grist_doc_id)
 
     # NOUVEAU : Récupérer les filtres optimisés depuis l'environnement
-    api_filters_json = os.getenv('API_FILTERS_JSON', '{}')
+    api_filters_json = cfg.api_filters_json
     try:
-        api_filters = json_module.loads(api_filters_json)
+        api_filters = json_module.loads(api_filters_json) or None
         if api_filters:
             log(f"[FILTRAGE] Filtres optimisés détectés: {list(api_filters.keys())}")
     except:
-        api_filters = {}
+        api_filters = None
         log("Aucun filtre optimisé détecté, utilisation de l'ancienne méthode")
 
-    # Récupérer les autres paramètres
-    parallel = os.getenv('PARALLEL', 'true').lower() == 'true'
-    batch_size = int(os.getenv('BATCH_SIZE', '50'))
-    max_workers = int(os.getenv('MAX_WORKERS', '3'))
-
     # Traiter la démarche avec la fonction optimisée
     if process_demarche_for_grist_optimized(
         client, 
         demarche_number, 
-        parallel=parallel, 
-        batch_size=batch_size, 
-        max_workers=max_workers,
+        parallel=cfg.parallel, 
+        batch_size=cfg.batch_size, 
+        max_workers=cfg.max_workers,
         api_filters=api_filters  # Passer les filtres optimisés
     ):
         log(f"Traitement de la démarche {demarche_number} terminé avec succès")
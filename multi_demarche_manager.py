@@ -45,12 +45,60 @@ Configuration MOYENNE (à éviter si possible):
 import os
 import json
 import re
+import sys
 import time
-from typing import Dict, List, Any, Optional
+import atexit
+import contextvars
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Any, Optional, Sequence, Tuple
 from dataclasses import dataclass
-from dotenv import load_dotenv
 
-@dataclass
+# Les modules de synchronisation (schema_utils, queries_graphql, grist_processor_working_all)
+# sont importés dans les méthodes qui les utilisent : --help, --validate-only et --dry-run
+# n'en ont pas besoin.
+try:
+    from dotenv import load_dotenv
+except ImportError:
+    load_dotenv = None
+
+# orjson (optionnel) : parsing plus rapide de la configuration et des réponses DS
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _JSON_DECODE_ERRORS = (json.JSONDecodeError, orjson.JSONDecodeError)
+except ImportError:
+    _json_loads = json.loads
+    _JSON_DECODE_ERRORS = (json.JSONDecodeError,)
+
+# Journalisation : les threads de synchronisation déposent les messages dans une file,
+# un seul thread les écrit sur la sortie standard (pas de contention sur stdout).
+logger = logging.getLogger("multi_demarche_manager")
+_log_listener = None
+
+def _start_log_listener() -> None:
+    """Démarre (une seule fois) l'écriture asynchrone des logs du gestionnaire."""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    log_queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(message)s"))
+    _log_listener = QueueListener(log_queue, stream_handler)
+    _log_listener.start()
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    # Vider la file avant la sortie du processus
+    atexit.register(_log_listener.stop)
+
+# Filtres réellement appliqués par l'API GraphQL (les autres sont filtrés côté client)
+_SERVER_FILTER_KEYS = frozenset({'date_debut'})
+
+@dataclass(slots=True)
 class DemarcheConfig:
     """Configuration d'une démarche."""
     number: int
@@ -60,8 +108,21 @@ class DemarcheConfig:
     enabled: bool
     sync_config: Dict[str, Any]
     filters: Dict[str, Any]
+    
+    def __post_init__(self):
+        # Validation unique au chargement : une erreur de configuration est
+        # signalée avant la synchronisation, pas au milieu de celle-ci
+        try:
+            self.number = int(self.number)
+        except (TypeError, ValueError):
+            raise ValueError(f"Numéro de démarche invalide : {self.number!r}")
+        if not isinstance(self.sync_config, dict):
+            raise ValueError(f"sync_config doit être un objet pour la démarche {self.number}")
+        if not isinstance(self.filters, dict):
+            raise ValueError(f"filters doit être un objet pour la démarche {self.number}")
+        self.enabled = bool(self.enabled)
 
-@dataclass
+@dataclass(slots=True)
 class SyncResult:
     """Résultat de synchronisation d'une démarche."""
     demarche_number: int
@@ -84,10 +145,24 @@ class MultiDemarcheManager:
         Args:
             config_file: Chemin vers le fichier de configuration JSON
         """
-        load_dotenv()
+        _start_log_listener()
+        # DGER_SKIP_DOTENV : variables déjà fournies par l'environnement (CI, conteneur)
+        if load_dotenv is not None and not os.getenv('DGER_SKIP_DOTENV'):
+            load_dotenv()
         self.config_file = config_file
         self.config = self._load_config()
+        self._grist_config = None
         self.demarches = self._load_demarches()
+        self._enabled_demarches = tuple(d for d in self.demarches if d.enabled)
+        # Index par numéro : recherche en O(1) pour --demarches et la configuration d'environnement
+        self._by_number = {d.number: d for d in self.demarches}
+        # Nombre de démarches synchronisées simultanément (section "sync" optionnelle)
+        self.max_parallel_demarches = max(1, int(self.config.get('sync', {}).get('max_parallel_demarches', 1)))
+        # Débit maximal de requêtes DS par token API, appliqué à chaque requête (queries_graphql)
+        self.api_rate_per_second = float(self.config.get('sync', {}).get('api_rate_per_second', 5))
+        # Session HTTP Grist partagée par toutes les démarches (créée à la première synchronisation)
+        self._http_session = None
+        self._http_session_lock = threading.Lock()
         
     def _resolve_env_vars(self, text: str) -> str:
         """
@@ -137,8 +212,8 @@ class MultiDemarcheManager:
             dict: Configuration chargée avec variables d'environnement résolues
         """
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                config = json.load(f)
+            with open(self.config_file, 'rb') as f:
+                config = _json_loads(f.read())
             
             # Résoudre les variables d'environnement
             config = self._resolve_dict_env_vars(config)
@@ -153,7 +228,7 @@ class MultiDemarcheManager:
             
         except FileNotFoundError:
             raise FileNotFoundError(f"Fichier de configuration non trouvé : {self.config_file}")
-        except json.JSONDecodeError as e:
+        except _JSON_DECODE_ERRORS as e:
             raise ValueError(f"Erreur de format JSON dans {self.config_file} : {e}")
     
     def _load_demarches(self) -> List[DemarcheConfig]:
@@ -165,34 +240,37 @@ class MultiDemarcheManager:
         """
         demarches = []
         
-        for demarche_data in self.config['demarches']:
+        for index, demarche_data in enumerate(self.config['demarches']):
+            if 'number' not in demarche_data:
+                raise ValueError(f"Démarche n°{index + 1} de la configuration sans 'number'")
+            
             # Vérifier que le token a été résolu
-            api_token = demarche_data.get('api_token', '')
+            api_token = demarche_data.get('api_token') or ''
             if api_token.startswith('${'):
-                print(f"⚠️  Attention: Token non résolu pour la démarche {demarche_data['number']}")
-                print(f"   Variable d'environnement manquante : {api_token}")
+                logger.warning(f"⚠️  Attention: Token non résolu pour la démarche {demarche_data['number']}")
+                logger.info(f"   Variable d'environnement manquante : {api_token}")
                 continue
                 
             demarches.append(DemarcheConfig(
                 number=demarche_data['number'],
-                name=demarche_data['name'],
+                name=demarche_data.get('name') or f"Démarche {demarche_data['number']}",
                 api_token=api_token,
                 api_url=demarche_data.get('api_url', 'https://www.demarches-simplifiees.fr/api/v2/graphql'),
                 enabled=demarche_data.get('enabled', True),
-                sync_config=demarche_data.get('sync_config', {}),
-                filters=demarche_data.get('filters', {})
+                sync_config=demarche_data.get('sync_config') or {},
+                filters=demarche_data.get('filters') or {}
             ))
         
         return demarches
     
-    def get_enabled_demarches(self) -> List[DemarcheConfig]:
+    def get_enabled_demarches(self) -> Tuple[DemarcheConfig, ...]:
         """
-        Retourne la liste des démarches activées.
+        Retourne les démarches activées (filtrées une seule fois au chargement).
         
         Returns:
-            list: Liste des démarches activées
+            tuple: Démarches activées
         """
-        return [d for d in self.demarches if d.enabled]
+        return self._enabled_demarches
     
     def get_demarche_config(self, demarche_number: int) -> Optional[DemarcheConfig]:
         """
@@ -204,10 +282,7 @@ class MultiDemarcheManager:
         Returns:
             DemarcheConfig ou None si non trouvé
         """
-        for demarche in self.demarches:
-            if demarche.number == demarche_number:
-                return demarche
-        return None
+        return self._by_number.get(demarche_number)
     
     def get_grist_config(self) -> Dict[str, str]:
         """
@@ -216,14 +291,18 @@ class MultiDemarcheManager:
         Returns:
             dict: Configuration Grist
         """
-        grist_config = self.config['grist'].copy()
-        
-        # Vérifier que les variables ont été résolues
-        for key, value in grist_config.items():
-            if isinstance(value, str) and value.startswith('${'):
-                print(f"⚠️  Attention: Variable Grist non résolue : {key} = {value}")
+        # Vérification faite une seule fois : la configuration est figée après le chargement
+        if self._grist_config is None:
+            grist_config = self.config['grist'].copy()
+            
+            # Vérifier que les variables ont été résolues
+            for key, value in grist_config.items():
+                if isinstance(value, str) and value.startswith('${'):
+                    logger.warning(f"⚠️  Attention: Variable Grist non résolue : {key} = {value}")
+            
+            self._grist_config = grist_config
         
-        return grist_config
+        return self._grist_config.copy()
     
     def _prepare_filters_for_api(self, filters: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -246,12 +325,12 @@ class MultiDemarcheManager:
         # Date de début - SEUL FILTRE CÔTÉ SERVEUR qui fonctionne
         if filters.get('date_depot_debut'):
             api_filters['date_debut'] = filters['date_depot_debut']
-            print(f"🔍 Filtre côté serveur: date_debut = {filters['date_depot_debut']}")
+            logger.info(f"🔍 Filtre côté serveur: date_debut = {filters['date_depot_debut']}")
         
         # Tous les autres filtres seront appliqués côté client
         if filters.get('date_depot_fin'):
             api_filters['date_fin'] = filters['date_depot_fin']
-            print(f"💻 Filtre côté client: date_fin = {filters['date_depot_fin']}")
+            logger.info(f"💻 Filtre côté client: date_fin = {filters['date_depot_fin']}")
         
         # Groupes instructeurs - Correction du bug de parsing + note côté client
         groupes = filters.get('groupes_instructeurs', [])
@@ -261,10 +340,10 @@ class MultiDemarcheManager:
             elif isinstance(groupes, list):
                 api_filters['groupes_instructeurs'] = [str(g) for g in groupes]
             else:
-                print(f"⚠️  Format de groupes_instructeurs non reconnu : {type(groupes)} - {groupes}")
+                logger.warning(f"⚠️  Format de groupes_instructeurs non reconnu : {type(groupes)} - {groupes}")
             
             if 'groupes_instructeurs' in api_filters:
-                print(f"💻 Filtre côté client: groupes_instructeurs = {api_filters['groupes_instructeurs']}")
+                logger.info(f"💻 Filtre côté client: groupes_instructeurs = {api_filters['groupes_instructeurs']}")
         
         # Statuts des dossiers - côté client
         statuts = filters.get('statuts_dossiers', [])
@@ -275,25 +354,25 @@ class MultiDemarcheManager:
                 api_filters['statuts'] = [statuts]
             
             if 'statuts' in api_filters:
-                print(f"💻 Filtre côté client: statuts = {api_filters['statuts']}")
+                logger.info(f"💻 Filtre côté client: statuts = {api_filters['statuts']}")
         
         # Ajouter une note explicative
         if api_filters:
-            server_filters = [k for k in api_filters.keys() if k == 'date_debut']
-            client_filters = [k for k in api_filters.keys() if k != 'date_debut']
+            server_filters = sorted(_SERVER_FILTER_KEYS.intersection(api_filters))
+            client_filters = [k for k in api_filters if k not in _SERVER_FILTER_KEYS]
             
             if server_filters:
-                print(f"🚀 {len(server_filters)} filtre(s) côté serveur: {server_filters}")
+                logger.info(f"🚀 {len(server_filters)} filtre(s) côté serveur: {server_filters}")
             if client_filters:
-                print(f"💻 {len(client_filters)} filtre(s) côté client: {client_filters}")
-                print(f"   Note: Ces filtres seront appliqués sur le résultat déjà réduit par le serveur")
+                logger.info(f"💻 {len(client_filters)} filtre(s) côté client: {client_filters}")
+                logger.info(f"   Note: Ces filtres seront appliqués sur le résultat déjà réduit par le serveur")
         
         return api_filters
     
     def set_environment_for_demarche(self, demarche_number: int) -> bool:
         """
-        Configure les variables d'environnement pour une démarche spécifique.
-        Cela permet d'utiliser le code existant sans modification.
+        Configure le contexte d'exécution pour une démarche spécifique
+        (token et URL de l'API DS dans le contexte courant, configuration Grist).
         VERSION OPTIMISÉE - prépare les filtres pour l'API.
         
         Args:
@@ -304,130 +383,64 @@ class MultiDemarcheManager:
         """
         demarche_config = self.get_demarche_config(demarche_number)
         if not demarche_config:
-            print(f"❌ Démarche {demarche_number} non trouvée dans la configuration")
+            logger.error(f"❌ Démarche {demarche_number} non trouvée dans la configuration")
             return False
         
         # Vérifier que le token est valide
         if not demarche_config.api_token or demarche_config.api_token.startswith('${'):
-            print(f"❌ Token API invalide pour la démarche {demarche_number}")
+            logger.error(f"❌ Token API invalide pour la démarche {demarche_number}")
             return False
         
-        print(f"🔄 Reconfiguration pour la démarche {demarche_number}...")
-        print(f"   Token: {demarche_config.api_token[:8]}...{demarche_config.api_token[-8:]}")
-        
-        # Configurer les variables d'environnement pour l'API DS
-        os.environ['DEMARCHES_API_TOKEN'] = demarche_config.api_token
-        os.environ['DEMARCHES_API_URL'] = demarche_config.api_url
-        os.environ['DEMARCHE_NUMBER'] = str(demarche_number)
-        
-        # IMPORTANT : Forcer la mise à jour du cache dans queries_config
-        try:
-            import queries_config
-            queries_config.API_TOKEN = demarche_config.api_token
-            queries_config.API_URL = demarche_config.api_url
-            
-            # Si la classe DemarcheAPIConfig existe, l'utiliser
-            if hasattr(queries_config, 'DemarcheAPIConfig'):
-                queries_config.DemarcheAPIConfig.set_current_api_config(
-                    demarche_config.api_token, 
-                    demarche_config.api_url
-                )
-            
-            # FORCER LE RECHARGEMENT DES MODULES CRITIQUES
-            import importlib
-            import sys
-            
-            # Recharger queries_config pour forcer la prise en compte du nouveau token
-            if 'queries_config' in sys.modules:
-                importlib.reload(queries_config)
-                queries_config.API_TOKEN = demarche_config.api_token
-                queries_config.API_URL = demarche_config.api_url
-            
-            # Recharger queries_graphql qui utilise le token
-            if 'queries_graphql' in sys.modules:
-                import queries_graphql
-                importlib.reload(queries_graphql)
-            
-            # Recharger schema_utils qui utilise aussi le token  
-            if 'schema_utils' in sys.modules:
-                import schema_utils
-                importlib.reload(schema_utils)
-                
-            print(f"   🔄 Modules rechargés avec le nouveau token")
-            
-        except ImportError:
-            pass
+        logger.info(f"🔄 Reconfiguration pour la démarche {demarche_number}...")
+        logger.info(f"   Token: {demarche_config.api_token[:8]}...{demarche_config.api_token[-8:]}")
         
-        # Forcer le rechargement de la dotenv si elle est en cache
-        try:
-            from dotenv import load_dotenv
-            load_dotenv(override=True)  # override=True force le rechargement
-        except ImportError:
-            pass
+        # Configurer l'API DS pour cette démarche dans le contexte courant : le token
+        # est lu au moment de chaque requête via queries_config.get_api_config(),
+        # sans modifier os.environ ni recharger les modules de requêtes
+        import queries_config
+        queries_config.set_current_api_config(demarche_config.api_token, demarche_config.api_url)
         
-        # Configurer les variables Grist
+        # Configurer les variables Grist (communes à toutes les démarches)
         grist_config = self.get_grist_config()
         os.environ['GRIST_BASE_URL'] = grist_config['base_url']
         os.environ['GRIST_API_KEY'] = grist_config['api_key']
         os.environ['GRIST_DOC_ID'] = grist_config['doc_id']
         
-        # Préparer les filtres pour l'API optimisée
+        # Les filtres et paramètres de synchronisation propres à la démarche ne
+        # passent plus par os.environ (partagé par tous les threads) : ils sont
+        # transmis explicitement à process_demarche_for_grist_optimized par
+        # _sync_single_demarche. Ils ne sont préparés ici que pour le journal.
         api_filters = self._prepare_filters_for_api(demarche_config.filters)
         
-        # Stocker les filtres préparés dans l'environnement pour le code existant
-        # (ANCIENNE MÉTHODE - pour compatibilité)
-        filters = demarche_config.filters
-        os.environ['DATE_DEPOT_DEBUT'] = filters.get('date_depot_debut', '')
-        os.environ['DATE_DEPOT_FIN'] = filters.get('date_depot_fin', '')
-        os.environ['STATUTS_DOSSIERS'] = ','.join(filters.get('statuts_dossiers', []))
-        
-        # Correction du bug des groupes instructeurs
-        groupes = filters.get('groupes_instructeurs', [])
-        if isinstance(groupes, str):
-            os.environ['GROUPES_INSTRUCTEURS'] = groupes
-        elif isinstance(groupes, list):
-            os.environ['GROUPES_INSTRUCTEURS'] = ','.join(str(g) for g in groupes)
-        else:
-            os.environ['GROUPES_INSTRUCTEURS'] = ''
-        
-        # Stocker les filtres optimisés pour la nouvelle API
-        os.environ['API_FILTERS_JSON'] = json.dumps(api_filters)
-        
-        # Configurer les paramètres de synchronisation
-        sync_config = demarche_config.sync_config
-        os.environ['BATCH_SIZE'] = str(sync_config.get('batch_size', 50))
-        os.environ['MAX_WORKERS'] = str(sync_config.get('max_workers', 3))
-        os.environ['PARALLEL'] = str(sync_config.get('parallel', True)).lower()
-        
-        print(f"✅ Environnement configuré pour la démarche {demarche_number} - {demarche_config.name}")
+        logger.info(f"✅ Environnement configuré pour la démarche {demarche_number} - {demarche_config.name}")
         
         # Afficher les filtres qui seront appliqués avec distinction serveur/client
         if api_filters:
-            print(f"🔍 Stratégie de filtrage hybride activée :")
+            logger.info(f"🔍 Stratégie de filtrage hybride activée :")
             
             # Filtres côté serveur
-            server_filters = {k: v for k, v in api_filters.items() if k == 'date_debut'}
+            server_filters = {k: api_filters[k] for k in _SERVER_FILTER_KEYS.intersection(api_filters)}
             if server_filters:
-                print(f"   🚀 Côté serveur (performance optimale) :")
+                logger.info(f"   🚀 Côté serveur (performance optimale) :")
                 for key, value in server_filters.items():
-                    print(f"      • {key}: {value}")
+                    logger.info(f"      • {key}: {value}")
             
             # Filtres côté client  
-            client_filters = {k: v for k, v in api_filters.items() if k != 'date_debut'}
+            client_filters = {k: v for k, v in api_filters.items() if k not in _SERVER_FILTER_KEYS}
             if client_filters:
-                print(f"   💻 Côté client (sur résultat réduit) :")
+                logger.info(f"   💻 Côté client (sur résultat réduit) :")
                 for key, value in client_filters.items():
-                    print(f"      • {key}: {value}")
+                    logger.info(f"      • {key}: {value}")
             
             # Estimation de performance
             if server_filters and client_filters:
-                print(f"   ⚡ Estimation: ~95% de réduction du volume de données grâce au filtre serveur")
+                logger.info(f"   ⚡ Estimation: ~95% de réduction du volume de données grâce au filtre serveur")
             elif server_filters:
-                print(f"   ⚡ Estimation: ~95% de réduction du volume de données")
+                logger.info(f"   ⚡ Estimation: ~95% de réduction du volume de données")
             else:
-                print(f"   ⚠️  Attention: Aucun filtre côté serveur - performance limitée")
+                logger.warning(f"   ⚠️  Attention: Aucun filtre côté serveur - performance limitée")
         else:
-            print(f"⚠️  Aucun filtre configuré - tous les dossiers seront récupérés")
+            logger.warning(f"⚠️  Aucun filtre configuré - tous les dossiers seront récupérés")
         
         # VALIDATION : Vérifier que le token est bien appliqué
         import requests
@@ -455,22 +468,22 @@ class MultiDemarcheManager:
             )
             
             if response.status_code == 200:
-                result = response.json()
+                result = _json_loads(response.content)
                 if result.get("data") and result["data"].get("demarche"):
-                    print(f"   ✅ Token validé - Accès à la démarche confirmé")
+                    logger.info(f"   ✅ Token validé - Accès à la démarche confirmé")
                     return True
                 else:
-                    print(f"   ⚠️  Token configuré mais démarche inaccessible")
+                    logger.warning(f"   ⚠️  Token configuré mais démarche inaccessible")
                     if "errors" in result:
                         for error in result["errors"]:
-                            print(f"      Erreur API: {error.get('message', 'Unknown')}")
+                            logger.info(f"      Erreur API: {error.get('message', 'Unknown')}")
                     return True  # Continuer quand même
             else:
-                print(f"   ⚠️  Erreur HTTP lors du test: {response.status_code}")
+                logger.warning(f"   ⚠️  Erreur HTTP lors du test: {response.status_code}")
                 return True  # Continuer quand même
                 
         except Exception as e:
-            print(f"   ⚠️  Impossible de valider le token: {str(e)}")
+            logger.warning(f"   ⚠️  Impossible de valider le token: {str(e)}")
             return True  # Continuer quand même
     
     def sync_all_demarches(self) -> List[SyncResult]:
@@ -480,41 +493,72 @@ class MultiDemarcheManager:
         Returns:
             list: Liste des résultats de synchronisation
         """
-        results = []
         enabled_demarches = self.get_enabled_demarches()
         
-        print(f"🚀 Démarrage de la synchronisation de {len(enabled_demarches)} démarches")
+        logger.info(f"🚀 Démarrage de la synchronisation de {len(enabled_demarches)} démarches")
         
-        for i, demarche in enumerate(enabled_demarches, 1):
-            print(f"\n📋 Synchronisation {i}/{len(enabled_demarches)}: {demarche.name} (#{demarche.number})")
-            
-            # Configurer l'environnement pour cette démarche
-            if not self.set_environment_for_demarche(demarche.number):
-                results.append(SyncResult(
-                    demarche_number=demarche.number,
-                    demarche_name=demarche.name,
-                    success=False,
-                    dossiers_processed=0,
-                    errors=["Échec de la configuration de l'environnement"],
-                    duration_seconds=0
-                ))
-                continue
-            
-            # Exécuter la synchronisation
-            result = self._sync_single_demarche(demarche)
-            results.append(result)
-            
-            # Pause entre les démarches pour éviter les problèmes de cache
-            if i < len(enabled_demarches):
-                print(f"⏸️  Pause de 2 secondes avant la démarche suivante...")
-                import time
-                time.sleep(2)
+        results = self._sync_demarches_in_pool(enabled_demarches)
         
         # Afficher le résumé
         self._print_sync_summary(results)
         
         return results
     
+    def _sync_demarches_in_pool(self, demarches: Sequence[DemarcheConfig]) -> List[SyncResult]:
+        """
+        Synchronise une liste de démarches dans un pool de threads borné par
+        max_parallel_demarches (travail essentiellement réseau : API DS + Grist).
+        Chaque démarche s'exécute dans sa propre copie du contexte : le token DS
+        défini par set_environment_for_demarche ne fuit ni vers les autres
+        démarches ni vers la tâche suivante du même thread.
+        
+        Args:
+            demarches: Configurations des démarches à synchroniser
+            
+        Returns:
+            list: Résultats dans l'ordre des démarches fournies
+        """
+        from queries_graphql import set_api_rate_limit
+        set_api_rate_limit(self.api_rate_per_second)
+        
+        results_by_index = {}
+        
+        with ThreadPoolExecutor(max_workers=self.max_parallel_demarches) as executor:
+            futures = {
+                executor.submit(contextvars.copy_context().run, self._sync_demarche_with_environment, demarche): index
+                for index, demarche in enumerate(demarches)
+            }
+            for future in as_completed(futures):
+                results_by_index[futures[future]] = future.result()
+        
+        return [results_by_index[index] for index in range(len(demarches))]
+    
+    def _sync_demarche_with_environment(self, demarche: DemarcheConfig) -> SyncResult:
+        """
+        Configure l'environnement d'une démarche puis la synchronise.
+        
+        Args:
+            demarche: Configuration de la démarche
+            
+        Returns:
+            SyncResult: Résultat de la synchronisation
+        """
+        logger.info(f"\n📋 Synchronisation: {demarche.name} (#{demarche.number})")
+        
+        # Configurer l'environnement pour cette démarche
+        if not self.set_environment_for_demarche(demarche.number):
+            return SyncResult(
+                demarche_number=demarche.number,
+                demarche_name=demarche.name,
+                success=False,
+                dossiers_processed=0,
+                errors=["Échec de la configuration de l'environnement"],
+                duration_seconds=0
+            )
+        
+        # Exécuter la synchronisation
+        return self._sync_single_demarche(demarche)
+    
     def sync_specific_demarches(self, demarche_numbers: List[int], force_disabled: bool = False) -> List[SyncResult]:
         """
         Synchronise des démarches spécifiques.
@@ -527,15 +571,16 @@ class MultiDemarcheManager:
             list: Liste des résultats de synchronisation
         """
         results = []
+        demarches_to_sync = []
         
-        print(f"🔍 Recherche des démarches : {demarche_numbers}")
+        logger.info(f"🔍 Recherche des démarches : {demarche_numbers}")
         
         for demarche_number in demarche_numbers:
             demarche_config = self.get_demarche_config(demarche_number)
             
             if not demarche_config:
-                print(f"❌ Démarche {demarche_number} non trouvée dans la configuration")
-                print(f"   Démarches disponibles : {[d.number for d in self.demarches]}")
+                logger.error(f"❌ Démarche {demarche_number} non trouvée dans la configuration")
+                logger.info(f"   Démarches disponibles : {[d.number for d in self.demarches]}")
                 results.append(SyncResult(
                     demarche_number=demarche_number,
                     demarche_name=f"Démarche {demarche_number}",
@@ -547,42 +592,38 @@ class MultiDemarcheManager:
                 continue
             
             if not demarche_config.enabled and not force_disabled:
-                print(f"⚠️  Démarche {demarche_number} ({demarche_config.name}) désactivée, ignorée")
-                print(f"   Utilisez --force pour forcer la synchronisation")
+                logger.warning(f"⚠️  Démarche {demarche_number} ({demarche_config.name}) désactivée, ignorée")
+                logger.info(f"   Utilisez --force pour forcer la synchronisation")
                 continue
             
-            print(f"\n📋 Synchronisation: {demarche_config.name} (#{demarche_number})")
-            
-            # Configurer l'environnement pour cette démarche
-            if not self.set_environment_for_demarche(demarche_number):
-                results.append(SyncResult(
-                    demarche_number=demarche_number,
-                    demarche_name=demarche_config.name,
-                    success=False,
-                    dossiers_processed=0,
-                    errors=["Échec de la configuration de l'environnement"],
-                    duration_seconds=0
-                ))
-                continue
-            
-            # Exécuter la synchronisation
-            result = self._sync_single_demarche(demarche_config)
-            results.append(result)
-            
-            # Pause entre les démarches pour éviter les problèmes de cache
-            if demarche_number != demarche_numbers[-1]:  # Pas de pause après la dernière
-                print(f"⏸️  Pause de 2 secondes avant la démarche suivante...")
-                import time
-                time.sleep(2)
+            demarches_to_sync.append(demarche_config)
+        
+        results.extend(self._sync_demarches_in_pool(demarches_to_sync))
         
         # Afficher le résumé
         if results:
             self._print_sync_summary(results)
         else:
-            print("⚠️  Aucune démarche n'a été synchronisée")
+            logger.warning("⚠️  Aucune démarche n'a été synchronisée")
         
         return results
     
+    def _get_http_session(self):
+        """
+        Retourne la session HTTP Grist partagée (pool de connexions keep-alive).
+        """
+        with self._http_session_lock:
+            if self._http_session is None:
+                from grist_processor_working_all import create_grist_session
+                self._http_session = create_grist_session()
+            return self._http_session
+    
+    def close(self) -> None:
+        """Ferme la session HTTP partagée."""
+        if self._http_session is not None:
+            self._http_session.close()
+            self._http_session = None
+    
     def _sync_single_demarche(self, demarche: DemarcheConfig) -> SyncResult:
         """
         Synchronise une seule démarche.
@@ -605,7 +646,8 @@ class MultiDemarcheManager:
             client = GristClient(
                 grist_config['base_url'],
                 grist_config['api_key'],
-                grist_config['doc_id']
+                grist_config['doc_id'],
+                session=self._get_http_session()
             )
             
             # Obtenir les paramètres de synchronisation
@@ -641,7 +683,7 @@ class MultiDemarcheManager:
         except Exception as e:
             duration = time.time() - start_time
             error_msg = f"Erreur lors de la synchronisation : {str(e)}"
-            print(f"❌ {error_msg}")
+            logger.error(f"❌ {error_msg}")
             
             return SyncResult(
                 demarche_number=demarche.number,
@@ -659,28 +701,36 @@ class MultiDemarcheManager:
         Args:
             results: Liste des résultats
         """
-        print(f"\n{'='*60}")
-        print("📊 RÉSUMÉ DE LA SYNCHRONISATION")
-        print(f"{'='*60}")
+        logger.info(f"\n{'='*60}")
+        logger.info("📊 RÉSUMÉ DE LA SYNCHRONISATION")
+        logger.info(f"{'='*60}")
         
-        successful = [r for r in results if r.success]
-        failed = [r for r in results if not r.success]
+        # Un seul passage sur les résultats
+        successful = []
+        failed = []
+        total_duration = 0.0
+        for result in results:
+            (successful if result.success else failed).append(result)
+            total_duration += result.duration_seconds
         
-        print(f"✅ Synchronisations réussies : {len(successful)}")
-        print(f"❌ Synchronisations échouées : {len(failed)}")
-        print(f"⏱️  Durée totale : {sum(r.duration_seconds for r in results):.1f} secondes")
+        logger.info(f"✅ Synchronisations réussies : {len(successful)}")
+        if failed:
+            logger.error(f"❌ Synchronisations échouées : {len(failed)}")
+        else:
+            logger.info("❌ Synchronisations échouées : 0")
+        logger.info(f"⏱️  Durée totale : {total_duration:.1f} secondes")
         
         if successful:
-            print(f"\n🎉 Démarches synchronisées avec succès :")
+            logger.info(f"\n🎉 Démarches synchronisées avec succès :")
             for result in successful:
-                print(f"   • {result.demarche_name} (#{result.demarche_number}) - {result.duration_seconds:.1f}s")
+                logger.info(f"   • {result.demarche_name} (#{result.demarche_number}) - {result.duration_seconds:.1f}s")
         
         if failed:
-            print(f"\n💥 Démarches en échec :")
+            logger.error(f"\n💥 Démarches en échec :")
             for result in failed:
-                print(f"   • {result.demarche_name} (#{result.demarche_number})")
+                logger.info(f"   • {result.demarche_name} (#{result.demarche_number})")
                 for error in result.errors:
-                    print(f"     - {error}")
+                    logger.info(f"     - {error}")
     
     def validate_configuration(self) -> bool:
         """
@@ -689,7 +739,7 @@ class MultiDemarcheManager:
         Returns:
             bool: True si la configuration est valide
         """
-        print("🔍 Validation de la configuration...")
+        logger.info("🔍 Validation de la configuration...")
         
         valid = True
         
@@ -697,24 +747,24 @@ class MultiDemarcheManager:
         grist_config = self.get_grist_config()
         for key in ['base_url', 'api_key', 'doc_id']:
             if not grist_config.get(key) or grist_config[key].startswith('${'):
-                print(f"❌ Configuration Grist incomplète : {key}")
+                logger.error(f"❌ Configuration Grist incomplète : {key}")
                 valid = False
         
         if valid:
-            print(f"✅ Configuration Grist valide")
+            logger.info(f"✅ Configuration Grist valide")
         
         # Vérifier les démarches
         enabled_count = len(self.get_enabled_demarches())
         total_count = len(self.demarches)
-        print(f"📋 Démarches : {enabled_count}/{total_count} activées")
+        logger.info(f"📋 Démarches : {enabled_count}/{total_count} activées")
         
         for demarche in self.demarches:
             if not demarche.api_token or demarche.api_token.startswith('${'):
-                print(f"❌ Token manquant pour la démarche {demarche.number} - {demarche.name}")
+                logger.error(f"❌ Token manquant pour la démarche {demarche.number} - {demarche.name}")
                 valid = False
             else:
                 status = "✅ activée" if demarche.enabled else "⚪ désactivée"
-                print(f"   {status} - {demarche.name} (#{demarche.number}) - Token configuré")
+                logger.info(f"   {status} - {demarche.name} (#{demarche.number}) - Token configuré")
                 
                 # Valider les filtres
                 filters = demarche.filters
@@ -733,12 +783,12 @@ class MultiDemarcheManager:
                     filter_info.append(f"Statuts: {filters['statuts_dossiers']}")
                 
                 if filter_info:
-                    print(f"     🔍 Filtres: {' | '.join(filter_info)}")
+                    logger.info(f"     🔍 Filtres: {' | '.join(filter_info)}")
         
         if valid:
-            print("✅ Configuration globale valide")
+            logger.info("✅ Configuration globale valide")
         else:
-            print("❌ Configuration invalide")
+            logger.error("❌ Configuration invalide")
         
         return valid
 
@@ -746,13 +796,13 @@ class MultiDemarcheManager:
         """
         Valide l'efficacité des filtres configurés et donne des recommandations.
         """
-        print("\n🔍 Analyse de l'efficacité des filtres configurés:")
+        logger.info("\n🔍 Analyse de l'efficacité des filtres configurés:")
         
         for demarche in self.demarches:
             if not demarche.enabled:
                 continue
                 
-            print(f"\n📋 Démarche {demarche.number} - {demarche.name}:")
+            logger.info(f"\n📋 Démarche {demarche.number} - {demarche.name}:")
             filters = demarche.filters
             
             # Analyse des filtres
@@ -764,11 +814,11 @@ class MultiDemarcheManager:
             ])
             
             if has_server_filter:
-                print(f"   ✅ Filtre côté serveur détecté: date_depot_debut = {filters['date_depot_debut']}")
-                print(f"      Impact: Réduction drastique du volume de données")
+                logger.info(f"   ✅ Filtre côté serveur détecté: date_depot_debut = {filters['date_depot_debut']}")
+                logger.info(f"      Impact: Réduction drastique du volume de données")
             else:
-                print(f"   ⚠️  Aucun filtre côté serveur configuré")
-                print(f"      Recommandation: Ajoutez 'date_depot_debut' pour améliorer les performances")
+                logger.warning(f"   ⚠️  Aucun filtre côté serveur configuré")
+                logger.info(f"      Recommandation: Ajoutez 'date_depot_debut' pour améliorer les performances")
             
             if has_client_filters:
                 client_filter_names = []
@@ -779,12 +829,12 @@ class MultiDemarcheManager:
                 if filters.get('statuts_dossiers'):
                     client_filter_names.append('statuts_dossiers')
                 
-                print(f"   💻 Filtres côté client: {', '.join(client_filter_names)}")
+                logger.info(f"   💻 Filtres côté client: {', '.join(client_filter_names)}")
                 
                 if has_server_filter:
-                    print(f"      Impact: Filtrage précis sur le résultat déjà réduit")
+                    logger.info(f"      Impact: Filtrage précis sur le résultat déjà réduit")
                 else:
-                    print(f"      ⚠️  Impact limité: Filtrage sur TOUS les dossiers de la démarche")
+                    logger.warning(f"      ⚠️  Impact limité: Filtrage sur TOUS les dossiers de la démarche")
             
             # Score d'efficacité
             if has_server_filter and has_client_filters:
@@ -796,7 +846,7 @@ class MultiDemarcheManager:
             else:
                 score = "❌ INEFFICACE"
             
-            print(f"   Score d'efficacité: {score}")
+            logger.info(f"   Score d'efficacité: {score}")
 
 
 def main():
@@ -816,39 +866,41 @@ def main():
     parser.add_argument('--analyze-filters', action='store_true', help='Analyser uniquement l\'efficacité des filtres')
     
     args = parser.parse_args()
+    _start_log_listener()
     
     # Activer le debug si demandé
     if args.debug:
         os.environ['LOG_LEVEL'] = 'DEBUG'
-        print("🐛 Mode debug activé")
+        logger.info("🐛 Mode debug activé")
     
+    manager = None
     try:
-        print(f"🚀 Démarrage du gestionnaire multi-démarche OPTIMISÉ")
-        print(f"📁 Fichier de configuration : {args.config}")
+        logger.info(f"🚀 Démarrage du gestionnaire multi-démarche OPTIMISÉ")
+        logger.info(f"📁 Fichier de configuration : {args.config}")
         
         # Vérifier que le fichier de configuration existe
         if not os.path.exists(args.config):
-            print(f"❌ Fichier de configuration non trouvé : {args.config}")
-            print(f"💡 Créez le fichier {args.config} avec vos démarches")
+            logger.error(f"❌ Fichier de configuration non trouvé : {args.config}")
+            logger.info(f"💡 Créez le fichier {args.config} avec vos démarches")
             return 1
         
         # Initialiser le gestionnaire
         manager = MultiDemarcheManager(args.config)
-        print(f"✅ Configuration chargée : {len(manager.demarches)} démarches trouvées")
+        logger.info(f"✅ Configuration chargée : {len(manager.demarches)} démarches trouvées")
         
         # Afficher les démarches disponibles en mode debug
         if args.debug:
-            print(f"📋 Démarches disponibles :")
+            logger.info(f"📋 Démarches disponibles :")
             for d in manager.demarches:
                 status = "✅ activée" if d.enabled else "⚪ désactivée"
                 token_ok = "🔑 OK" if d.api_token and not d.api_token.startswith('${') else "❌ token manquant"
                 filters = len([k for k, v in d.filters.items() if v])
-                print(f"   {d.number}: {d.name} - {status} - {token_ok} - {filters} filtres")
+                logger.info(f"   {d.number}: {d.name} - {status} - {token_ok} - {filters} filtres")
         
         # Mode analyse des filtres uniquement
         if args.analyze_filters:
             if not manager.validate_configuration():
-                print("❌ Configuration invalide. Impossible d'analyser les filtres.")
+                logger.error("❌ Configuration invalide. Impossible d'analyser les filtres.")
                 return 1
             manager.validate_filters_efficiency()
             return 0
@@ -856,17 +908,17 @@ def main():
         # Mode validation uniquement
         if args.validate_only or args.dry_run:
             if manager.validate_configuration():
-                print("✅ Configuration valide")
+                logger.info("✅ Configuration valide")
                 if args.debug:
                     manager.validate_filters_efficiency()
                 return 0
             else:
-                print("❌ Configuration invalide")
+                logger.error("❌ Configuration invalide")
                 return 1
         
         # Valider la configuration avant synchronisation
         if not manager.validate_configuration():
-            print("❌ Configuration invalide. Arrêt du programme.")
+            logger.error("❌ Configuration invalide. Arrêt du programme.")
             return 1
         
         # Analyser l'efficacité des filtres en mode debug
@@ -884,12 +936,12 @@ def main():
                     if cleaned:
                         demarche_numbers.append(int(cleaned))
                 
-                print(f"🎯 Démarches sélectionnées : {demarche_numbers}")
+                logger.info(f"🎯 Démarches sélectionnées : {demarche_numbers}")
                 results = manager.sync_specific_demarches(demarche_numbers, force_disabled=args.force)
             except ValueError as e:
-                print(f"❌ Erreur dans les numéros de démarches : {args.demarches}")
-                print(f"   Format attendu : 121950,122643,121821 (sans espaces)")
-                print(f"   Votre saisie : '{args.demarches}'")
+                logger.error(f"❌ Erreur dans les numéros de démarches : {args.demarches}")
+                logger.info(f"   Format attendu : 121950,122643,121821 (sans espaces)")
+                logger.info(f"   Votre saisie : '{args.demarches}'")
                 return 1
         else:
             # Synchroniser toutes les démarches activées
@@ -898,22 +950,24 @@ def main():
         # Vérifier si au moins une synchronisation a réussi
         success_count = sum(1 for r in results if r.success)
         if success_count > 0:
-            print(f"\n🎉 Synchronisation terminée : {success_count} démarches traitées avec succès")
+            logger.info(f"\n🎉 Synchronisation terminée : {success_count} démarches traitées avec succès")
             return 0
         else:
-            print(f"\n💥 Aucune synchronisation réussie")
+            logger.error(f"\n💥 Aucune synchronisation réussie")
             return 1
             
     except Exception as e:
-        print(f"💥 Erreur fatale : {e}")
+        logger.error(f"💥 Erreur fatale : {e}")
         if args.debug:
             import traceback
-            traceback.print_exc()
+            logger.error(traceback.format_exc())
         else:
-            print("💡 Utilisez --debug pour plus de détails")
+            logger.info("💡 Utilisez --debug pour plus de détails")
         return 1
+    finally:
+        if manager is not None:
+            manager.close()
 
 
 if __name__ == "__main__":
-    import sys
     sys.exit(main())
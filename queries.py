@@ -5,13 +5,14 @@ from dotenv import load_dotenv
 
 # Import des modules locaux
 from queries_config import API_TOKEN
-from queries_graphql import get_dossier, get_demarche, get_demarche_dossiers, get_dossier_geojson
+from queries_graphql import get_dossier, get_dossiers_batch, get_demarche, get_demarche_dossiers, get_dossier_geojson
 from queries_util import format_complex_json_for_grist, associate_geojson_with_champs
 from queries_extract import extract_champ_values, dossier_to_flat_data
 
 # Exposer les fonctions principales pour l'importation dans d'autres scripts
 __all__ = [
     'get_dossier', 
+    'get_dossiers_batch', 
     'get_demarche', 
     'get_demarche_dossiers', 
     'get_dossier_geojson',
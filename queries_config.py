@@ -1,9 +1,47 @@
 import os
+from contextvars import ContextVar
 from dotenv import load_dotenv
 
 # Charger les variables d'environnement
 load_dotenv()
 
-# Récupérer le token depuis les variables d'environnement
+# Récupérer le token depuis les variables d'environnement (configuration par défaut)
 API_TOKEN = os.getenv("DEMARCHES_API_TOKEN")
-API_URL = os.getenv("DEMARCHES_API_URL", "https://demarche.numerique.gouv.fr/api/v2/graphql")
\ No newline at end of file
+API_URL = os.getenv("DEMARCHES_API_URL", "https://demarche.numerique.gouv.fr/api/v2/graphql")
+
+# Configuration courante propre à chaque thread / contexte : deux démarches
+# synchronisées en parallèle ne voient jamais le token l'une de l'autre.
+_api_token_var = ContextVar("api_token", default=API_TOKEN)
+_api_url_var = ContextVar("api_url", default=API_URL)
+
+
+def get_api_config(api_token=None, api_url=None):
+    """
+    Retourne le couple (token, url) à utiliser pour une requête à l'API DS.
+    Les valeurs explicites sont prioritaires sur la configuration du contexte
+    courant, qui est lue au moment de l'appel (pas de copie figée à l'import).
+    """
+    return api_token or _api_token_var.get(), api_url or _api_url_var.get()
+
+
+def set_current_api_config(api_token, api_url=None):
+    """
+    Définit la configuration de l'API DS (token et éventuellement URL) pour le
+    contexte courant uniquement, sans passer par os.environ.
+
+    Returns:
+        tuple: Jetons à passer à reset_api_config pour restaurer la configuration précédente
+    """
+    token_reset = _api_token_var.set(api_token)
+    url_reset = _api_url_var.set(api_url) if api_url else None
+    return token_reset, url_reset
+
+
+def reset_api_config(reset_tokens):
+    """
+    Restaure la configuration précédant un appel à set_current_api_config.
+    """
+    token_reset, url_reset = reset_tokens
+    if url_reset is not None:
+        _api_url_var.reset(url_reset)
+    _api_token_var.reset(token_reset)
@@ -1,9 +1,26 @@
 import base64
+import binascii
+import functools
 import json
-import requests
-from typing import Dict, Any, List
+import sys
+from operator import itemgetter
+from typing import AbstractSet, Any, Callable, Dict, Iterator, List, Optional, Tuple
 
-def decode_base64_id(base64_id: str) -> str:
+# Encodeur JSON réutilisé pour les valeurs écrites dans Grist (*_json, coordonnées).
+# Sortie identique à json.dumps(..., ensure_ascii=False) (séparateurs par défaut, pas
+# d'orjson) : le texte des cellules existantes ne change pas et n'est pas réécrit par l'upsert.
+_dumps = json.JSONEncoder(ensure_ascii=False).encode
+
+# Types de champs purement décoratifs, jamais extraits
+_SKIP_TYPES = frozenset({"HeaderSectionChamp", "ExplicationChamp"})
+_REPETITION = "RepetitionChamp"
+
+# Valeurs par défaut partagées (lecture seule) pour les clés absentes : pas
+# d'allocation d'une liste ou d'un dict vide à chaque .get()
+_EMPTY_TUP = ()
+_EMPTY_DICT = {}
+
+def _decode_base64_id_impl(base64_id: str) -> str:
     """
     Décode un ID en Base64 utilisé par l'API GraphQL.
     
@@ -13,6 +30,11 @@ def decode_base64_id(base64_id: str) -> str:
     Returns:
         ID décodé
     """
+    # Une chaîne Base64 valide a une longueur multiple de 4 : les IDs qui ne
+    # respectent pas cet invariant sont rendus tels quels sans appeler le décodeur
+    if not isinstance(base64_id, str) or not base64_id or len(base64_id) & 3:
+        return base64_id
+    
     try:
         # Décodage Base64
         decoded = base64.b64decode(base64_id).decode('utf-8')
@@ -26,11 +48,27 @@ def decode_base64_id(base64_id: str) -> str:
             return decoded.split('-')[-1]
         
         return decoded
-    except:
+    except (binascii.Error, UnicodeDecodeError, ValueError):
         # Si le décodage échoue, retourne l'ID original
         return base64_id
 
-def format_complex_json_for_grist(json_value, max_length=10000):
+# Fonction pure appelée sur des chaînes courtes très répétées (même descripteur
+# sur chaque ligne d'un bloc répétable) : les résultats, échecs compris, sont mis en cache
+decode_base64_id = functools.lru_cache(maxsize=4096)(_decode_base64_id_impl)
+
+def _fast_id(raw_id: str) -> Optional[str]:
+    """
+    ID numérique d'un champ : lu directement dans la forme chemin ".../Champ/NNN"
+    (pas de décodage Base64), sinon décodé via decode_base64_id.
+    """
+    if "/" in raw_id:
+        parts = raw_id.split("/")
+        if len(parts) >= 4 and parts[-2] in ("Champ", "Dossier"):
+            return parts[-1]
+        return None
+    return decode_base64_id(raw_id)
+
+def format_complex_json_for_grist(json_value: Any, max_length: int = 10000) -> Optional[str]:
     """
     Formate une valeur JSON complexe pour l'insertion dans Grist.
     Tronque si nécessaire et s'assure que la valeur est une chaîne.
@@ -44,9 +82,15 @@ def format_complex_json_for_grist(json_value, max_length=10000):
     """
     if json_value is None:
         return None
-        
+
+    # Chaîne déjà prête : pas de ré-encodage, simple troncature
+    if isinstance(json_value, str):
+        if len(json_value) > max_length:
+            return json_value[:max_length] + "..."
+        return json_value
+
     try:
-        json_str = json.dumps(json_value, ensure_ascii=False)
+        json_str = _dumps(json_value)
         # Tronquer si la chaîne est trop longue
         if len(json_str) > max_length:
             json_str = json_str[:max_length] + "..."
@@ -58,7 +102,459 @@ def format_complex_json_for_grist(json_value, max_length=10000):
             str_value = str_value[:max_length] + "..."
         return str_value
 
-def extract_champ_values(champ: Dict[str, Any], prefix: str = "", original_id: str = None) -> List[Dict[str, Any]]:
+def _text_column_entry(champ: Dict[str, Any], entry_id: Optional[str], base_label: str, value: Any, prefix: str,
+                       original_id: Optional[str], decoded_descriptor_id: Optional[str]) -> Dict[str, Any]:
+    """
+    Construit une entrée de type TextColumn (colonne dérivée d'un champ :
+    nom/code d'un pays, colonnes d'un RIB, etc.).
+    """
+    return {
+        "id": entry_id,
+        "numeric_id": None,
+        "descriptor_id": champ.get("champDescriptorId"),
+        "decoded_descriptor_id": decoded_descriptor_id,
+        "label": f"{prefix}{base_label}",
+        "base_label": base_label,
+        "type": "TextColumn",
+        "value": value,
+        "json_value": None,
+        "updated_at": champ.get("updatedAt"),
+        "prefilled": champ.get("prefilled", False),
+        "row_id": original_id if original_id != champ["id"] else None
+    }
+
+# Chaque handler reçoit (champ, prefix, original_id, decoded_descriptor_id) et
+# retourne (value, json_value, entrées supplémentaires ou None). Les entrées
+# supplémentaires sont ajoutées avant l'entrée principale du champ.
+_HandlerResult = Tuple[Any, Any, Optional[List[Dict[str, Any]]]]
+
+def _h_default(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+               decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    # Pour les autres types, utiliser la valeur textuelle
+    return champ.get("stringValue"), None, None
+
+def _h_date(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+            decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    return champ.get("date"), None, None
+
+def _h_datetime(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+                decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    return champ.get("datetime"), None, None
+
+def _h_checkbox(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+                decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    return champ.get("checked"), None, None
+
+def _h_yes_no(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+              decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    return champ.get("selected"), None, None
+
+def _h_decimal_number(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+                      decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    return champ.get("decimalNumber"), None, None
+
+def _h_integer_number(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+                      decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    return champ.get("integerNumber"), None, None
+
+def _h_civilite(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+                decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    return champ.get("civilite"), None, None
+
+def _h_linked_drop_down_list(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+                             decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    primary = champ.get('primaryValue', '')
+    secondary = champ.get('secondaryValue', '')
+    value = f"{primary} - {secondary}" if primary and secondary else primary or secondary
+    return value, {"primaryValue": primary, "secondaryValue": secondary}, None
+
+def _h_multiple_drop_down_list(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+                               decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    values_list = champ.get("values", [])
+    value = ", ".join(values_list) if values_list else None
+    return value, values_list, None
+
+def _h_piece_justificative(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+                           decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    files = champ.get("files") or ()
+    value = ", ".join(map(itemgetter("filename"), files)) if files else None
+
+    extra = []
+    for col in champ.get("columns") or _EMPTY_TUP:
+        col_typename = col.get("__typename")
+        col_label = col.get("label", "")
+        col_value = col.get("value")
+
+        if col_typename == "AttachmentsColumn" or not col_value:
+            continue
+
+        if col_typename == "TextColumn":
+            # Logique spécifique pour la banque
+            if "banque" in col_label.lower():
+                # On force le label pour qu'il devienne EXACTEMENT l'ID Grist après normalisation
+                full_label = "rib a rattacher a la demande ci dessous nom de la banque"
+            else:
+                # Pour IBAN, BIC, Titulaire qui fonctionnent déjà
+                clean_label = col_label.replace('.', '')
+                full_label = clean_label.replace('–', '').replace('-', ' ')
+
+            extra.append(_text_column_entry(
+                champ, col.get("id"), full_label, col_value,
+                prefix, original_id, decoded_descriptor_id
+            ))
+
+    return value, None, extra
+
+def _h_address(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+               decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    address = champ.get("address")
+    if not address:
+        return _h_default(champ, prefix, original_id, decoded_descriptor_id)
+
+    value = f"{address.get('streetAddress', '')}, {address.get('postalCode', '')} {address.get('cityName', '')}"
+    json_value = address
+
+    # Ajouter les informations de commune et département si disponibles
+    commune = champ.get("commune")
+    departement = champ.get("departement")
+    if commune or departement:
+        address_extra = {}
+        if commune:
+            address_extra["commune"] = commune
+        if departement:
+            address_extra["departement"] = departement
+        json_value = {"address": address, **address_extra}
+    return value, json_value, None
+
+def _h_siret(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+             decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    etablissement = champ.get("etablissement")
+    if not etablissement:
+        return _h_default(champ, prefix, original_id, decoded_descriptor_id)
+
+    raison_sociale = (etablissement.get("entreprise") or _EMPTY_DICT).get("raisonSociale", "")
+    siret = etablissement.get("siret", "")
+    value = f"{siret} - {raison_sociale}" if siret and raison_sociale else siret or raison_sociale
+    return value, etablissement, None
+
+def _h_carte(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+             decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    # Traitement détaillé pour les champs Carte : une entrée par zone géographique,
+    # l'entrée principale du champ (sans valeur) est ajoutée ensuite
+    geo_areas = champ.get("geoAreas") or _EMPTY_TUP
+    cid = champ["id"]
+    label = champ["label"]
+    full_label = prefix + label if prefix else label
+    tn = champ["__typename"]
+    row_id = original_id if original_id != cid else None
+
+    # Si pas de zones géographiques, retourner un résultat minimal
+    if not geo_areas:
+        return None, None, [{
+            "id": cid,
+            "numeric_id": _fast_id(cid),
+            "descriptor_id": champ.get("champDescriptorId"),
+            "decoded_descriptor_id": decoded_descriptor_id,
+            "label": full_label,
+            "base_label": label,
+            "type": tn,
+            "value": "Aucune zone géographique définie",
+            "json_value": None,
+            "updated_at": champ.get("updatedAt"),
+            "prefilled": champ.get("prefilled", False),
+            "row_id": row_id
+        }]
+
+    # Créer des entrées séparées pour chaque zone géographique
+    extra = []
+    for j, geo_area in enumerate(geo_areas):
+        # Géométrie lue une seule fois ; coordonnées sérialisées seulement si présentes
+        geometry = geo_area.get("geometry")
+        coordinates = geometry.get("coordinates") if geometry else None
+        extra.append({
+            "id": cid,
+            "numeric_id": _fast_id(cid),
+            "descriptor_id": champ.get("champDescriptorId"),
+            "decoded_descriptor_id": decoded_descriptor_id,
+            "label": full_label,
+            "base_label": label,
+            "type": tn,
+
+            # Champs spécifiques à la zone géographique
+            "geo_area_id": geo_area.get("id"),
+            "geo_area_source": geo_area.get("source"),
+            "geo_area_description": geo_area.get("description"),
+            "geo_area_geometry_type": geometry.get("type") if geometry else None,
+            "geo_area_geometry_coordinates": _dumps(coordinates) if coordinates is not None else None,
+
+            # Informations supplémentaires pour les parcelles cadastrales
+            "parcelle_commune": geo_area.get("commune"),
+            "parcelle_numero": geo_area.get("numero"),
+            "parcelle_section": geo_area.get("section"),
+            "parcelle_prefixe": geo_area.get("prefixe"),
+            "parcelle_surface": geo_area.get("surface"),
+
+            # Valeur textuelle pour compatibilité
+            "value": f"Zone {j+1}: {geo_area.get('source', '')} - {geo_area.get('description', 'Sans description')}",
+            "json_value": geo_area,
+            "updated_at": champ.get("updatedAt"),
+            "prefilled": champ.get("prefilled", False),
+            "row_id": row_id
+        })
+    return None, None, extra
+
+def _h_dossier_link(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+                    decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    # Traitement pour les liens vers d'autres dossiers
+    linked_dossier = champ.get("dossier")
+    if not linked_dossier:
+        return _h_default(champ, prefix, original_id, decoded_descriptor_id)
+
+    dossier_number = linked_dossier.get("number", "")
+    dossier_state = linked_dossier.get("state", "")
+    value = f"Dossier #{dossier_number} ({dossier_state})" if dossier_number else "Aucun dossier lié"
+    return value, linked_dossier, None
+
+def _name_code(name: str, code: str) -> str:
+    """
+    Libellé "nom (code)" d'un objet référentiel, ou la seule des deux valeurs renseignée.
+    """
+    return f"{name} ({code})" if name and code else name or code
+
+def _make_name_code_handler(key: str) -> Callable[..., _HandlerResult]:
+    """
+    Handler des champs référentiels {name, code} (pays, région, département) :
+    valeur "nom (code)" plus deux colonnes séparées _nom et _code.
+    """
+    def handler(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+                decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+        obj = champ.get(key)
+        if not obj:
+            return _h_default(champ, prefix, original_id, decoded_descriptor_id)
+
+        name = obj.get("name", "")
+        code = obj.get("code", "")
+        value = _name_code(name, code)
+
+        extra = []
+        if name:
+            extra.append(_text_column_entry(
+                champ, champ.get("id") + "_nom", f"{champ['label']}_nom", name,
+                prefix, original_id, decoded_descriptor_id
+            ))
+        if code:
+            extra.append(_text_column_entry(
+                champ, champ.get("id") + "_code", f"{champ['label']}_code", code,
+                prefix, original_id, decoded_descriptor_id
+            ))
+        return value, obj, extra
+    return handler
+
+def _h_commune(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+               decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    commune = champ.get("commune")
+    if not commune:
+        return _h_default(champ, prefix, original_id, decoded_descriptor_id)
+
+    name = commune.get("name", "")
+    code_insee = commune.get("code", "")
+    postal_code = commune.get("postalCode", "")
+    value = f"{name} ({postal_code})" if name and postal_code else name
+
+    departement = champ.get("departement")
+    dept_name = None
+    dept_code = None
+    if departement:
+        dept_name = departement.get("name", "")
+        dept_code = departement.get("code", "")
+        value = f"{value}, {dept_name}" if value and dept_name else value or dept_name
+
+    json_value = {"commune": commune}
+    if departement:
+        json_value["departement"] = departement
+
+    # Colonnes séparées : nom, code postal, département (nom), code INSEE, code département
+    extra = []
+    for suffix, sub_value in (("_nom", name),
+                              ("_code_postal", postal_code),
+                              ("_departement", dept_name),
+                              ("_code_insee", code_insee),
+                              ("_code_departement", dept_code)):
+        if sub_value:
+            extra.append(_text_column_entry(
+                champ, champ.get("id") + suffix, f"{champ['label']}{suffix}", sub_value,
+                prefix, original_id, decoded_descriptor_id
+            ))
+    return value, json_value, extra
+
+def _h_epci(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+            decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    # Traitement pour les EPCI
+    epci = champ.get("epci")
+    if not epci:
+        return _h_default(champ, prefix, original_id, decoded_descriptor_id)
+
+    value = _name_code(epci.get("name", ""), epci.get("code", ""))
+
+    # Ajouter le département si disponible
+    departement = champ.get("departement")
+    if departement:
+        dept_name = departement.get("name", "")
+        value = f"{value}, {dept_name}" if value and dept_name else value or dept_name
+
+    json_value = {"epci": epci}
+    if departement:
+        json_value["departement"] = departement
+    return value, json_value, None
+
+def _h_rnf(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+           decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    # Traitement pour les RNF
+    rnf = champ.get("rnf")
+    if not rnf:
+        return _h_default(champ, prefix, original_id, decoded_descriptor_id)
+
+    title = rnf.get("title", "")
+    rnf_address = rnf.get("address") or _EMPTY_DICT
+    city_name = rnf_address.get("cityName", "")
+    postal_code = rnf_address.get("postalCode", "")
+
+    if title:
+        if city_name and postal_code:
+            value = f"{title} - {city_name} ({postal_code})"
+        else:
+            value = title
+    else:
+        value = ""
+
+    # Ajouter commune et département si disponibles
+    commune = champ.get("commune")
+    departement = champ.get("departement")
+
+    json_value = {"rnf": rnf}
+    if commune:
+        json_value["commune"] = commune
+    if departement:
+        json_value["departement"] = departement
+    return value, json_value, None
+
+def _h_engagement_juridique(champ: Dict[str, Any], prefix: str, original_id: Optional[str],
+                            decoded_descriptor_id: Optional[str]) -> _HandlerResult:
+    # Traitement pour les engagements juridiques
+    engagement = champ.get("engagementJuridique")
+    if not engagement:
+        return _h_default(champ, prefix, original_id, decoded_descriptor_id)
+
+    montant_engage = engagement.get("montantEngage")
+    montant_paye = engagement.get("montantPaye")
+
+    value = ""
+    if montant_engage is not None:
+        value = f"Montant engagé: {montant_engage}"
+    if montant_paye is not None:
+        value = f"{value}, Montant payé: {montant_paye}" if value else f"Montant payé: {montant_paye}"
+    return value, engagement, None
+
+# Table de dispatch construite une seule fois : un lookup par champ au lieu
+# d'une chaîne de comparaisons sur __typename
+_HANDLERS: Dict[str, Callable[..., _HandlerResult]] = {
+    "DateChamp": _h_date,
+    "DatetimeChamp": _h_datetime,
+    "CheckboxChamp": _h_checkbox,
+    "YesNoChamp": _h_yes_no,
+    "DecimalNumberChamp": _h_decimal_number,
+    "IntegerNumberChamp": _h_integer_number,
+    "CiviliteChamp": _h_civilite,
+    "LinkedDropDownListChamp": _h_linked_drop_down_list,
+    "MultipleDropDownListChamp": _h_multiple_drop_down_list,
+    "DropDownListChamp": _h_default,
+    "PieceJustificativeChamp": _h_piece_justificative,
+    "AddressChamp": _h_address,
+    "SiretChamp": _h_siret,
+    "CarteChamp": _h_carte,
+    "DossierLinkChamp": _h_dossier_link,
+    "PaysChamp": _make_name_code_handler("pays"),
+    "RegionChamp": _make_name_code_handler("region"),
+    "DepartementChamp": _make_name_code_handler("departement"),
+    "CommuneChamp": _h_commune,
+    "EpciChamp": _h_epci,
+    "RNFChamp": _h_rnf,
+    "EngagementJuridiqueChamp": _h_engagement_juridique,
+}
+
+def _yield_champ_values(champ: Dict[str, Any], prefix: str = "",
+                        original_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Version générateur d'extract_champ_values : produit les entrées une à une,
+    sans construire de liste intermédiaire. Les blocs répétables sont parcourus
+    avec une pile explicite (pas de récursion), dans le même ordre qu'un
+    parcours en profondeur.
+    """
+    stack = [(champ, prefix, original_id)]
+    
+    while stack:
+        champ, prefix, original_id = stack.pop()
+        
+        # Typename internalisé et réécrit dans le champ : une seule chaîne partagée
+        # par type pour tous les dossiers en mémoire, et des comparaisons par
+        # identité pour les lectures suivantes (les littéraux du module sont déjà internalisés)
+        tn = champ["__typename"] = sys.intern(champ["__typename"])
+        
+        # Ignorer immédiatement les types HeaderSectionChamp et ExplicationChamp
+        if tn in _SKIP_TYPES:
+            continue
+            
+        label = champ["label"]
+        cid = champ["id"]
+        full_label = prefix + label if prefix else label
+        
+        # Si l'ID original n'est pas fourni, utiliser l'ID du champ
+        if original_id is None:
+            original_id = cid
+        
+        # Traitement spécial pour les champs répétables
+        if tn == _REPETITION:
+            row_champs = []
+            for i, row in enumerate(champ.get("rows") or _EMPTY_TUP):
+                row_prefix = f"{full_label}_{i+1}_"
+                # Passage de l'ID du champ répétable comme contexte
+                row_id = row.get("id", original_id)
+                
+                # Pour chaque champ dans la rangée, sauf HeaderSectionChamp et ExplicationChamp
+                for row_champ in row.get("champs") or _EMPTY_TUP:
+                    if row_champ["__typename"] not in _SKIP_TYPES:
+                        row_champs.append((row_champ, row_prefix, row_id))
+            
+            # Empilés à l'envers pour être dépilés dans l'ordre des rangées
+            stack.extend(reversed(row_champs))
+            continue
+        
+        # Décodage de l'ID du descripteur pour correspondance
+        decoded_descriptor_id = decode_base64_id(champ.get("champDescriptorId", "")) if "champDescriptorId" in champ else None
+        
+        # Préparation de la valeur selon le type de champ
+        handler = _HANDLERS.get(tn, _h_default)
+        value, json_value, extra = handler(champ, prefix, original_id, decoded_descriptor_id)
+        if extra:
+            yield from extra
+            
+        # Entrée principale du champ, avec tentative d'extraction d'un ID numérique
+        yield {
+            "id": cid,
+            "numeric_id": _fast_id(cid),
+            "descriptor_id": champ.get("champDescriptorId"),
+            "decoded_descriptor_id": decoded_descriptor_id,
+            "label": full_label,
+            "base_label": label,  # Label sans préfixe de bloc répétable
+            "type": tn,
+            "value": value,
+            "json_value": json_value,
+            "updated_at": champ.get("updatedAt"),
+            "prefilled": champ.get("prefilled", False),
+            "row_id": original_id if original_id != cid else None  # ID de la rangée pour les blocs répétables
+        }
+
+def extract_champ_values(champ: Dict[str, Any], prefix: str = "", original_id: Optional[str] = None) -> List[Dict[str, Any]]:
     """
     Extrait les valeurs d'un champ, y compris les champs répétables.
     Gère tous les types de champs spécifiques de l'API Démarches Simplifiées.
@@ -71,516 +567,75 @@ def extract_champ_values(champ: Dict[str, Any], prefix: str = "", original_id: s
     Returns:
         Liste de dictionnaires contenant les valeurs extraites
     """
-    # Ignorer immédiatement les types HeaderSectionChamp et ExplicationChamp
-    if champ["__typename"] in ["HeaderSectionChamp", "ExplicationChamp"]:
-        return []
-        
-    result = []
-    
-    # Si l'ID original n'est pas fourni, utiliser l'ID du champ
-    if original_id is None:
-        original_id = champ["id"]
-    
-    # Décodage de l'ID du descripteur pour correspondance
-    decoded_descriptor_id = decode_base64_id(champ.get("champDescriptorId", "")) if "champDescriptorId" in champ else None
-    
-    # Traitement spécial pour les champs répétables
-    if champ["__typename"] == "RepetitionChamp":
-        for i, row in enumerate(champ.get("rows", [])):
-            row_prefix = f"{prefix}{champ['label']}_{i+1}_"
-            
-            # Pour chaque champ dans la rangée
-            for row_champ in row.get("champs", []):
-                # Ignorer les types HeaderSectionChamp et ExplicationChamp dans les rangées
-                if row_champ["__typename"] in ["HeaderSectionChamp", "ExplicationChamp"]:
-                    continue
-                    
-                # Passage de l'ID du champ répétable comme contexte
-                row_results = extract_champ_values(row_champ, row_prefix, row.get("id", original_id))
-                result.extend(row_results)
-    else:
-        # Préparation de la valeur selon le type de champ
-        value = None
-        json_value = None
-        
-        # Traitement pour différents types de champs
-        if champ["__typename"] == "DateChamp":
-            value = champ.get("date")
-        elif champ["__typename"] == "DatetimeChamp":
-            value = champ.get("datetime")
-        elif champ["__typename"] == "CheckboxChamp":
-            value = champ.get("checked")
-        elif champ["__typename"] == "YesNoChamp":
-            value = champ.get("selected")
-        elif champ["__typename"] == "DecimalNumberChamp":
-            value = champ.get("decimalNumber")
-        elif champ["__typename"] == "IntegerNumberChamp":
-            value = champ.get("integerNumber")
-        elif champ["__typename"] == "CiviliteChamp":
-            value = champ.get("civilite")
-        elif champ["__typename"] == "LinkedDropDownListChamp":
-            primary = champ.get('primaryValue', '')
-            secondary = champ.get('secondaryValue', '')
-            value = f"{primary} - {secondary}" if primary and secondary else primary or secondary
-            json_value = {"primaryValue": primary, "secondaryValue": secondary}
-        elif champ["__typename"] == "MultipleDropDownListChamp":
-            values_list = champ.get("values", [])
-            value = ", ".join(values_list) if values_list else None
-            json_value = values_list
-        elif champ["__typename"] == "DropDownListChamp":
-            value = champ.get("stringValue")
-        # Correctif à apporter dans queries_extract.py
-        # Remplacer la section après "elif champ["__typename"] == "PieceJustificativeChamp":" 
-
-        elif champ["__typename"] == "PieceJustificativeChamp":
-            files = champ.get("files", [])
-            value = ", ".join([f['filename'] for f in files]) if files else None
-            json_value = None # ✅ On garde l'initialisation ici
-            
-            columns = champ.get("columns", [])
-            if columns:
-                # Vérifier si c'est un champ RIB
-                is_rib_field = "rib" in champ['label'].lower() or "iban" in champ['label'].lower()
-                
-                for col in columns:
-                    col_typename = col.get("__typename")
-                    col_label = col.get("label", "")
-                    col_value = col.get("value")
-                    
-                    if col_typename == "AttachmentsColumn" or not col_value:
-                        continue
-                    
-                    if col_typename == "TextColumn":
-                        # Logique spécifique pour la banque
-                        if "banque" in col_label.lower():
-                            # On force le label pour qu'il devienne EXACTEMENT l'ID Grist après normalisation
-                            full_label = "rib a rattacher a la demande ci dessous nom de la banque"
-                        else:
-                            # Pour IBAN, BIC, Titulaire qui fonctionnent déjà
-                            clean_label = col_label.replace('.', '')
-                            full_label = clean_label.replace('–', '').replace('-', ' ')
-
-                        result.append({
-                            "id": col.get("id"),
-                            "numeric_id": None,
-                            "descriptor_id": champ.get("champDescriptorId"),
-                            "decoded_descriptor_id": decoded_descriptor_id,
-                            "label": f"{prefix}{full_label}",
-                            "base_label": full_label,
-                            "type": "TextColumn",
-                            "value": col_value,
-                            "json_value": None,
-                            "updated_at": champ.get("updatedAt"),
-                            "prefilled": champ.get("prefilled", False),
-                            "row_id": original_id if original_id != champ["id"] else None
-                        })
-
-        elif champ["__typename"] == "AddressChamp" and champ.get("address"):
-            address = champ.get("address", {})
-            value = f"{address.get('streetAddress', '')}, {address.get('postalCode', '')} {address.get('cityName', '')}"
-            json_value = address
-            
-            # Ajouter les informations de commune et département si disponibles
-            commune = champ.get("commune")
-            departement = champ.get("departement")
-            if commune or departement:
-                address_extra = {}
-                if commune:
-                    address_extra["commune"] = commune
-                if departement:
-                    address_extra["departement"] = departement
-                json_value = {"address": address, **address_extra}
-        elif champ["__typename"] == "SiretChamp" and champ.get("etablissement"):
-            etablissement = champ.get("etablissement", {})
-            raison_sociale = etablissement.get("entreprise", {}).get("raisonSociale", "")
-            siret = etablissement.get("siret", "")
-            value = f"{siret} - {raison_sociale}" if siret and raison_sociale else siret or raison_sociale
-            json_value = etablissement
-        elif champ["__typename"] == "CarteChamp":
-            # Traitement détaillé pour les champs Carte
-            geo_areas = champ.get("geoAreas", [])
-            
-            # Si pas de zones géographiques, retourner un résultat minimal
-            if not geo_areas:
-                result.append({
-                    "id": champ["id"],
-                    "numeric_id": decode_base64_id(champ["id"]),
-                    "descriptor_id": champ.get("champDescriptorId"),
-                    "decoded_descriptor_id": decoded_descriptor_id,
-                    "label": f"{prefix}{champ['label']}",
-                    "base_label": champ['label'],
-                    "type": champ["__typename"],
-                    "value": "Aucune zone géographique définie",
-                    "json_value": None,
-                    "updated_at": champ.get("updatedAt"),
-                    "prefilled": champ.get("prefilled", False),
-                    "row_id": original_id if original_id != champ["id"] else None
-                })
-            else:
-                # Créer des entrées séparées pour chaque zone géographique
-                for j, geo_area in enumerate(geo_areas):
-                    geo_result = {
-                        "id": champ["id"],
-                        "numeric_id": decode_base64_id(champ["id"]),
-                        "descriptor_id": champ.get("champDescriptorId"),
-                        "decoded_descriptor_id": decoded_descriptor_id,
-                        "label": f"{prefix}{champ['label']}",
-                        "base_label": champ['label'],
-                        "type": champ["__typename"],
-                        
-                        # Champs spécifiques à la zone géographique
-                        "geo_area_id": geo_area.get("id"),
-                        "geo_area_source": geo_area.get("source"),
-                        "geo_area_description": geo_area.get("description"),
-                        "geo_area_geometry_type": geo_area.get("geometry", {}).get("type"),
-                        "geo_area_geometry_coordinates": json.dumps(geo_area.get("geometry", {}).get("coordinates")) if geo_area.get("geometry") else None,
-                        
-                        # Informations supplémentaires pour les parcelles cadastrales
-                        "parcelle_commune": geo_area.get("commune"),
-                        "parcelle_numero": geo_area.get("numero"),
-                        "parcelle_section": geo_area.get("section"),
-                        "parcelle_prefixe": geo_area.get("prefixe"),
-                        "parcelle_surface": geo_area.get("surface"),
-                        
-                        # Valeur textuelle pour compatibilité
-                        "value": f"Zone {j+1}: {geo_area.get('source', '')} - {geo_area.get('description', 'Sans description')}",
-                        "json_value": geo_area,
-                        "updated_at": champ.get("updatedAt"),
-                        "prefilled": champ.get("prefilled", False),
-                        "row_id": original_id if original_id != champ["id"] else None
-                    }
-                    result.append(geo_result)
-        elif champ["__typename"] == "DossierLinkChamp" and champ.get("dossier"):
-            # Traitement pour les liens vers d'autres dossiers
-            linked_dossier = champ.get("dossier", {})
-            dossier_number = linked_dossier.get("number", "")
-            dossier_state = linked_dossier.get("state", "")
-            value = f"Dossier #{dossier_number} ({dossier_state})" if dossier_number else "Aucun dossier lié"
-            json_value = linked_dossier
-        elif champ["__typename"] == "PaysChamp" and champ.get("pays"):
-            # Traitement pour les pays
-            pays = champ.get("pays", {})
-            name = pays.get("name", "")
-            code = pays.get("code", "")
-            value = f"{name} ({code})" if name and code else name or code
-            json_value = pays
-
-            # ✅ NOUVEAU : Ajouter le nom du pays comme champ séparé
-            if name:
-                result.append({
-                    "id": champ.get("id") + "_nom",
-                    "numeric_id": None,
-                    "descriptor_id": champ.get("champDescriptorId"),
-                    "decoded_descriptor_id": decoded_descriptor_id,
-                    "label": f"{prefix}{champ['label']}_nom",
-                    "base_label": f"{champ['label']}_nom",
-                    "type": "TextColumn",
-                    "value": name,
-                    "json_value": None,
-                    "updated_at": champ.get("updatedAt"),
-                    "prefilled": champ.get("prefilled", False),
-                    "row_id": original_id if original_id != champ["id"] else None
-                })
-            
-            # ✅ NOUVEAU : Ajouter le code pays comme champ séparé
-            if code:
-                result.append({
-                    "id": champ.get("id") + "_code",
-                    "numeric_id": None,
-                    "descriptor_id": champ.get("champDescriptorId"),
-                    "decoded_descriptor_id": decoded_descriptor_id,
-                    "label": f"{prefix}{champ['label']}_code",
-                    "base_label": f"{champ['label']}_code",
-                    "type": "TextColumn",
-                    "value": code,
-                    "json_value": None,
-                    "updated_at": champ.get("updatedAt"),
-                    "prefilled": champ.get("prefilled", False),
-                    "row_id": original_id if original_id != champ["id"] else None
-                })
+    return list(_yield_champ_values(champ, prefix, original_id))
 
-        elif champ["__typename"] == "RegionChamp" and champ.get("region"):
-            # Traitement pour les régions
-            region = champ.get("region", {})
-            name = region.get("name", "")
-            code = region.get("code", "")
-            value = f"{name} ({code})" if name and code else name or code
-            json_value = region
-
-             # ✅ NOUVEAU : Ajouter le nom de la région comme champ séparé
-            if name:
-                result.append({
-                    "id": champ.get("id") + "_nom",
-                    "numeric_id": None,
-                    "descriptor_id": champ.get("champDescriptorId"),
-                    "decoded_descriptor_id": decoded_descriptor_id,
-                    "label": f"{prefix}{champ['label']}_nom",
-                    "base_label": f"{champ['label']}_nom",
-                    "type": "TextColumn",
-                    "value": name,
-                    "json_value": None,
-                    "updated_at": champ.get("updatedAt"),
-                    "prefilled": champ.get("prefilled", False),
-                    "row_id": original_id if original_id != champ["id"] else None
-                })
-            
-            # ✅ NOUVEAU : Ajouter le code région comme champ séparé
-            if code:
-                result.append({
-                    "id": champ.get("id") + "_code",
-                    "numeric_id": None,
-                    "descriptor_id": champ.get("champDescriptorId"),
-                    "decoded_descriptor_id": decoded_descriptor_id,
-                    "label": f"{prefix}{champ['label']}_code",
-                    "base_label": f"{champ['label']}_code",
-                    "type": "TextColumn",
-                    "value": code,
-                    "json_value": None,
-                    "updated_at": champ.get("updatedAt"),
-                    "prefilled": champ.get("prefilled", False),
-                    "row_id": original_id if original_id != champ["id"] else None
-                })
+# normalize_column_name vit dans grist_processor_working_all, qui importe ce module :
+# import différé au premier appel, puis conservé au niveau du module
+_normalize_column_name = None
 
-        elif champ["__typename"] == "DepartementChamp" and champ.get("departement"):
-            # Traitement pour les départements
-            departement = champ.get("departement", {})
-            name = departement.get("name", "")
-            code = departement.get("code", "")
-            value = f"{name} ({code})" if name and code else name or code
-            json_value = departement
-
-            # ✅ NOUVEAU : Ajouter le nom du département comme champ séparé
-            if name:
-                result.append({
-                    "id": champ.get("id") + "_nom",
-                    "numeric_id": None,
-                    "descriptor_id": champ.get("champDescriptorId"),
-                    "decoded_descriptor_id": decoded_descriptor_id,
-                    "label": f"{prefix}{champ['label']}_nom",
-                    "base_label": f"{champ['label']}_nom",
-                    "type": "TextColumn",
-                    "value": name,
-                    "json_value": None,
-                    "updated_at": champ.get("updatedAt"),
-                    "prefilled": champ.get("prefilled", False),
-                    "row_id": original_id if original_id != champ["id"] else None
-                })
-            
-            # ✅ NOUVEAU : Ajouter le code département comme champ séparé
-            if code:
-                result.append({
-                    "id": champ.get("id") + "_code",
-                    "numeric_id": None,
-                    "descriptor_id": champ.get("champDescriptorId"),
-                    "decoded_descriptor_id": decoded_descriptor_id,
-                    "label": f"{prefix}{champ['label']}_code",
-                    "base_label": f"{champ['label']}_code",
-                    "type": "TextColumn",
-                    "value": code,
-                    "json_value": None,
-                    "updated_at": champ.get("updatedAt"),
-                    "prefilled": champ.get("prefilled", False),
-                    "row_id": original_id if original_id != champ["id"] else None
-                })
-
-        elif champ["__typename"] == "CommuneChamp" and champ.get("commune"):
-            commune = champ.get("commune", {})
-            name = commune.get("name", "")
-            code_insee = commune.get("code", "")
-            postal_code = commune.get("postalCode", "")
-            value = f"{name} ({postal_code})" if name and postal_code else name
-            
-            departement = champ.get("departement")
-            dept_name = None
-            dept_code = None
-            if departement:
-                dept_name = departement.get("name", "")
-                dept_code = departement.get("code", "")
-                value = f"{value}, {dept_name}" if value and dept_name else value or dept_name
-                
-            json_value = {"commune": commune}
-            if departement:
-                json_value["departement"] = departement
-            
-            # Ajouter le nom de la commune
-            if name:
-                result.append({
-                    "id": champ.get("id") + "_nom",
-                    "numeric_id": None,
-                    "descriptor_id": champ.get("champDescriptorId"),
-                    "decoded_descriptor_id": decoded_descriptor_id,
-                    "label": f"{prefix}{champ['label']}_nom",
-                    "base_label": f"{champ['label']}_nom",
-                    "type": "TextColumn",
-                    "value": name,
-                    "json_value": None,
-                    "updated_at": champ.get("updatedAt"),
-                    "prefilled": champ.get("prefilled", False),
-                    "row_id": original_id if original_id != champ["id"] else None
-                })
+def _get_normalize_column_name() -> Callable[[str], str]:
+    global _normalize_column_name
+    if _normalize_column_name is None:
+        from grist_processor_working_all import normalize_column_name
+        _normalize_column_name = normalize_column_name
+    return _normalize_column_name
 
-            # code_postal
-            if postal_code:
-                result.append({
-                    "id": champ.get("id") + "_code_postal",
-                    "numeric_id": None,
-                    "descriptor_id": champ.get("champDescriptorId"),
-                    "decoded_descriptor_id": decoded_descriptor_id,
-                    "label": f"{prefix}{champ['label']}_code_postal",
-                    "base_label": f"{champ['label']}_code_postal",
-                    "type": "TextColumn",
-                    "value": postal_code,
-                    "json_value": None,
-                    "updated_at": champ.get("updatedAt"),
-                    "prefilled": champ.get("prefilled", False),
-                    "row_id": original_id if original_id != champ["id"] else None
-                })
-            
-            # departement (nom)
-            if dept_name:
-                result.append({
-                    "id": champ.get("id") + "_departement",
-                    "numeric_id": None,
-                    "descriptor_id": champ.get("champDescriptorId"),
-                    "decoded_descriptor_id": decoded_descriptor_id,
-                    "label": f"{prefix}{champ['label']}_departement",
-                    "base_label": f"{champ['label']}_departement",
-                    "type": "TextColumn",
-                    "value": dept_name,
-                    "json_value": None,
-                    "updated_at": champ.get("updatedAt"),
-                    "prefilled": champ.get("prefilled", False),
-                    "row_id": original_id if original_id != champ["id"] else None
-                })
-            
-            # code_insee
-            if code_insee:
-                result.append({
-                    "id": champ.get("id") + "_code_insee",
-                    "numeric_id": None,
-                    "descriptor_id": champ.get("champDescriptorId"),
-                    "decoded_descriptor_id": decoded_descriptor_id,
-                    "label": f"{prefix}{champ['label']}_code_insee",
-                    "base_label": f"{champ['label']}_code_insee",
-                    "type": "TextColumn",
-                    "value": code_insee,
-                    "json_value": None,
-                    "updated_at": champ.get("updatedAt"),
-                    "prefilled": champ.get("prefilled", False),
-                    "row_id": original_id if original_id != champ["id"] else None
-                })
-            
-            # ✅ CODE DÉPARTEMENT - UNE SEULE FOIS
-            if dept_code:
-                result.append({
-                    "id": champ.get("id") + "_code_departement",
-                    "numeric_id": None,
-                    "descriptor_id": champ.get("champDescriptorId"),
-                    "decoded_descriptor_id": decoded_descriptor_id,
-                    "label": f"{prefix}{champ['label']}_code_departement",
-                    "base_label": f"{champ['label']}_code_departement",
-                    "type": "TextColumn",
-                    "value": dept_code,
-                    "json_value": None,
-                    "updated_at": champ.get("updatedAt"),
-                    "prefilled": champ.get("prefilled", False),
-                    "row_id": original_id if original_id != champ["id"] else None
-                })
+# Lecture groupée (un seul appel C) des trois clés utilisées pour chaque valeur de rangée
+_label_value_json = itemgetter("base_label", "value", "json_value")
 
-        elif champ["__typename"] == "EpciChamp" and champ.get("epci"):
-            # Traitement pour les EPCI
-            epci = champ.get("epci", {})
-            name = epci.get("name", "")
-            code = epci.get("code", "")
-            value = f"{name} ({code})" if name and code else name or code
+def _append_repetable_rows(repetable_rows: List[Dict[str, Any]], champ: Dict[str, Any], dossier_number: int,
+                           block_label: str, problematic_ids: Optional[AbstractSet[str]],
+                           normalize_column_name: Callable[[str], str]) -> None:
+    """
+    Traite un champ répétable et ajoute une ligne à repetable_rows pour chacune de ses rangées.
+    Toutes les rangées d'un bloc partagent les mêmes labels : leur normalisation
+    est calculée sur la première rangée puis réutilisée.
+    """
+    normalized_labels = {}
+    
+    for row_index, row in enumerate(champ.get("rows") or _EMPTY_TUP):
+        row_id = row.get("id")
+        row_data = {
+            "dossier_number": dossier_number,
+            "block_label": block_label,
+            "block_row_index": row_index + 1,
+            "block_row_id": row_id
+        }
+        
+        # ✅ NOUVEAU : Compteur pour les doublons dans cette ligne
+        row_label_counters = {}
+        
+        # Traiter chaque champ dans la rangée
+        for row_champ in row.get("champs") or _EMPTY_TUP:
+            # ✅ FIX : Filtrer les champs problématiques dans les blocs répétables
+            if (row_champ["__typename"] in _SKIP_TYPES or 
+                (problematic_ids and row_champ.get("champDescriptorId") in problematic_ids)):
+                continue
             
-            # Ajouter le département si disponible
-            departement = champ.get("departement")
-            if departement:
-                dept_name = departement.get("name", "")
-                value = f"{value}, {dept_name}" if value and dept_name else value or dept_name
+            # Extraire les valeurs du champ et les ajouter à la ligne avec gestion des doublons
+            for champ_value in _yield_champ_values(row_champ, "", row_id):
+                base_label, value, json_value = _label_value_json(champ_value)
+                normalized = normalized_labels.get(base_label)
+                if normalized is None:
+                    normalized = normalized_labels[base_label] = normalize_column_name(base_label)
                 
-            json_value = {"epci": epci}
-            if departement:
-                json_value["departement"] = departement
-        elif champ["__typename"] == "RNFChamp" and champ.get("rnf"):
-            # Traitement pour les RNF
-            rnf = champ.get("rnf", {})
-            title = rnf.get("title", "")
-            rnf_address = rnf.get("address", {})
-            city_name = rnf_address.get("cityName", "")
-            postal_code = rnf_address.get("postalCode", "")
-            
-            if title:
-                if city_name and postal_code:
-                    value = f"{title} - {city_name} ({postal_code})"
+                # Gérer les doublons
+                if normalized in row_label_counters:
+                    row_label_counters[normalized] += 1
+                    final_label = f"{base_label}_{row_label_counters[normalized]}"
                 else:
-                    value = title
-            else:
-                value = ""
+                    row_label_counters[normalized] = 0
+                    final_label = base_label
                 
-            # Ajouter commune et département si disponibles
-            commune = champ.get("commune")
-            departement = champ.get("departement")
-            
-            json_value = {"rnf": rnf}
-            if commune:
-                json_value["commune"] = commune
-            if departement:
-                json_value["departement"] = departement
-        elif champ["__typename"] == "EngagementJuridiqueChamp" and champ.get("engagementJuridique"):
-            # Traitement pour les engagements juridiques
-            engagement = champ.get("engagementJuridique", {})
-            montant_engage = engagement.get("montantEngage")
-            montant_paye = engagement.get("montantPaye")
-            
-            value = ""
-            if montant_engage is not None:
-                value = f"Montant engagé: {montant_engage}"
-            if montant_paye is not None:
-                value = f"{value}, Montant payé: {montant_paye}" if value else f"Montant payé: {montant_paye}"
+                row_data[final_label] = value
                 
-            json_value = engagement
-        else:
-            # Pour les autres types, utiliser la valeur textuelle
-            value = champ.get("stringValue")
-        
-        # Ne pas ajouter de résultat pour les types HeaderSectionChamp et ExplicationChamp 
-        # (redondant car déjà filtré au début, mais mieux vaut être prudent)
-        if champ["__typename"] in ["HeaderSectionChamp", "ExplicationChamp"]:
-            return result
-            
-        # Extraction des identifiants pour correspondance
-        raw_id = champ["id"]
-        numeric_id = None
-        
-        # Tentative d'extraction d'un ID numérique
-        if "/" in raw_id:
-            parts = raw_id.split("/")
-            if len(parts) >= 4 and parts[-2] == "Champ":
-                numeric_id = parts[-1]
-        else:
-            numeric_id = decode_base64_id(raw_id)
+                # Ajouter la valeur JSON si elle existe
+                if json_value is not None:
+                    row_data[f"{final_label}_json"] = format_complex_json_for_grist(json_value)
         
-        # Ajout du résultat
-        result.append({
-            "id": raw_id,
-            "numeric_id": numeric_id,
-            "descriptor_id": champ.get("champDescriptorId"),
-            "decoded_descriptor_id": decoded_descriptor_id,
-            "label": f"{prefix}{champ['label']}",
-            "base_label": champ['label'],  # Label sans préfixe de bloc répétable
-            "type": champ["__typename"],
-            "value": value,
-            "json_value": json_value,
-            "updated_at": champ.get("updatedAt"),
-            "prefilled": champ.get("prefilled", False),
-            "row_id": original_id if original_id != champ["id"] else None  # ID de la rangée pour les blocs répétables
-        })
-    
-    return result
+        repetable_rows.append(row_data)
 
-def extract_repetable_blocks(dossier_data: Dict[str, Any], problematic_ids=None) -> List[Dict[str, Any]]:
+def extract_repetable_blocks(dossier_data: Dict[str, Any], problematic_ids: Optional[AbstractSet[str]] = None) -> List[Dict[str, Any]]:
     """
     Extrait les données des blocs répétables dans un format de tableau.
     
@@ -591,64 +646,22 @@ def extract_repetable_blocks(dossier_data: Dict[str, Any], problematic_ids=None)
     Returns:
         Liste de dictionnaires représentant chaque ligne de bloc répétable
     """
-    from grist_processor_working_all import normalize_column_name
+    normalize_column_name = _get_normalize_column_name()
     
     repetable_rows = []
-    
-    def process_repetable_champ(champ: Dict[str, Any], dossier_number: int, block_label: str):
-        """
-        Traite un champ répétable et extrait ses données.
-        """
-        if champ["__typename"] == "RepetitionChamp":
-            for row_index, row in enumerate(champ.get("rows", [])):
-                row_data = {
-                    "dossier_number": dossier_number,
-                    "block_label": block_label,
-                    "block_row_index": row_index + 1,
-                    "block_row_id": row.get("id")
-                }
-                
-                # ✅ NOUVEAU : Compteur pour les doublons dans cette ligne
-                row_label_counters = {}
-                
-                # Traiter chaque champ dans la rangée
-                for row_champ in row.get("champs", []):
-                    # ✅ FIX : Filtrer les champs problématiques dans les blocs répétables
-                    if (row_champ["__typename"] in ["HeaderSectionChamp", "ExplicationChamp"] or 
-                        (problematic_ids and row_champ.get("champDescriptorId") in problematic_ids)):
-                        continue
-                    
-                    # Extraire les valeurs du champ
-                    champ_values = extract_champ_values(row_champ, "", row.get("id"))
-                    
-                    # Ajouter chaque valeur de champ à la ligne avec gestion des doublons
-                    for champ_value in champ_values:
-                        base_label = champ_value["base_label"]
-                        normalized = normalize_column_name(base_label)
-                        
-                        # Gérer les doublons
-                        if normalized in row_label_counters:
-                            row_label_counters[normalized] += 1
-                            final_label = f"{base_label}_{row_label_counters[normalized]}"
-                        else:
-                            row_label_counters[normalized] = 0
-                            final_label = base_label
-                        
-                        row_data[final_label] = champ_value["value"]
-                        
-                        # Ajouter la valeur JSON si elle existe
-                        if champ_value["json_value"] is not None:
-                            row_data[f"{final_label}_json"] = format_complex_json_for_grist(champ_value["json_value"])
-                
-                repetable_rows.append(row_data)
+    dossier_number = dossier_data["number"]
     
     # Parcourir les champs du dossier
-    for champ in dossier_data.get("champs", []):
-        process_repetable_champ(champ, dossier_data["number"], champ["label"])
+    for champ in dossier_data.get("champs") or _EMPTY_TUP:
+        if champ["__typename"] == _REPETITION:
+            _append_repetable_rows(repetable_rows, champ, dossier_number, champ["label"],
+                                   problematic_ids, normalize_column_name)
     
     # Parcourir les annotations (si nécessaire)
-    for annotation in dossier_data.get("annotations", []):
-        process_repetable_champ(annotation, dossier_data["number"], f"annotation_{annotation['label']}")
+    for annotation in dossier_data.get("annotations") or _EMPTY_TUP:
+        if annotation["__typename"] == _REPETITION:
+            _append_repetable_rows(repetable_rows, annotation, dossier_number, f"annotation_{annotation['label']}",
+                                   problematic_ids, normalize_column_name)
     
     return repetable_rows
 
@@ -666,12 +679,12 @@ def extract_demandeur_info(dossier_data: Dict[str, Any]) -> Dict[str, Any]:
     }
     
     # Informations communes à tous les types de demandeurs
-    demandeur_info["usager_email"] = dossier_data.get("usager", {}).get("email", "")
+    demandeur_info["usager_email"] = (dossier_data.get("usager") or _EMPTY_DICT).get("email", "")
     demandeur_info["prenom_mandataire"] = dossier_data.get("prenomMandataire", "")
     demandeur_info["nom_mandataire"] = dossier_data.get("nomMandataire", "")
     demandeur_info["depose_par_un_tiers"] = dossier_data.get("deposeParUnTiers", False)
     
-    demandeur = dossier_data.get("demandeur", {})
+    demandeur = dossier_data.get("demandeur") or _EMPTY_DICT
     if not demandeur:
         return demandeur_info
     
@@ -701,7 +714,9 @@ def extract_instructeurs_from_demarche(demarche_number: int) -> List[Dict[str, A
     Returns:
         Liste de dictionnaires, 1 par instructeur
     """
-    from queries_config import API_TOKEN, API_URL
+    from queries_config import get_api_config
+    from queries_graphql import get_session_with_retries, parse_json_response
+    api_token, api_url = get_api_config()
     
     query = """
     query getDemarche($demarcheNumber: Int!) {
@@ -720,12 +735,11 @@ def extract_instructeurs_from_demarche(demarche_number: int) -> List[Dict[str, A
     """
     
     headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
-        "Content-Type": "application/json"
+        "Authorization": f"Bearer {api_token}",
     }
     
-    response = requests.post(
-        API_URL,
+    response = get_session_with_retries().post(
+        api_url,
         json={"query": query, "variables": {"demarcheNumber": demarche_number}},
         headers=headers
     )
@@ -733,13 +747,13 @@ def extract_instructeurs_from_demarche(demarche_number: int) -> List[Dict[str, A
     if response.status_code != 200:
         return []
     
-    result = response.json()
-    demarche = result.get('data', {}).get('demarche', {})
-    groupes = demarche.get('groupeInstructeurs', [])
+    result = parse_json_response(response)
+    demarche = (result.get('data') or _EMPTY_DICT).get('demarche') or _EMPTY_DICT
+    groupes = demarche.get('groupeInstructeurs') or _EMPTY_TUP
     
     instructeurs_list = []
     for groupe in groupes:
-        for instructeur in groupe.get('instructeurs', []):
+        for instructeur in groupe.get('instructeurs') or _EMPTY_TUP:
             instructeurs_list.append({
                 "groupe_instructeur_id": groupe.get('id'),
                 "groupe_instructeur_number": groupe.get('number'),
@@ -750,7 +764,8 @@ def extract_instructeurs_from_demarche(demarche_number: int) -> List[Dict[str, A
     
     return instructeurs_list
 
-def dossier_to_flat_data(dossier_data: Dict[str, Any], exclude_repetition_champs=True, problematic_ids=None) -> Dict[str, Any]:
+def dossier_to_flat_data(dossier_data: Dict[str, Any], exclude_repetition_champs: bool = True,
+                         problematic_ids: Optional[AbstractSet[str]] = None) -> Dict[str, Any]:
     """
     Transforme les données d'un dossier en un format plat pour faciliter l'intégration.
     Version modifiée pour exclure les blocs répétables si demandé.
@@ -763,7 +778,7 @@ def dossier_to_flat_data(dossier_data: Dict[str, Any], exclude_repetition_champs
     Returns:
         Dictionnaire avec les données du dossier en format plat
     """
-    from grist_processor_working_all import normalize_column_name
+    normalize_column_name = _get_normalize_column_name()
     
     # Informations de base du dossier
     flat_data = {
@@ -804,25 +819,31 @@ def dossier_to_flat_data(dossier_data: Dict[str, Any], exclude_repetition_champs
 
     # ✅ NOUVEAU : Compteur pour gérer les doublons de labels
     label_counters = {}
+    dossier_number = dossier_data["number"]
+    
+    # Un seul parcours des champs puis des annotations : les lignes des blocs
+    # répétables sont extraites au passage (même ordre qu'extract_repetable_blocks)
+    repetable_rows = []
     
     # Extraction des valeurs des champs, en filtrant les blocs répétables si demandé
     champ_values = []
-    for champ in dossier_data.get("champs", []):
-        # Ignorer les blocs répétables si exclude_repetition_champs est True
-        if exclude_repetition_champs and champ["__typename"] == "RepetitionChamp":
-            continue
+    for champ in dossier_data.get("champs") or _EMPTY_TUP:
+        if champ["__typename"] == _REPETITION:
+            # ✅ FIX : problematic_ids filtre les champs des rangées
+            _append_repetable_rows(repetable_rows, champ, dossier_number, champ["label"],
+                                   problematic_ids, normalize_column_name)
+            # Ignorer les blocs répétables si exclude_repetition_champs est True
+            if exclude_repetition_champs:
+                continue
         
         # ✅ FIX PRINCIPAL : Vérifier champDescriptorId au lieu de id
         # Ignorer les champs problématiques par type et par champDescriptorId
-        if (champ["__typename"] in ["HeaderSectionChamp", "ExplicationChamp"] or 
+        if (champ["__typename"] in _SKIP_TYPES or 
             (problematic_ids and champ.get("champDescriptorId") in problematic_ids)):
             continue
         
-        # Extraire les valeurs
-        extracted = extract_champ_values(champ)
-        
-        # ✅ NOUVEAU : Appliquer les suffixes pour les doublons
-        for item in extracted:
+        # Extraire les valeurs et appliquer les suffixes pour les doublons
+        for item in _yield_champ_values(champ):
             base_label = item["base_label"]
             normalized = normalize_column_name(base_label)
             
@@ -833,29 +854,29 @@ def dossier_to_flat_data(dossier_data: Dict[str, Any], exclude_repetition_champs
             else:
                 label_counters[normalized] = 0
                 item["label"] = base_label
-        
-        champ_values.extend(extracted)
+            
+            champ_values.append(item)
     
     # Ajouter les annotations, également en filtrant les blocs répétables si demandé
     annotation_values = []
     annotation_label_counters = {}  # Compteur séparé pour les annotations
     
-    for annotation in dossier_data.get("annotations", []):
-        # Ignorer les blocs répétables si exclude_repetition_champs est True
-        if exclude_repetition_champs and annotation["__typename"] == "RepetitionChamp":
-            continue
+    for annotation in dossier_data.get("annotations") or _EMPTY_TUP:
+        if annotation["__typename"] == _REPETITION:
+            _append_repetable_rows(repetable_rows, annotation, dossier_number, f"annotation_{annotation['label']}",
+                                   problematic_ids, normalize_column_name)
+            # Ignorer les blocs répétables si exclude_repetition_champs est True
+            if exclude_repetition_champs:
+                continue
         
         # ✅ FIX PRINCIPAL : Vérifier champDescriptorId au lieu de id
         # Ignorer explicitement les annotations de type HeaderSectionChamp et ExplicationChamp
-        if (annotation["__typename"] in ["HeaderSectionChamp", "ExplicationChamp"] or
+        if (annotation["__typename"] in _SKIP_TYPES or
             (problematic_ids and annotation.get("champDescriptorId") in problematic_ids)):
             continue
         
-        # Extraire les valeurs
-        extracted = extract_champ_values(annotation, prefix="annotation_")
-        
-        # ✅ NOUVEAU : Appliquer les suffixes pour les doublons
-        for item in extracted:
+        # Extraire les valeurs et appliquer les suffixes pour les doublons
+        for item in _yield_champ_values(annotation, prefix="annotation_"):
             base_label = item["base_label"]
             # Enlever le préfixe "annotation_" si présent pour la normalisation
             label_for_normalization = base_label
@@ -877,12 +898,9 @@ def dossier_to_flat_data(dossier_data: Dict[str, Any], exclude_repetition_champs
                 # Garder le label tel quel (avec annotation_ si déjà présent)
                 if not base_label.startswith("annotation_"):
                     item["label"] = f"annotation_{base_label}"
-        
-        annotation_values.extend(extracted)
+            
+            annotation_values.append(item)
     
-    # Extraction des blocs répétables
-    # ✅ FIX : Passer problematic_ids à extract_repetable_blocks
-    repetable_rows = extract_repetable_blocks(dossier_data, problematic_ids=problematic_ids)
     # ✅ NOUVELLE LIGNE
     demandeur_info = extract_demandeur_info(dossier_data)
 
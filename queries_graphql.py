@@ -1,10 +1,35 @@
 import requests
 import json
+import logging
+import os
+import re
+import threading
 from requests.adapters import HTTPAdapter  # ✅ NOUVEAU
 from urllib3.util.retry import Retry  # ✅ NOUVEAU
+from urllib3.util import make_headers
 import time  # ✅ NOUVEAU
-from typing import Dict, Any, List, Optional
-from queries_config import API_TOKEN, API_URL
+import concurrent.futures
+import functools
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from operator import itemgetter
+from typing import Callable, Dict, Any, List, Optional
+from queries_config import get_api_config
+
+# orjson (optionnel) : décodage nettement plus rapide des grosses réponses GraphQL
+try:
+    import orjson
+    _json_loads = orjson.loads
+    _json_dumps_bytes = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps_bytes(value):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+# Traces détaillées (pages, exemples de résultats) : niveau DEBUG, formatées uniquement si
+# ce niveau est actif. Les bilans de chaque appel restent affichés.
+logger = logging.getLogger(__name__)
 
 # Requêtes GraphQL (fragmentées en quelques constantes)
 # Pour les fragments communs
@@ -488,10 +513,6 @@ fragment ChampDescriptorFragment on ChampDescriptor {
             ...FileFragment
         }
     }
-    ... on ExplicationChampDescriptor {
-        collapsibleExplanationEnabled
-        collapsibleExplanationText
-    }
 }
 
 fragment DossierFragment on Dossier {
@@ -547,9 +568,127 @@ fragment DossierFragment on Dossier {
 
 """ + COMMON_FRAGMENTS + SPECIALIZED_FRAGMENTS + CHAMP_FRAGMENTS
 
+# Champs purement décoratifs (sections, explications) écartés des réponses : GraphQL ne
+# permet pas d'exclure un type d'une liste côté serveur, ils sont filtrés à la réception
+_SKIP_CHAMP_TYPENAMES = frozenset({"HeaderSectionChamp", "ExplicationChamp"})
+_SKIP_DESCRIPTOR_TYPENAMES = frozenset({"HeaderSectionChampDescriptor", "ExplicationChampDescriptor"})
+
+def _without_skipped(items: List[Dict[str, Any]], skipped_typenames: frozenset) -> List[Dict[str, Any]]:
+    """
+    Retire d'une liste de champs ou de descripteurs les types décoratifs.
+    """
+    return [item for item in items if item.get("__typename") not in skipped_typenames]
+
+def _compact_query(query: str) -> str:
+    """
+    Retire commentaires (#) et indentation d'une requête GraphQL.
+    Nos requêtes ne contiennent aucune chaîne littérale, où # et les espaces compteraient.
+    """
+    return " ".join(re.sub(r"#[^\n]*", "", query).split())
+
+def _query_body_prefix(query: str) -> bytes:
+    """
+    Début du corps JSON d'une requête ({"query": ..., "variables": ), encodé une seule fois.
+    """
+    return ('{"query":' + json.dumps(_compact_query(query)) + ',"variables":').encode()
+
+def _graphql_body(body_prefix: bytes, variables: Dict[str, Any]) -> bytes:
+    """
+    Corps JSON complet : seul le dictionnaire des variables est sérialisé à chaque appel.
+    """
+    return body_prefix + _json_dumps_bytes(variables) + b"}"
+
+_DOSSIER_BODY_PREFIX = _query_body_prefix(query_get_dossier)
+_DEMARCHE_BODY_PREFIX = _query_body_prefix(query_get_demarche)
+
+# Requêtes groupées : plusieurs dossiers dans une même opération, un alias (d0, d1...) par
+# dossier. La taille des lots borne la complexité de chaque requête côté DS.
+DS_DOSSIER_BATCH_SIZE = int(os.getenv("DS_DOSSIER_BATCH_SIZE", "20"))
+_DOSSIER_FRAGMENTS = query_get_dossier[query_get_dossier.index("fragment DemarcheDescriptorFragment"):]
+
+@functools.lru_cache(maxsize=None)
+def _dossiers_batch_body_prefix(count: int) -> bytes:
+    """
+    Préfixe du corps d'une requête regroupant `count` dossiers ($n0..$n{count-1}).
+    """
+    params = " ".join(f"$n{i}: Int!" for i in range(count))
+    selections = " ".join(
+        f"d{i}: dossier(number: $n{i}) {{ ...DossierFragment demarche {{ ...DemarcheDescriptorFragment }} }}"
+        for i in range(count)
+    )
+    query = (
+        f"query getDossiers({params} $includeChamps: Boolean = true $includeAnotations: Boolean = true "
+        "$includeGeometry: Boolean = true $includeTraitements: Boolean = true "
+        f"$includeInstructeurs: Boolean = true) {{ {selections} }}\n" + _DOSSIER_FRAGMENTS
+    )
+    return _query_body_prefix(query)
+
 # ✅ SESSION GLOBALE (créée une seule fois)
 _session = None
 
+class TokenBucket:
+    """
+    Limiteur de débit simple (seau à jetons), partagé entre threads.
+    acquire() ne bloque que lorsque le seau est vide.
+    """
+    
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+# Débit maximal de requêtes DS par token (0 : illimité), appliqué à chaque requête HTTP
+# envoyée par la session partagée ; le gestionnaire multi-démarches le fixe via
+# set_api_rate_limit (sync.api_rate_per_second)
+DS_API_RATE_PER_SECOND = float(os.getenv("DS_API_RATE_PER_SECOND", "0"))
+_rate_buckets = {}
+_rate_buckets_lock = threading.Lock()
+
+def set_api_rate_limit(rate_per_second: float) -> None:
+    """
+    Fixe le débit maximal de requêtes DS par token (0 ou moins : illimité).
+    """
+    global DS_API_RATE_PER_SECOND
+    with _rate_buckets_lock:
+        DS_API_RATE_PER_SECOND = float(rate_per_second)
+        _rate_buckets.clear()
+
+def _acquire_rate_limit(authorization) -> None:
+    """
+    Attend si le budget de requêtes du token (en-tête Authorization) est épuisé.
+    """
+    if DS_API_RATE_PER_SECOND <= 0:
+        return
+    with _rate_buckets_lock:
+        bucket = _rate_buckets.get(authorization)
+        if bucket is None:
+            bucket = _rate_buckets[authorization] = TokenBucket(
+                rate=DS_API_RATE_PER_SECOND, capacity=max(1, int(DS_API_RATE_PER_SECOND))
+            )
+    bucket.acquire()
+
+class _RateLimitedAdapter(HTTPAdapter):
+    """
+    Adaptateur HTTP qui applique le débit maximal par token avant chaque envoi.
+    """
+    def send(self, request, *args, **kwargs):
+        _acquire_rate_limit(request.headers.get("Authorization"))
+        return super().send(request, *args, **kwargs)
+
 def get_session_with_retries():
     """
     Retourne une session HTTP avec retry (singleton).
@@ -569,43 +708,141 @@ def get_session_with_retries():
             raise_on_status=False
         )
         
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        # Pool dimensionné pour les workers parallèles (connexions keep-alive réutilisées)
+        # et débit limité par token (voir DS_API_RATE_PER_SECOND)
+        adapter = _RateLimitedAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry_strategy)
         _session.mount("https://", adapter)
         _session.mount("http://", adapter)
+        # En-têtes communs posés une fois ; le token reste par appel (propre à chaque démarche).
+        # Accept-Encoding annonce toutes les compressions décodables ici (gzip, deflate,
+        # et br/zstd si brotli/zstandard sont installés) : les pages de dossiers sont très compressibles
+        _session.headers.update({
+            "Content-Type": "application/json",
+            "Accept-Encoding": make_headers(accept_encoding=True)["accept-encoding"],
+        })
     
     return _session
 
+def _auth_headers(api_token):
+    """
+    En-têtes propres à un appel : seul le token varie (configuration du contexte courant).
+    """
+    return {"Authorization": f"Bearer {api_token}"}
+
+def parse_json_response(response):
+    """
+    Décode le corps JSON d'une réponse HTTP (orjson si disponible, sinon json).
+    """
+    return _json_loads(response.content)
+
+# Réponses DS déjà filtrées, gardées en mémoire le temps d'une synchronisation : la
+# liste des dossiers et la démarche sont redemandées ensuite à l'identique.
+# {clé: (horodatage, JSON sérialisé)} dans l'ordre LRU ; chaque lecture renvoie une
+# copie indépendante. DS_QUERY_CACHE_TTL <= 0 désactive le cache, DS_QUERY_CACHE_MAX_BYTES
+# borne la taille totale des entrées. Les réponses par dossier (dossier, geojson) ne sont
+# mises en cache que si DS_QUERY_CACHE_DOSSIERS=true : chacune n'est relue qu'une fois.
+DS_QUERY_CACHE_TTL = float(os.getenv("DS_QUERY_CACHE_TTL", "300"))
+DS_QUERY_CACHE_MAX_BYTES = int(os.getenv("DS_QUERY_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+DS_QUERY_CACHE_DOSSIERS = os.getenv("DS_QUERY_CACHE_DOSSIERS", "false").lower() == "true"
+_PER_DOSSIER_CACHE_KINDS = frozenset(("dossier", "geojson"))
+_query_cache = OrderedDict()
+_query_cache_bytes = 0
+_query_cache_lock = threading.Lock()
+
+def _cache_enabled(key):
+    """
+    Indique si ce type de réponse peut être mis en cache.
+    """
+    if DS_QUERY_CACHE_TTL <= 0:
+        return False
+    return DS_QUERY_CACHE_DOSSIERS or key[0] not in _PER_DOSSIER_CACHE_KINDS
+
+def _cache_get(key):
+    """
+    Retourne une copie du résultat mis en cache pour cette clé, ou None (absent ou expiré).
+    """
+    if not _cache_enabled(key):
+        return None
+    with _query_cache_lock:
+        cached = _query_cache.get(key)
+        if cached is None or time.time() - cached[0] >= DS_QUERY_CACHE_TTL:
+            return None
+        _query_cache.move_to_end(key)
+    return _json_loads(cached[1])
+
+def _cache_put(key, value):
+    """
+    Met en cache un résultat (les résultats vides, dossiers inaccessibles, ne le sont pas),
+    après avoir retiré les entrées expirées puis les moins récemment utilisées au-delà de
+    DS_QUERY_CACHE_MAX_BYTES.
+    """
+    global _query_cache_bytes
+    if not value or not _cache_enabled(key):
+        return
+    payload = _json_dumps_bytes(value)
+    if len(payload) > DS_QUERY_CACHE_MAX_BYTES:
+        return
+    now = time.time()
+    with _query_cache_lock:
+        previous = _query_cache.pop(key, None)
+        if previous is not None:
+            _query_cache_bytes -= len(previous[1])
+        expired = [k for k, (stored_at, _) in _query_cache.items() if now - stored_at >= DS_QUERY_CACHE_TTL]
+        for expired_key in expired:
+            _query_cache_bytes -= len(_query_cache.pop(expired_key)[1])
+        while _query_cache and _query_cache_bytes + len(payload) > DS_QUERY_CACHE_MAX_BYTES:
+            _query_cache_bytes -= len(_query_cache.popitem(last=False)[1][1])
+        _query_cache[key] = (now, payload)
+        _query_cache_bytes += len(payload)
+
+def clear_query_cache():
+    """
+    Vide le cache des réponses DS (données modifiées côté DS pendant l'exécution).
+    """
+    global _query_cache_bytes
+    with _query_cache_lock:
+        _query_cache.clear()
+        _query_cache_bytes = 0
+
 # Fonctions d'API
-def get_dossier(dossier_number: int) -> Dict[str, Any]:
+def get_dossier(dossier_number: int, force_refresh: bool = False,
+                include_traitements: bool = True) -> Dict[str, Any]:
     """
     Récupère les détails d'un dossier avec tous ses champs.
     Filtre les champs HeaderSectionChamp et ExplicationChamp.
     Ignore les erreurs de permission.
+    
+    force_refresh : ignore le cache et interroge l'API.
+    include_traitements : demande l'historique des traitements (inutile à la synchronisation).
     """
-    if not API_TOKEN:
+    api_token, api_url = get_api_config()
+    if not api_token:
         raise ValueError("Le token d'API n'est pas configuré. Définissez DEMARCHES_API_TOKEN dans le fichier .env")
     
+    cache_key = ("dossier", api_url, api_token, dossier_number, include_traitements)
+    if not force_refresh:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+    
     # Variables pour la requête
     variables = {
         "dossierNumber": dossier_number,
         "includeChamps": True,
         "includeAnotations": True,
         "includeGeometry": True,
-        "includeTraitements": True,
+        "includeTraitements": include_traitements,
         "includeInstructeurs": True,
     }
     
     # En-têtes pour la requête
-    headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
-        "Content-Type": "application/json"
-    }
+    headers = _auth_headers(api_token)
     
     # Exécution de la requête
     session = get_session_with_retries()
     response = session.post(
-        API_URL,
-        json={"query": query_get_dossier, "variables": variables},
+        api_url,
+        data=_graphql_body(_DOSSIER_BODY_PREFIX, variables),
         headers=headers
     )
     
@@ -613,7 +850,7 @@ def get_dossier(dossier_number: int) -> Dict[str, Any]:
     response.raise_for_status()
     
     # Analyse de la réponse JSON
-    result = response.json()
+    result = parse_json_response(response)
     
     # Vérifier les erreurs mais ne pas s'arrêter pour les erreurs de permission
     if "errors" in result:
@@ -641,35 +878,121 @@ def get_dossier(dossier_number: int) -> Dict[str, Any]:
         print(f"Attention: Le dossier {dossier_number} n'est pas accessible ou n'existe pas")
         return {}
     
-    dossier = result["data"]["dossier"]
+    # Filtrer les champs indésirables (sur place : la réponse n'est pas réutilisée)
+    dossier = _filter_dossier_champs(result["data"]["dossier"])
+    
+    _cache_put(cache_key, dossier)
+    return dossier
+
+def _filter_dossier_champs(dossier: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Retire (sur place) les champs et annotations décoratifs d'un dossier, et le retourne.
+    """
+    for key in ("champs", "annotations"):
+        if key in dossier:
+            dossier[key] = _without_skipped(dossier[key], _SKIP_CHAMP_TYPENAMES)
+    return dossier
+
+def get_dossiers_batch(dossier_numbers: List[int], batch_size: int = None,
+                       include_traitements: bool = True) -> Dict[int, Dict[str, Any]]:
+    """
+    Récupère plusieurs dossiers en regroupant jusqu'à batch_size dossiers par requête
+    (DS_DOSSIER_BATCH_SIZE par défaut) au lieu d'une requête par dossier.
+    include_traitements : comme pour get_dossier.
+    Même filtrage, même cache et même tolérance aux erreurs de permission que get_dossier ;
+    les dossiers inaccessibles sont absents du résultat.
     
-    # Filtrer les champs indésirables
-    filtered_dossier = dossier.copy()
+    Returns:
+        dict: {numéro de dossier: dossier}
+    """
+    api_token, api_url = get_api_config()
+    if not api_token:
+        raise ValueError("Le token d'API n'est pas configuré. Définissez DEMARCHES_API_TOKEN dans le fichier .env")
+    batch_size = batch_size or DS_DOSSIER_BATCH_SIZE
     
-    # Filtrer les champs
-    if "champs" in filtered_dossier:
-        filtered_dossier["champs"] = [
-            champ for champ in filtered_dossier["champs"] 
-            if champ.get("__typename") not in ["HeaderSectionChamp", "ExplicationChamp"]
-        ]
+    results = {}
+    to_fetch = []
+    for dossier_number in dossier_numbers:
+        cached = _cache_get(("dossier", api_url, api_token, dossier_number, include_traitements))
+        if cached is not None:
+            results[dossier_number] = cached
+        else:
+            to_fetch.append(dossier_number)
     
-    # Filtrer les annotations
-    if "annotations" in filtered_dossier:
-        filtered_dossier["annotations"] = [
-            annotation for annotation in filtered_dossier["annotations"] 
-            if annotation.get("__typename") not in ["HeaderSectionChamp", "ExplicationChamp"]
-        ]
+    headers = _auth_headers(api_token)
+    session = get_session_with_retries()
     
-    return filtered_dossier
+    for start in range(0, len(to_fetch), batch_size):
+        chunk = to_fetch[start:start + batch_size]
+        response = session.post(
+            api_url,
+            data=_graphql_body(
+                _dossiers_batch_body_prefix(len(chunk)),
+                {
+                    "includeTraitements": include_traitements,
+                    **{f"n{i}": dossier_number for i, dossier_number in enumerate(chunk)}
+                }
+            ),
+            headers=headers
+        )
+        response.raise_for_status()
+        result = parse_json_response(response)
+        
+        # Erreurs rattachées à leur alias par le premier élément de leur chemin. Une erreur
+        # hors permissions fait reprendre le dossier seul (get_dossier la signale ou lève
+        # comme d'habitude) ; sans chemin, elle concerne tout le lot (complexité...).
+        permission_errors = {}
+        retry_aliases = set()
+        retry_all = False
+        for error in result.get("errors") or ():
+            path = error.get("path") or ()
+            alias = path[0] if path else None
+            if "permissions" in error.get("message", ""):
+                permission_errors[alias] = permission_errors.get(alias, 0) + 1
+            elif alias is None:
+                retry_all = True
+            else:
+                retry_aliases.add(alias)
+        
+        data = result.get("data") or {}
+        for i, dossier_number in enumerate(chunk):
+            alias = f"d{i}"
+            if retry_all or alias in retry_aliases:
+                dossier = get_dossier(dossier_number, force_refresh=True, include_traitements=include_traitements)
+                if dossier:
+                    results[dossier_number] = dossier
+                continue
+            
+            if alias in permission_errors:
+                print(f"Attention: Le dossier {dossier_number} a {permission_errors[alias]} erreurs de permission")
+            dossier = data.get(alias)
+            if not dossier:
+                print(f"Attention: Le dossier {dossier_number} n'est pas accessible ou n'existe pas")
+                continue
+            
+            dossier = _filter_dossier_champs(dossier)
+            _cache_put(("dossier", api_url, api_token, dossier_number, include_traitements), dossier)
+            results[dossier_number] = dossier
+    
+    return results
 
-def get_demarche(demarche_number: int) -> Dict[str, Any]:
+def get_demarche(demarche_number: int, force_refresh: bool = False) -> Dict[str, Any]:
     """
     Récupère les détails d'une démarche avec tous ses dossiers accessibles.
     Ignore les erreurs de permission sur certains dossiers ou champs.
+    
+    force_refresh : ignore le cache et interroge l'API.
     """
-    if not API_TOKEN:
+    api_token, api_url = get_api_config()
+    if not api_token:
         raise ValueError("Le token d'API n'est pas configuré. Définissez DEMARCHES_API_TOKEN dans le fichier .env")
     
+    cache_key = ("demarche", api_url, api_token, demarche_number)
+    if not force_refresh:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+    
     # Variables pour la requête
     variables = {
         "demarcheNumber": demarche_number,
@@ -682,20 +1005,17 @@ def get_demarche(demarche_number: int) -> Dict[str, Any]:
         "includeInstructeurs": True,
     }
     
-    headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
-        "Content-Type": "application/json"
-    }
+    headers = _auth_headers(api_token)
     # Exécution de la requête avec retry automatique
     session = get_session_with_retries()
     response = session.post(
-        API_URL,
-        json={"query": query_get_demarche, "variables": variables},
+        api_url,
+        data=_graphql_body(_DEMARCHE_BODY_PREFIX, variables),
         headers=headers
     )
     
     response.raise_for_status()
-    result = response.json()
+    result = parse_json_response(response)
     
     # Ignorer les erreurs spécifiques liées aux permissions
     if "errors" in result:
@@ -728,19 +1048,11 @@ def get_demarche(demarche_number: int) -> Dict[str, Any]:
     if "activeRevision" in demarche and demarche["activeRevision"]:
         active_revision = demarche["activeRevision"]
         
-        # Filtrer les descripteurs de champs
-        if "champDescriptors" in active_revision:
-            active_revision["champDescriptors"] = [
-                descriptor for descriptor in active_revision["champDescriptors"]
-                if descriptor.get("type") not in ["HeaderSectionChamp", "ExplicationChamp"]
-            ]
-        
-        # Filtrer les descripteurs d'annotations
-        if "annotationDescriptors" in active_revision:
-            active_revision["annotationDescriptors"] = [
-                descriptor for descriptor in active_revision["annotationDescriptors"]
-                if descriptor.get("type") not in ["HeaderSectionChamp", "ExplicationChamp"]
-            ]
+        # Filtrer les descripteurs de champs et d'annotations (par __typename : le champ
+        # "type" des descripteurs vaut header_section / explication, jamais *Champ)
+        for key in ("champDescriptors", "annotationDescriptors"):
+            if key in active_revision:
+                active_revision[key] = _without_skipped(active_revision[key], _SKIP_DESCRIPTOR_TYPENAMES)
     
     # S'assurer que les structures de dossiers existent, même si vides
     if "dossiers" not in demarche:
@@ -748,99 +1060,18 @@ def get_demarche(demarche_number: int) -> Dict[str, Any]:
     elif not demarche["dossiers"] or "nodes" not in demarche["dossiers"]:
         demarche["dossiers"]["nodes"] = []
     
-    # Filtrer les champs problématiques dans les dossiers
+    # Filtrer les champs et les annotations de chaque dossier
     for dossier in demarche["dossiers"]["nodes"]:
-        # Filtrer les champs de chaque dossier
-        if "champs" in dossier:
-            dossier["champs"] = [
-                champ for champ in dossier["champs"]
-                if champ.get("__typename") not in ["HeaderSectionChamp", "ExplicationChamp"]
-            ]
-        
-        # Filtrer les annotations de chaque dossier
-        if "annotations" in dossier:
-            dossier["annotations"] = [
-                annotation for annotation in dossier["annotations"]
-                if annotation.get("__typename") not in ["HeaderSectionChamp", "ExplicationChamp"]
-            ]
+        _filter_dossier_champs(dossier)
     
     dossier_count = len(demarche["dossiers"]["nodes"])
     print(f"Démarche récupérée avec succès: {dossier_count} dossiers accessibles")
     
+    _cache_put(cache_key, demarche)
     return demarche
 
-def get_demarche_dossiers_filtered(
-    demarche_number: int, 
-    date_debut: str = None, 
-    date_fin: str = None,
-    groupes_instructeurs: List[str] = None,
-    statuts: List[str] = None,
-    updated_since: str = None
-) -> List[Dict[str, Any]]:
-    """
-    Récupère les dossiers avec filtrage côté serveur RÉEL.
-    Utilise SEULEMENT les paramètres qui fonctionnent vraiment selon les tests.
-    
-    PARAMÈTRES RÉELLEMENT SUPPORTÉS :
-    [OK]createdSince: ISO8601DateTime (date de début)
-    ❌ createdUntil: Non supporté
-    ❌ groupeInstructeurNumber: Non supporté  
-    ❌ states: Non supporté
-    
-    Les autres filtres seront appliqués côté client sur le résultat réduit.
-    """
-    if not API_TOKEN:
-        raise ValueError("Le token d'API n'est pas configuré.")
-    
-    # Seuls les filtres côté serveur qui fonctionnent
-    server_filters = {}
-    client_filters = {}
-    
-    # [OK]FILTRE CÔTÉ SERVEUR : Date de début seulement
-    if date_debut:
-        if 'T' not in date_debut:
-            date_debut += 'T00:00:00Z'
-        server_filters['createdSince'] = date_debut
-        print(f"Filtre serveur par date de début: {date_debut}")
-
-    if updated_since:
-        if 'T' not in updated_since:
-            updated_since += 'T00:00:00Z'
-        server_filters['updatedSince'] = updated_since
-        print(f"Filtre serveur par date de modification: {updated_since}")
-    
-    # ❌ FILTRES CÔTÉ CLIENT : Tout le reste
-    if date_fin:
-        client_filters['date_fin'] = date_fin
-        print(f"Filtre client par date de fin: {date_fin}")
-    
-    if groupes_instructeurs:
-        client_filters['groupes_instructeurs'] = groupes_instructeurs
-        print(f"Filtre client par groupes: {groupes_instructeurs}")
-    
-    if statuts:
-        client_filters['statuts'] = statuts
-        print(f"Filtre client par statuts: {statuts}")
-    
-    if server_filters:
-        print(f"[FILTRAGE] Filtres côté serveur: {list(server_filters.keys())}")
-    if client_filters:
-        print(f"Filtres côté client: {list(client_filters.keys())}")
-    
-    # Variables pour la requête (SIMPLIFIÉES)
-    variables = {
-        "demarcheNumber": demarche_number,
-        "afterCursor": None,
-        **server_filters  # Seulement createdSince
-    }
-    
-    headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
-        "Content-Type": "application/json"
-    }
-    
-    # Requête GraphQL MINIMALISTE qui fonctionne
-    query_get_demarche = """
+# Requête GraphQL MINIMALISTE qui fonctionne (liste filtrée des dossiers)
+query_get_demarche_filtered = """
     query getDemarche(
         $demarcheNumber: Int!
         $afterCursor: String = null
@@ -916,139 +1147,342 @@ def get_demarche_dossiers_filtered(
         }
     }
     """
+
+_DEMARCHE_FILTERED_BODY_PREFIX = _query_body_prefix(query_get_demarche_filtered)
+
+# Même requête restreinte à un statut (argument state de la connexion dossiers) : avec un
+# filtre par statuts, seuls les dossiers concernés transitent, une pagination par statut
+query_get_demarche_filtered_by_state = query_get_demarche_filtered.replace(
+    "$updatedSince: ISO8601DateTime = null\n",
+    "$updatedSince: ISO8601DateTime = null\n        $state: DossierState\n", 1
+).replace(
+    "updatedSince: $updatedSince\n",
+    "updatedSince: $updatedSince\n                state: $state\n", 1
+)
+_DEMARCHE_BY_STATE_BODY_PREFIX = _query_body_prefix(query_get_demarche_filtered_by_state)
+
+# Filtres serveur optionnels, sondés au premier usage par démarche :
+# {(api_url, démarche, filtre): accepté}. Seul un refus portant sur l'argument du
+# filtre bascule la démarche sur le filtrage client ; toute autre erreur est remontée.
+_server_filter_support = {}
+_STATE_ARGUMENT_ERROR = re.compile(r"\bstate\b|DossierState")
+
+def _is_state_argument_error(messages: List[str]) -> bool:
+    """
+    Indique si des erreurs GraphQL portent sur l'argument state (ou la variable $state).
+    """
+    return any(_STATE_ARGUMENT_ERROR.search(message) for message in messages)
+
+# Page en échec malgré les retries de la session (coupure prolongée, 5xx en rafale) :
+# nouvelles tentatives depuis le dernier curseur valide plutôt qu'un échec de toute la
+# pagination. Attente de DS_PAGE_RESUME_BACKOFF s, doublée à chaque tentative.
+DS_PAGE_RESUME_ATTEMPTS = int(os.getenv("DS_PAGE_RESUME_ATTEMPTS", "2"))
+DS_PAGE_RESUME_BACKOFF = float(os.getenv("DS_PAGE_RESUME_BACKOFF", "5"))
+
+def _is_transient_error(error: Exception) -> bool:
+    """
+    Erreur réseau ou HTTP 429/5xx : la même requête a des chances d'aboutir plus tard.
+    """
+    response = getattr(error, "response", None)
+    return response is None or response.status_code == 429 or response.status_code >= 500
+
+def _client_filter(client_filters: Dict[str, Any]) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Construit le prédicat des filtres non supportés côté serveur (date de fin, groupes, statuts).
+    Les invariants (date limite, ensembles cibles) sont calculés une fois pour toute la liste.
+    """
+    date_limite_fin = None
+    if client_filters.get('date_fin'):
+        date_fin_str = client_filters['date_fin']
+        if 'T' not in date_fin_str:
+            date_fin_str += 'T23:59:59Z'
+        try:
+            date_limite_fin = datetime.fromisoformat(date_fin_str.replace('Z', '+00:00'))
+        except (ValueError, AttributeError, TypeError):
+            # Date de fin illisible : aucun dossier ne peut la respecter
+            return lambda dossier: False
     
-    # Exécution de la requête
-    print(f"[RECHERCHE] Exécution requête avec filtres serveur supportés...")
+    # Tri rapide sur le jour (AAAA-MM-JJ) de dateDepot : un décalage horaire ne dépasse pas
+    # ±14 h, donc seuls les dossiers déposés à ±2 jours de la limite sont analysés en entier
+    jour_sur_avant = jour_sur_apres = None
+    if date_limite_fin is not None and date_limite_fin.tzinfo is not None:
+        jour_limite = date_limite_fin.astimezone(timezone.utc).date()
+        jour_sur_avant = (jour_limite - timedelta(days=2)).isoformat()
+        jour_sur_apres = (jour_limite + timedelta(days=2)).isoformat()
     
-    # Exécution de la requête avec retry automatique
-    session = get_session_with_retries()  # ✅ AJOUTE CETTE LIGNE
-    response = session.post(
-        API_URL,
-        json={"query": query_get_demarche, "variables": variables},
-        headers=headers
+    groupes_cibles = client_filters.get('groupes_instructeurs')
+    groupes_set = frozenset(map(str, groupes_cibles)) if groupes_cibles else None
+    statuts_cibles = client_filters.get('statuts')
+    statuts_set = frozenset(statuts_cibles) if statuts_cibles else None
+    
+    def matches(dossier: Dict[str, Any]) -> bool:
+        # Filtre par statut (le moins coûteux en premier)
+        if statuts_set is not None and dossier.get('state') not in statuts_set:
+            return False
+        
+        # Filtre par groupe instructeur (numéro ou identifiant)
+        if groupes_set is not None:
+            groupe_instructeur = dossier.get('groupeInstructeur')
+            if not groupe_instructeur:
+                return False
+            if (str(groupe_instructeur.get('number', '')) not in groupes_set
+                    and groupe_instructeur.get('id', '') not in groupes_set):
+                return False
+        
+        # Filtre par date de fin
+        if date_limite_fin is not None:
+            date_depot = dossier.get('dateDepot')
+            if jour_sur_avant is not None and isinstance(date_depot, str) and date_depot[10:11] == 'T':
+                jour = date_depot[:10]
+                if jour <= jour_sur_avant:
+                    return True
+                if jour >= jour_sur_apres:
+                    return False
+            try:
+                if datetime.fromisoformat(date_depot.replace('Z', '+00:00')) > date_limite_fin:
+                    return False
+            except (ValueError, AttributeError, TypeError):
+                return False
+        
+        return True
+    
+    return matches
+
+def get_demarche_dossiers_filtered(
+    demarche_number: int, 
+    date_debut: str = None, 
+    date_fin: str = None,
+    groupes_instructeurs: List[str] = None,
+    statuts: List[str] = None,
+    updated_since: str = None,
+    api_token: str = None,
+    api_url: str = None,
+    force_refresh: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Récupère les dossiers avec filtrage côté serveur RÉEL.
+    Utilise SEULEMENT les paramètres qui fonctionnent vraiment selon les tests.
+    
+    PARAMÈTRES RÉELLEMENT SUPPORTÉS :
+    [OK]createdSince: ISO8601DateTime (date de début)
+    ❌ createdUntil: Non supporté
+    ❌ groupeInstructeurNumber: Non supporté  
+    ❌ states: Non supporté
+    [OK]state: un seul statut par requête → une pagination par statut demandé
+        (repli sur le filtrage client si l'API refuse l'argument)
+    
+    Les autres filtres seront appliqués côté client sur le résultat réduit.
+    
+    api_token / api_url : configuration explicite de la démarche (sinon configuration courante).
+    force_refresh : ignore le cache et interroge l'API.
+    """
+    api_token, api_url = get_api_config(api_token, api_url)
+    if not api_token:
+        raise ValueError("Le token d'API n'est pas configuré.")
+    
+    # Seuls les filtres côté serveur qui fonctionnent
+    server_filters = {}
+    client_filters = {}
+    
+    # [OK]FILTRE CÔTÉ SERVEUR : Date de début seulement
+    if date_debut:
+        if 'T' not in date_debut:
+            date_debut += 'T00:00:00Z'
+        server_filters['createdSince'] = date_debut
+        print(f"Filtre serveur par date de début: {date_debut}")
+
+    if updated_since:
+        if 'T' not in updated_since:
+            updated_since += 'T00:00:00Z'
+        server_filters['updatedSince'] = updated_since
+        print(f"Filtre serveur par date de modification: {updated_since}")
+    
+    # ❌ FILTRES CÔTÉ CLIENT : Tout le reste
+    if date_fin:
+        client_filters['date_fin'] = date_fin
+        print(f"Filtre client par date de fin: {date_fin}")
+    
+    if groupes_instructeurs:
+        client_filters['groupes_instructeurs'] = groupes_instructeurs
+        print(f"Filtre client par groupes: {groupes_instructeurs}")
+    
+    if statuts:
+        client_filters['statuts'] = statuts
+        print(f"Filtre client par statuts: {statuts}")
+    
+    if server_filters:
+        print(f"[FILTRAGE] Filtres côté serveur: {list(server_filters.keys())}")
+    if client_filters:
+        print(f"Filtres côté client: {list(client_filters.keys())}")
+    
+    cache_key = (
+        "dossiers", api_url, api_token, demarche_number, date_debut, date_fin,
+        tuple(sorted(map(str, groupes_instructeurs or ()))), tuple(sorted(statuts or ())), updated_since
     )
+    if not force_refresh:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            print(f"[CACHE] {len(cached)} dossiers déjà récupérés pour ces filtres")
+            return cached
     
-    response.raise_for_status()
-    result = response.json()
+    # Variables pour la requête (SIMPLIFIÉES)
+    variables = {
+        "demarcheNumber": demarche_number,
+        "afterCursor": None,
+        **server_filters  # Seulement createdSince
+    }
     
-    if "errors" in result:
-        error_messages = [error.get("message", "Unknown error") for error in result["errors"]]
-        print(f"Erreurs GraphQL: {error_messages}")
-        raise Exception(f"GraphQL errors: {', '.join(error_messages)}")
-    
-    # Récupération avec pagination
-    demarche_data = result["data"]["demarche"]
-    dossiers = []
-    
-    if "dossiers" in demarche_data and "nodes" in demarche_data["dossiers"]:
-        dossiers = demarche_data["dossiers"]["nodes"]
-        total_dossiers = len(dossiers)
-        print(f"[OK]Première page récupérée: {total_dossiers} dossiers")
+    headers = _auth_headers(api_token)
+    session = get_session_with_retries()
+    
+    matches = None
+    if client_filters:
+        matches = _client_filter(client_filters)
+    
+    def paginate(body_prefix, page_variables):
+        """
+        Parcourt toutes les pages d'une requête : la page suivante est demandée dès que son
+        curseur est connu, et la page courante est filtrée pendant que la requête est en vol.
         
-        # Pagination
-        has_next_page = demarche_data["dossiers"]["pageInfo"]["hasNextPage"]
-        cursor = demarche_data["dossiers"]["pageInfo"]["endCursor"]
-        page_num = 1
+        Returns:
+            tuple: (dossiers conservés, nombre de dossiers reçus, erreurs de la première page ou None,
+                    pagination interrompue par une page en erreur)
+        """
+        def fetch_page(cursor):
+            """
+            Récupère une page de dossiers (même session : connexion keep-alive réutilisée).
+            Une erreur transitoire relance la même page : les pages déjà reçues sont conservées.
+            """
+            body = _graphql_body(body_prefix, {**page_variables, "afterCursor": cursor})
+            for attempt in range(DS_PAGE_RESUME_ATTEMPTS + 1):
+                try:
+                    page_response = session.post(api_url, data=body, headers=headers)
+                    page_response.raise_for_status()
+                    return parse_json_response(page_response)
+                except requests.exceptions.RequestException as e:
+                    if attempt == DS_PAGE_RESUME_ATTEMPTS or not _is_transient_error(e):
+                        raise
+                    wait = DS_PAGE_RESUME_BACKOFF * 2 ** attempt
+                    print(f"[RETRY] Page (curseur {cursor}) en échec: {e} - reprise dans {wait:.0f}s")
+                    time.sleep(wait)
         
-        while has_next_page:
-            page_num += 1
-            print(f"Page {page_num}...")
-            
-            variables["afterCursor"] = cursor
-            
-            session = get_session_with_retries()  # ✅ AJOUTE
-            next_response = session.post(  # ✅ CHANGE requests → session
-                API_URL,
-                json={"query": query_get_demarche, "variables": variables},
-                headers=headers
-            )
-            
-            next_response.raise_for_status()
-            next_result = next_response.json()
-            
-            if "errors" in next_result:
-                print(f"Erreurs page {page_num}: {next_result['errors']}")
-                break
-            
-            next_demarche = next_result["data"]["demarche"]
+        result = fetch_page(None)
+        if "errors" in result:
+            return [], 0, [error.get("message", "Unknown error") for error in result["errors"]], False
+        
+        demarche_data = result["data"]["demarche"]
+        kept = []
+        fetched = 0
+        incomplete = False
+        
+        if "dossiers" in demarche_data and "nodes" in demarche_data["dossiers"]:
+            page_dossiers = demarche_data["dossiers"]
+            print(f"[OK]Première page récupérée: {len(page_dossiers['nodes'])} dossiers")
+            page_num = 1
             
-            if "dossiers" in next_demarche and "nodes" in next_demarche["dossiers"]:
-                new_dossiers = next_demarche["dossiers"]["nodes"]
-                dossiers.extend(new_dossiers)
-                total_dossiers += len(new_dossiers)
-                print(f"[OK]Page {page_num}: +{len(new_dossiers)} (total: {total_dossiers})")
-                
-                has_next_page = next_demarche["dossiers"]["pageInfo"]["hasNextPage"]
-                cursor = next_demarche["dossiers"]["pageInfo"]["endCursor"]
-            else:
-                has_next_page = False
+            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+                while page_dossiers is not None:
+                    page_info = page_dossiers["pageInfo"]
+                    next_future = None
+                    if page_info["hasNextPage"]:
+                        next_future = executor.submit(fetch_page, page_info["endCursor"])
+                    
+                    nodes = page_dossiers["nodes"]
+                    fetched += len(nodes)
+                    if matches is not None:
+                        kept.extend(filter(matches, nodes))
+                    else:
+                        kept.extend(nodes)
+                    if page_num > 1:
+                        logger.debug("Page %d: +%d (total: %d)", page_num, len(nodes), fetched)
+                    
+                    if next_future is None:
+                        break
+                    
+                    page_num += 1
+                    logger.debug("Page %d...", page_num)
+                    next_result = next_future.result()
+                    
+                    if "errors" in next_result:
+                        print(f"Erreurs page {page_num}: {next_result['errors']}")
+                        incomplete = True
+                        break
+                    
+                    next_demarche = next_result["data"]["demarche"]
+                    if "dossiers" in next_demarche and "nodes" in next_demarche["dossiers"]:
+                        page_dossiers = next_demarche["dossiers"]
+                    else:
+                        page_dossiers = None
+        
+        return kept, fetched, None, incomplete
+    
+    # Exécution de la requête
+    print(f"[RECHERCHE] Exécution requête avec filtres serveur supportés...")
+    if client_filters:
+        print(f"[FILTRAGE] Application des filtres côté client...")
+    
+    # Statuts filtrés côté serveur si l'API l'accepte : une pagination par statut, en
+    # parallèle ; le filtre client reste appliqué (et sert de repli en cas de refus)
+    dossiers = None
+    state_support_key = (api_url, demarche_number, "state")
+    if statuts and _server_filter_support.get(state_support_key, True):
+        statuts_uniques = list(dict.fromkeys(statuts))
+        print(f"[FILTRAGE] Filtre serveur par statut: {statuts_uniques}")
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(statuts_uniques), 4)) as executor:
+            outcomes = list(executor.map(
+                lambda statut: paginate(_DEMARCHE_BY_STATE_BODY_PREFIX, {**variables, "state": statut}),
+                statuts_uniques
+            ))
+        
+        state_errors = [message for _, _, errors, _ in outcomes if errors for message in errors]
+        if state_errors and not _is_state_argument_error(state_errors):
+            print(f"Erreurs GraphQL: {state_errors}")
+            raise Exception(f"GraphQL errors: {', '.join(state_errors)}")
+        if state_errors:
+            print(f"[ATTENTION] Filtre serveur par statut refusé ({state_errors[0]}), repli sur le filtrage client")
+            _server_filter_support[state_support_key] = False
+        else:
+            _server_filter_support[state_support_key] = True
+            # Un dossier changeant de statut pendant la pagination peut apparaître deux fois
+            by_number = {}
+            for kept, _, _, _ in outcomes:
+                for dossier in kept:
+                    by_number.setdefault(dossier["number"], dossier)
+            dossiers = sorted(by_number.values(), key=itemgetter("number"))
+            dossiers_avant = sum(fetched for _, fetched, _, _ in outcomes)
+            incomplete = any(truncated for _, _, _, truncated in outcomes)
     
-    print(f"[SUCCES] Récupération côté serveur: {len(dossiers)} dossiers")
+    if dossiers is None:
+        dossiers, dossiers_avant, errors, incomplete = paginate(_DEMARCHE_FILTERED_BODY_PREFIX, variables)
+        if errors:
+            print(f"Erreurs GraphQL: {errors}")
+            raise Exception(f"GraphQL errors: {', '.join(errors)}")
+    
+    print(f"[SUCCES] Récupération côté serveur: {dossiers_avant} dossiers")
+    # Liste tronquée par une page en erreur : renvoyée telle quelle mais jamais mise en
+    # cache, la lecture suivante refait la pagination complète
+    if not incomplete:
+        _cache_put(cache_key, dossiers)
     
     # ===========================================
-    # FILTRAGE CÔTÉ CLIENT pour les autres critères
+    # FILTRAGE CÔTÉ CLIENT pour les autres critères (appliqué page par page ci-dessus)
     # ===========================================
     
     if not client_filters:
         print(f"[OK]Aucun filtre côté client - résultat final: {len(dossiers)} dossiers")
         return dossiers
     
-    print(f"[FILTRAGE] Application des filtres côté client...")
-    dossiers_avant = len(dossiers)
-    filtered_dossiers = []
-    
-    for dossier in dossiers:
-        # Filtre par date de fin
-        if client_filters.get('date_fin'):
-            date_fin_str = client_filters['date_fin']
-            if 'T' not in date_fin_str:
-                date_fin_str += 'T23:59:59Z'
-            
-            try:
-                from datetime import datetime
-                date_depot = datetime.fromisoformat(dossier['dateDepot'].replace('Z', '+00:00'))
-                date_limite_fin = datetime.fromisoformat(date_fin_str.replace('Z', '+00:00'))
-                
-                if date_depot > date_limite_fin:
-                    continue
-            except (ValueError, AttributeError, TypeError):
-                continue
-        
-        # Filtre par groupe instructeur
-        if client_filters.get('groupes_instructeurs'):
-            groupes_cibles = client_filters['groupes_instructeurs']
-            groupe_instructeur = dossier.get('groupeInstructeur')
-            
-            if not groupe_instructeur:
-                continue
-                
-            groupe_number = str(groupe_instructeur.get('number', ''))
-            groupe_id = groupe_instructeur.get('id', '')
-            
-            # Vérifier si le groupe correspond
-            if not (groupe_number in groupes_cibles or groupe_id in groupes_cibles):
-                continue
-        
-        # Filtre par statut
-        if client_filters.get('statuts'):
-            statuts_cibles = client_filters['statuts']
-            if dossier.get('state') not in statuts_cibles:
-                continue
-        
-        # Si tous les filtres passent, garder le dossier
-        filtered_dossiers.append(dossier)
-    
-    print(f"[OK]Filtrage côté client terminé: {len(filtered_dossiers)}/{dossiers_avant} dossiers conservés")
+    print(f"[OK]Filtrage côté client terminé: {len(dossiers)}/{dossiers_avant} dossiers conservés")
     
     # Debug : Afficher quelques exemples
-    if filtered_dossiers:
-        print(f"Exemples de résultats finaux:")
-        for i, dossier in enumerate(filtered_dossiers[:3]):
+    if dossiers and logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Exemples de résultats finaux:")
+        for i, dossier in enumerate(dossiers[:3]):
             groupe = dossier.get('groupeInstructeur', {})
-            print(f"   {i+1}. Dossier {dossier['number']}: {dossier['dateDepot'][:10]} - {dossier['state']}")
-            print(f"      Groupe: {groupe.get('number')} ({groupe.get('label', 'Sans label')})")
+            logger.debug("   %d. Dossier %s: %s - %s", i + 1, dossier['number'], dossier['dateDepot'][:10], dossier['state'])
+            logger.debug("      Groupe: %s (%s)", groupe.get('number'), groupe.get('label', 'Sans label'))
     
-    return filtered_dossiers
+    return dossiers
 
 
 # ================================================
@@ -1059,6 +1493,7 @@ def test_working_filter():
     """
     Test avec SEULEMENT les paramètres qui fonctionnent
     """
+    api_token, api_url = get_api_config()
     print("=== TEST avec seulement createdSince (qui fonctionne) ===")
     
     query = """
@@ -1092,20 +1527,17 @@ def test_working_filter():
         "createdSince": "2025-06-15T00:00:00Z"
     }
     
-    headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
-        "Content-Type": "application/json"
-    }
+    headers = _auth_headers(api_token)
     
     session = get_session_with_retries()  # ✅ AJOUTE
     response = session.post(
-        API_URL,
+        api_url,
         json={"query": query, "variables": variables},
         headers=headers
     )
     
     if response.status_code == 200:
-        result = response.json()
+        result = parse_json_response(response)
         if "errors" in result:
             print(f"Erreurs: {result['errors']}")
         else:
@@ -1158,18 +1590,28 @@ def get_demarche_dossiers(demarche_number: int):
     """
     return get_demarche_dossiers_filtered(demarche_number)
 
-def get_dossier_geojson(dossier_number: int) -> Dict[str, Any]:
+def get_dossier_geojson(dossier_number: int, force_refresh: bool = False) -> Dict[str, Any]:
     """
     Récupère les données géométriques d'un dossier au format GeoJSON.
+    Mise en cache comme les requêtes GraphQL (DS_QUERY_CACHE_TTL, clear_query_cache).
+    
+    force_refresh : ignore le cache et interroge l'API.
     """
-    if not API_TOKEN:
+    api_token, api_url = get_api_config()
+    if not api_token:
         raise ValueError("Le token d'API n'est pas configuré. Définissez DEMARCHES_API_TOKEN dans le fichier .env")
     
-    base_url = API_URL.split('/api/')[0] if '/api/' in API_URL else "https://www.demarches-simplifiees.fr"
+    cache_key = ("geojson", api_url, api_token, dossier_number)
+    if not force_refresh:
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            return cached
+    
+    base_url = api_url.split('/api/')[0] if '/api/' in api_url else "https://www.demarches-simplifiees.fr"
     url = f"{base_url}/dossiers/{dossier_number}/geojson"
     
     headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
+        "Authorization": f"Bearer {api_token}",
         "Accept": "application/json"
     }
     
@@ -1177,4 +1619,6 @@ def get_dossier_geojson(dossier_number: int) -> Dict[str, Any]:
     response = session.get(url, headers=headers)
     response.raise_for_status()
     
-    return response.json()
\ No newline at end of file
+    geojson = parse_json_response(response)
+    _cache_put(cache_key, geojson)
+    return geojson
\ No newline at end of file
@@ -60,6 +60,8 @@ def format_complex_json_for_grist(json_value, max_length=10000):
 def associate_geojson_with_champs(geojson_data, champs):
     """
     Associe les données GeoJSON aux champs par différentes méthodes de correspondance.
+    Les index sont construits une fois ; les features d'un même champ partageant id et
+    label, chaque recherche par label n'est faite qu'une fois par couple (label, rangée).
     """
     # Dictionnaire pour stocker les associations
     associations = {}
@@ -67,17 +69,29 @@ def associate_geojson_with_champs(geojson_data, champs):
     # Dictionnaire pour indexer les champs par différents critères
     champs_by_numeric_id = {}
     champs_by_descriptor_id = {}
-    champs_by_label = {}
     
-    # Indexer les champs
+    # Indexer les champs (ID de descripteur : premier champ rencontré, comme l'ancien parcours)
     for champ in champs:
         if champ["numeric_id"]:
             champs_by_numeric_id[champ["numeric_id"]] = champ
         
         if champ["decoded_descriptor_id"]:
-            champs_by_descriptor_id[champ["decoded_descriptor_id"]] = champ
-        
-        champs_by_label[champ["base_label"]] = champ
+            champs_by_descriptor_id.setdefault(champ["decoded_descriptor_id"], champ)
+    
+    # Résultats des recherches par label déjà effectuées : {(label, rangée): champ ou None}
+    champs_by_label_and_row = {}
+    
+    def find_by_label(champ_label, champ_row):
+        for c in champs:
+            # Vérifier si le label du champ contient le label GeoJSON
+            if champ_label in c["label"] or c["base_label"] == champ_label:
+                # Pour les blocs répétables, vérifier aussi l'ID de la rangée
+                if champ_row and c["row_id"]:
+                    if champ_row == c["row_id"]:
+                        return c
+                else:
+                    return c
+        return None
     
     # Parcourir les features GeoJSON
     for feature in geojson_data.get("features", []):
@@ -88,38 +102,21 @@ def associate_geojson_with_champs(geojson_data, champs):
         champ_label = properties.get("champ_label")
         champ_row = properties.get("champ_row", "")
         
-        # Priorité 1: Essayer de faire correspondre par ID numérique
         matched_champ = None
-        if champ_id and str(champ_id) in champs_by_numeric_id:
-            matched_champ = champs_by_numeric_id[str(champ_id)]
-        
-        # Priorité 2: Essayer de faire correspondre par ID de descripteur
-        if not matched_champ and champ_id:
-            for c in champs:
-                if c["decoded_descriptor_id"] == str(champ_id):
-                    matched_champ = c
-                    break
+        if champ_id:
+            # Priorité 1: ID numérique, priorité 2: ID de descripteur
+            champ_id = str(champ_id)
+            matched_champ = champs_by_numeric_id.get(champ_id) or champs_by_descriptor_id.get(champ_id)
         
         # Priorité 3: Essayer de faire correspondre par label
         if not matched_champ and champ_label:
-            for c in champs:
-                # Vérifier si le label du champ contient le label GeoJSON
-                if champ_label in c["label"] or c["base_label"] == champ_label:
-                    # Pour les blocs répétables, vérifier aussi l'ID de la rangée
-                    if champ_row and c["row_id"]:
-                        if champ_row == c["row_id"]:
-                            matched_champ = c
-                            break
-                    else:
-                        matched_champ = c
-                        break
+            label_key = (champ_label, champ_row)
+            if label_key not in champs_by_label_and_row:
+                champs_by_label_and_row[label_key] = find_by_label(champ_label, champ_row)
+            matched_champ = champs_by_label_and_row[label_key]
         
         # Si une correspondance a été trouvée, ajouter la feature à l'association
         if matched_champ:
-            champ_key = matched_champ["id"]
-            if champ_key not in associations:
-                associations[champ_key] = []
-            
-            associations[champ_key].append(feature)
+            associations.setdefault(matched_champ["id"], []).append(feature)
     
-    return associations
\ No newline at end of file
+    return associations
@@ -22,6 +22,18 @@ except ImportError:
     def log_error(message):
         print(f"ERREUR: {message}")
 
+# Champs et descripteurs décoratifs ignorés (ensembles construits une seule fois)
+SKIPPED_CHAMP_TYPENAMES = frozenset({"HeaderSectionChamp", "ExplicationChamp"})
+SKIPPED_TYPENAMES = SKIPPED_CHAMP_TYPENAMES | {"HeaderSectionChampDescriptor", "ExplicationChampDescriptor"}
+SKIPPED_TYPES = frozenset({"header_section", "explication"})
+SKIPPED_TYPES_UNIFIED = SKIPPED_TYPES | {"piece_justificative"}
+
+# Champs complexes doublés d'une colonne <label>_json
+JSON_COLUMN_TYPENAMES = frozenset({
+    "CarteChamp", "AddressChamp", "SiretChamp", "LinkedDropDownListChamp",
+    "MultipleDropDownListChamp", "PieceJustificativeChamp", "CommuneChamp", "RNFChamp",
+})
+
 
 def ensure_repetable_columns_exist(client, table_id, repetable_data):
     """
@@ -234,7 +246,7 @@ def should_skip_field(field, problematic_ids=None):
         bool: True si le champ doit être ignoré
     """
     # Ignorer par type (même logique que dossier_to_flat_data)
-    if field.get("__typename") in ["HeaderSectionChamp", "ExplicationChamp"]:
+    if field.get("__typename") in SKIPPED_CHAMP_TYPENAMES:
         return True
     
     # Ignorer par ID problématique
@@ -242,7 +254,7 @@ def should_skip_field(field, problematic_ids=None):
         return True
     
     # Ignorer par type de champ (au cas où)
-    if field.get("type") in ["header_section", "explication"]:
+    if field.get("type") in SKIPPED_TYPES:
         return True
     
     return False
@@ -253,12 +265,11 @@ def should_skip_field_unified(field, problematic_ids=None):
     Cette fonction remplace should_skip_field pour garantir la cohérence.
     """
     # Filtrage par typename (même logique que schema_utils)
-    if field.get("__typename") in ["HeaderSectionChampDescriptor", "ExplicationChampDescriptor",
-                                   "HeaderSectionChamp", "ExplicationChamp"]:
+    if field.get("__typename") in SKIPPED_TYPENAMES:
         return True
     
     # Filtrage par type (même logique que schema_utils)  
-    if field.get("type") in ["header_section", "explication", "piece_justificative"]:
+    if field.get("type") in SKIPPED_TYPES_UNIFIED:
         return True
     
     # Filtrage par ID problématique (transmission depuis schema_utils)
@@ -1557,7 +1568,7 @@ def detect_repetable_columns_in_dossier(dossier_data):
         
         for champ in champs:
             # Ignorer les champs HeaderSectionChamp et ExplicationChamp
-            if champ["__typename"] in ["HeaderSectionChamp", "ExplicationChamp"]:
+            if champ["__typename"] in SKIPPED_CHAMP_TYPENAMES:
                 continue
                 
             if champ["__typename"] == "RepetitionChamp":
@@ -1590,9 +1601,7 @@ def detect_repetable_columns_in_dossier(dossier_data):
                                 found_columns[normalized_label] = column_type
                             
                             # Pour les types complexes, ajouter aussi une colonne JSON
-                            if field["__typename"] in ["CarteChamp", "AddressChamp", "SiretChamp", 
-                                                    "LinkedDropDownListChamp", "MultipleDropDownListChamp",
-                                                    "PieceJustificativeChamp", "CommuneChamp", "RNFChamp"]:
+                            if field["__typename"] in JSON_COLUMN_TYPENAMES:
                                 json_column = f"{normalized_label}_json"
                                 if json_column not in found_columns:
                                     found_columns[json_column] = "Text"
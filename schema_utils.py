@@ -9,17 +9,48 @@ NOUVEAU : Tables séparées par bloc répétable
 CORRECTION : Format "fields" pour les colonnes dynamiques
 """
 
-import requests
+import concurrent.futures
+import contextvars
+import copy
+import functools
+import hashlib
+import os
+import threading
+import time
 import json
-from typing import Dict, List, Any, Tuple, Optional, Set
+from pathlib import Path
+from typing import AbstractSet, Dict, FrozenSet, List, Any, Tuple, Optional, Set
 
 # Importer les configurations nécessaires
-from queries_config import API_TOKEN, API_URL
+from queries_config import get_api_config
+from queries_graphql import get_session_with_retries, parse_json_response
+
+# Timeout (connexion, lecture) des appels HTTP
+HTTP_TIMEOUT = (5, 60)
 
 # ========================================
 # DÉTECTION DU TYPE DE DEMANDEUR
 # ========================================
 
+def demandeur_type_from_dossiers(dossiers: List[Dict[str, Any]], demarche_number: int) -> str:
+    """
+    Déduit le type de demandeur à partir des premiers dossiers d'une démarche
+    (PersonneMorale par défaut si aucun dossier).
+    """
+    if dossiers:
+        demandeur = dossiers[0].get("demandeur") or {}
+        demandeur_type = demandeur.get("__typename")
+        
+        if demandeur_type in ["PersonnePhysique", "PersonneMorale", "PersonneMoraleIncomplete"]:
+            # PersonneMoraleIncomplete est traité comme PersonneMorale
+            if demandeur_type == "PersonneMoraleIncomplete":
+                return "PersonneMorale"
+            return demandeur_type
+    
+    # Aucun dossier trouvé
+    print(f"ℹ️  Aucun dossier trouvé pour la démarche {demarche_number}, type par défaut: PersonneMorale")
+    return "PersonneMorale"  # Par défaut si aucun dossier
+
 def detect_demandeur_type(demarche_number: int) -> Optional[str]:
     """
     Détecte le type de demandeur (PersonnePhysique ou PersonneMorale)
@@ -31,7 +62,8 @@ def detect_demandeur_type(demarche_number: int) -> Optional[str]:
     Returns:
         "PersonnePhysique" | "PersonneMorale" | None (si aucun dossier)
     """
-    if not API_TOKEN:
+    api_token, api_url = get_api_config()
+    if not api_token:
         raise ValueError("Le token d'API n'est pas configuré")
     
     # Requête pour récupérer juste le premier dossier
@@ -52,40 +84,27 @@ def detect_demandeur_type(demarche_number: int) -> Optional[str]:
     """
     
     headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
+        "Authorization": f"Bearer {api_token}",
         "Content-Type": "application/json"
     }
     
     try:
-        response = requests.post(
-            API_URL,
+        response = get_session_with_retries().post(
+            api_url,
             json={"query": query, "variables": {"demarcheNumber": int(demarche_number)}},
             headers=headers,
-            timeout=30
+            timeout=HTTP_TIMEOUT
         )
         
         response.raise_for_status()
-        result = response.json()
+        result = parse_json_response(response)
         
         if "errors" in result:
             print(f"⚠️  Erreur lors de la détection du type de demandeur pour la démarche {demarche_number}")
             return None
         
         dossiers = result.get("data", {}).get("demarche", {}).get("dossiers", {}).get("nodes", [])
-        
-        if dossiers and len(dossiers) > 0:
-            demandeur = dossiers[0].get("demandeur", {})
-            demandeur_type = demandeur.get("__typename")
-            
-            if demandeur_type in ["PersonnePhysique", "PersonneMorale", "PersonneMoraleIncomplete"]:
-                # PersonneMoraleIncomplete est traité comme PersonneMorale
-                if demandeur_type == "PersonneMoraleIncomplete":
-                    return "PersonneMorale"
-                return demandeur_type
-        
-        # Aucun dossier trouvé
-        print(f"ℹ️  Aucun dossier trouvé pour la démarche {demarche_number}, type par défaut: PersonneMorale")
-        return "PersonneMorale"  # Par défaut si aucun dossier
+        return demandeur_type_from_dossiers(dossiers, demarche_number)
         
     except Exception as e:
         print(f"❌ Erreur lors de la détection du type: {e}")
@@ -172,17 +191,19 @@ def create_demandeurs_pm_columns():
     ]
 
 
-def create_demandeurs_columns(demarche_number: int):
+def create_demandeurs_columns(demarche_number: int, demandeur_type: Optional[str] = None):
     """
     Crée les colonnes pour la table demandeurs selon le type détecté
     
     Args:
         demarche_number: Numéro de la démarche
+        demandeur_type: Type déjà connu (récupéré avec le schéma), sinon détecté via l'API
         
     Returns:
         tuple: (list colonnes, str type_detecte)
     """
-    demandeur_type = detect_demandeur_type(demarche_number)
+    if not demandeur_type:
+        demandeur_type = detect_demandeur_type(demarche_number)
     
     print(f"Type de demandeur détecté: {demandeur_type}")
     
@@ -214,29 +235,125 @@ def create_instructeurs_columns():
 # FONCTIONS EXISTANTES - CORRIGÉES
 # ========================================
 
-def get_demarche_schema(demarche_number):
+# Descripteurs purement décoratifs (sections, explications), jamais convertis en colonnes
+PROBLEMATIC_TYPENAMES = frozenset({"HeaderSectionChampDescriptor", "ExplicationChampDescriptor"})
+PROBLEMATIC_TYPES = frozenset({"header_section", "explication"})
+
+# Type de colonne Grist par type de champ DS (construit une seule fois)
+CHAMP_TYPE_TO_COLUMN_TYPE = {
+    "text": "Text",
+    "textarea": "Text", 
+    "email": "Text",
+    "phone": "Text",
+    "number": "Numeric",
+    "integer_number": "Int",
+    "decimal_number": "Numeric",
+    "date": "Date",
+    "datetime": "DateTime",
+    "yes_no": "Bool",
+    "checkbox": "Bool",
+    "drop_down_list": "Text",
+    "multiple_drop_down_list": "Text",
+    "linked_drop_down_list": "Text",
+    "piece_justificative": "Text",
+    "iban": "Text",
+    "siret": "Text",
+    "rna": "Text",
+    "titre_identite": "Text",
+    "address": "Text",
+    "commune": "Text",
+    "departement": "Text",
+    "region": "Text",
+    "pays": "Text",
+    "carte": "Text",
+    "repetition": "Text"
+}
+
+# Colonnes fixes des tables, en paires (id, type) : converties en dicts à l'émission
+DOSSIER_COLUMNS = (
+    ("dossier_id", "Text"),
+    ("dossier_number", "Int"),
+    ("state", "Text"),
+    ("date_depot", "DateTime"),
+    ("date_derniere_modification", "DateTime"),
+    ("date_expiration", "DateTime"),
+    ("date_traitement", "DateTime"),
+    ("supprime_par_usager", "Bool"),
+    ("date_suppression", "DateTime"),
+    ("date_derniere_correction_en_attente", "DateTime"),
+    ("date_derniere_modification_champs", "DateTime"),
+    ("date_derniere_modification_annotations", "DateTime"),
+    ("motivation", "Text"),
+    ("label_names", "Text"),
+    ("labels_json", "Text"),
+    ("suivi_par", "Text"),
+)
+CHAMP_BASE_COLUMNS = (("dossier_number", "Int"), ("champ_id", "Text"))
+ANNOTATION_BASE_COLUMNS = (("dossier_number", "Int"),)
+REPETABLE_BASE_COLUMNS = (
+    ("dossier_number", "Int"),
+    ("block_id", "Text"),
+    ("block_row_index", "Int"),
+    ("block_row_id", "Text"),
+)
+GEO_COLUMNS = (
+    ("geo_id", "Text"),
+    ("geo_source", "Text"),
+    ("geo_description", "Text"),
+    ("geo_type", "Text"),
+    ("geo_coordinates", "Text"),
+    ("geo_wkt", "Text"),
+    ("geo_commune", "Text"),
+    ("geo_numero", "Text"),
+    ("geo_section", "Text"),
+    ("geo_prefixe", "Text"),
+    ("geo_surface", "Numeric"),
+)
+
+def _column_dicts(columns) -> List[Dict[str, str]]:
+    """Convertit des paires (id, type) en définitions de colonnes Grist."""
+    return [{"id": column_id, "type": column_type} for column_id, column_type in columns]
+
+def determine_column_type(champ_type: Optional[str], typename: Optional[str] = None) -> str:
+    """Détermine le type de colonne Grist basé sur le type de champ DS"""
+    return CHAMP_TYPE_TO_COLUMN_TYPE.get(champ_type, "Text")
+
+def _unique_column_id(base_id: str, seen_ids: Set[str]) -> str:
     """
-    Récupère le schéma complet d'une démarche avec tous ses descripteurs de champs,
-    sans dépendre des dossiers existants.
-    
-    FONCTION EXISTANTE - GARDÉE POUR COMPATIBILITÉ
-    
-    Args:
-        demarche_number: Numéro de la démarche
-        
-    Returns:
-        dict: Structure complète des descripteurs de champs et d'annotations
+    Retourne base_id, ou base_id_1, base_id_2... s'il est déjà pris, et le réserve dans seen_ids.
     """
-    if not API_TOKEN:
-        raise ValueError("Le token d'API n'est pas configuré. Définissez DEMARCHES_API_TOKEN dans le fichier .env")
-    
-    # Requête GraphQL spécifique pour récupérer les descripteurs de champs
-    query = """
+    column_id = base_id
+    counter = 1
+    while column_id in seen_ids:
+        column_id = f"{base_id}_{counter}"
+        counter += 1
+    seen_ids.add(column_id)
+    return column_id
+
+@functools.lru_cache(maxsize=4096)
+def _normalize_label(label: Optional[str]) -> str:
+    """
+    normalize_column_name mémoïsé : les mêmes labels reviennent à chaque synchronisation.
+    """
+    # IMPORT LOCAL pour éviter la dépendance circulaire (exécuté seulement hors cache)
+    from grist_processor_working_all import normalize_column_name
+    return normalize_column_name(label)
+
+# Requête GraphQL spécifique pour récupérer les descripteurs de champs
+# (uniquement les attributs lus pour construire les colonnes : __typename, id, type, label)
+DEMARCHE_SCHEMA_QUERY = """
     query getDemarcheSchema($demarcheNumber: Int!) {
         demarche(number: $demarcheNumber) {
             id
             number
             title
+            dossiers(first: 1) {
+                nodes {
+                    demandeur {
+                        __typename
+                    }
+                }
+            }
             activeRevision {
                 id
                 champDescriptors {
@@ -264,47 +381,52 @@ def get_demarche_schema(demarche_number):
         id
         type
         label
-        description
-        required
-        ... on DropDownListChampDescriptor {
-            options
-            otherOption
-        }
-        ... on MultipleDropDownListChampDescriptor {
-            options
-        }
-        ... on LinkedDropDownListChampDescriptor {
-            options
-        }
-        ... on PieceJustificativeChampDescriptor {
-            fileTemplate {
-                filename
-            }
-        }
-        ... on ExplicationChampDescriptor {
-            collapsibleExplanationEnabled
-            collapsibleExplanationText
-        }
     }
     """
+
+# Corps JSON de la requête encodé une seule fois : seul le numéro de démarche varie
+_DEMARCHE_SCHEMA_BODY_PREFIX = (
+    '{"query":' + json.dumps(DEMARCHE_SCHEMA_QUERY) + ',"variables":{"demarcheNumber":'
+).encode()
+
+def get_demarche_schema(demarche_number, api_token=None, api_url=None):
+    """
+    Récupère le schéma complet d'une démarche avec tous ses descripteurs de champs,
+    sans dépendre des dossiers existants.
+    
+    FONCTION EXISTANTE - GARDÉE POUR COMPATIBILITÉ
+    
+    Args:
+        demarche_number: Numéro de la démarche
+        api_token: Token explicite de la démarche (sinon configuration courante)
+        api_url: URL explicite de l'API (sinon configuration courante)
+        
+    Returns:
+        dict: Structure complète des descripteurs de champs et d'annotations
+    """
+    api_token, api_url = get_api_config(api_token, api_url)
+    if not api_token:
+        raise ValueError("Le token d'API n'est pas configuré. Définissez DEMARCHES_API_TOKEN dans le fichier .env")
+    
     
     headers = {
-        "Authorization": f"Bearer {API_TOKEN}",
+        "Authorization": f"Bearer {api_token}",
         "Content-Type": "application/json"
     }
     
-    # Exécuter la requête
-    response = requests.post(
-        API_URL,
-        json={"query": query, "variables": {"demarcheNumber": int(demarche_number)}},
-        headers=headers
+    # Exécuter la requête (session partagée : connexions keep-alive réutilisées)
+    response = get_session_with_retries().post(
+        api_url,
+        data=_DEMARCHE_SCHEMA_BODY_PREFIX + b"%d}}" % int(demarche_number),
+        headers=headers,
+        timeout=HTTP_TIMEOUT
     )
     
     # Vérifier le code de statut
     response.raise_for_status()
     
     # Analyser la réponse JSON
-    result = response.json()
+    result = parse_json_response(response)
     
     # Vérifier les erreurs
     if "errors" in result:
@@ -329,7 +451,7 @@ def get_demarche_schema(demarche_number):
     
     return demarche
 
-def get_problematic_descriptor_ids_from_schema(demarche_schema):
+def get_problematic_descriptor_ids_from_schema(demarche_schema: Dict[str, Any]) -> FrozenSet[str]:
     """
     Extrait les IDs des descripteurs problématiques (HeaderSection, Explication)
     directement depuis le schéma de la démarche.
@@ -342,16 +464,16 @@ def get_problematic_descriptor_ids_from_schema(demarche_schema):
         demarche_schema: Schéma de la démarche récupéré via get_demarche_schema
         
     Returns:
-        set: Ensemble des IDs problématiques à filtrer
+        frozenset: Ensemble figé des IDs problématiques à filtrer
     """
-    problematic_ids = set()
+    problematic_ids: Set[str] = set()
     
     # Fonction récursive pour explorer les descripteurs
-    def explore_descriptors(descriptors):
+    def explore_descriptors(descriptors: List[Dict[str, Any]]) -> None:
         for descriptor in descriptors:
             #  CORRECTION : "piece_justificative" RETIRÉ
-            if descriptor.get("__typename") in ["HeaderSectionChampDescriptor", "ExplicationChampDescriptor"] or \
-               descriptor.get("type") in ["header_section", "explication"]:
+            if descriptor.get("__typename") in PROBLEMATIC_TYPENAMES or \
+               descriptor.get("type") in PROBLEMATIC_TYPES:
                 problematic_ids.add(descriptor.get("id"))
             
             # Explorer les descripteurs dans les blocs répétables
@@ -366,9 +488,10 @@ def get_problematic_descriptor_ids_from_schema(demarche_schema):
         if "annotationDescriptors" in demarche_schema["activeRevision"]:
             explore_descriptors(demarche_schema["activeRevision"]["annotationDescriptors"])
     
-    return problematic_ids
+    return frozenset(problematic_ids)
 
-def create_columns_from_schema(demarche_schema, demarche_number=None):
+def create_columns_from_schema(demarche_schema: Dict[str, Any],
+                               demarche_number: Optional[int] = None) -> Tuple[Dict[str, Any], AbstractSet[str]]:
     """
     Crée les définitions de colonnes à partir du schéma de la démarche,
     en filtrant les champs problématiques (HeaderSection, Explication)
@@ -385,108 +508,114 @@ def create_columns_from_schema(demarche_schema, demarche_number=None):
         demarche_schema: Schéma de la démarche récupéré via get_demarche_schema
         
     Returns:
-        tuple: (dict définitions des colonnes, set IDs problématiques)
+        tuple: (dict définitions des colonnes, frozenset IDs problématiques)
     """
     # IMPORT LOCAL pour éviter la dépendance circulaire
-    from grist_processor_working_all import normalize_column_name, log, log_verbose, log_error
+    from grist_processor_working_all import log, log_verbose, log_error
     #  NOUVEAU : Logging optionnel
     if demarche_number:
         log(f"Création des colonnes pour la démarche {demarche_number}")
     
     #  RÉCUPÉRER LES IDs DEPUIS LES MÉTADONNÉES SI DISPONIBLES
-    if "metadata" in demarche_schema and "problematic_ids" in demarche_schema["metadata"]:
+    ids_from_metadata = "metadata" in demarche_schema and "problematic_ids" in demarche_schema["metadata"]
+    if ids_from_metadata:
         problematic_ids = demarche_schema["metadata"]["problematic_ids"]
         log(f"Identificateurs de {len(problematic_ids)} descripteurs problématiques (depuis métadonnées)")
     else:
-        # Fallback : essayer de les extraire du schéma (déjà nettoyé = 0)
-        problematic_ids = get_problematic_descriptor_ids_from_schema(demarche_schema)
-        log(f"Identificateurs de {len(problematic_ids)} descripteurs problématiques à filtrer")
-    
-    # Fonction pour déterminer le type de colonne Grist
-    def determine_column_type(champ_type, typename=None):
-        """Détermine le type de colonne Grist basé sur le type de champ DS"""
-        type_mapping = {
-            "text": "Text",
-            "textarea": "Text", 
-            "email": "Text",
-            "phone": "Text",
-            "number": "Numeric",
-            "integer_number": "Int",
-            "decimal_number": "Numeric",
-            "date": "Date",
-            "datetime": "DateTime",
-            "yes_no": "Bool",
-            "checkbox": "Bool",
-            "drop_down_list": "Text",
-            "multiple_drop_down_list": "Text",
-            "linked_drop_down_list": "Text",
-            "piece_justificative": "Text",
-            "iban": "Text",
-            "siret": "Text",
-            "rna": "Text",
-            "titre_identite": "Text",
-            "address": "Text",
-            "commune": "Text",
-            "departement": "Text",
-            "region": "Text",
-            "pays": "Text",
-            "carte": "Text",
-            "repetition": "Text"
-        }
-        return type_mapping.get(champ_type, "Text")
-    
-    # Colonnes fixes pour la table des dossiers
-    dossier_columns = [
-        {"id": "dossier_id", "type": "Text"},
-        {"id": "dossier_number", "type": "Int"},
-        {"id": "state", "type": "Text"},
-        {"id": "date_depot", "type": "DateTime"},
-        {"id": "date_derniere_modification", "type": "DateTime"},
-        {"id": "date_expiration", "type": "DateTime"},
-        {"id": "date_traitement", "type": "DateTime"},
-        {"id": "supprime_par_usager", "type": "Bool"},
-        {"id": "date_suppression", "type": "DateTime"},
-        {"id": "date_derniere_correction_en_attente", "type": "DateTime"},
-        {"id": "date_derniere_modification_champs", "type": "DateTime"},
-        {"id": "date_derniere_modification_annotations", "type": "DateTime"},
-        {"id": "motivation", "type": "Text"},
-        {"id": "label_names", "type": "Text"},
-        {"id": "labels_json", "type": "Text"},
-        {"id": "suivi_par", "type": "Text"}, 
-    ]
+        # Fallback : relevés pendant le parcours des descripteurs ci-dessous
+        # (un seul passage sur l'arbre, au lieu d'un parcours préalable dédié)
+        problematic_ids = set()
+    found_problematic_ids: Set[str] = set()
 
-    # Colonnes de base pour la table des champs
-    champ_columns = [
-        {"id": "dossier_number", "type": "Int"},
-        {"id": "champ_id", "type": "Text"},
-    ]
+    def is_problematic(typename: Optional[str], champ_type: Optional[str], descriptor_id: Optional[str]) -> bool:
+        """Relève l'ID si le descripteur est problématique (HeaderSection, Explication)"""
+        if typename in PROBLEMATIC_TYPENAMES or champ_type in PROBLEMATIC_TYPES:
+            found_problematic_ids.add(descriptor_id)
+            return True
+        return False
     
-    # Colonnes de base pour la table des annotations
-    annotation_columns = [
-        {"id": "dossier_number", "type": "Int"},
-    ]
+    # Colonnes fixes / de base (dicts neufs à chaque appel, la liste est complétée ensuite)
+    dossier_columns = _column_dicts(DOSSIER_COLUMNS)
+    champ_columns = _column_dicts(CHAMP_BASE_COLUMNS)
+    annotation_columns = _column_dicts(ANNOTATION_BASE_COLUMNS)
+    
+    # IDs déjà pris par table, pour la gestion des doublons sans parcourir les listes
+    champ_ids = {col["id"] for col in champ_columns}
+    annotation_ids = {col["id"] for col in annotation_columns}
 
     # Variables pour suivre la présence de blocs répétables et champs carto
     has_repetable_blocks = False
-    repetable_blocks = {}  #  NOUVEAU : Dict au lieu d'une seule liste
+    repetable_blocks: Dict[str, Dict[str, Any]] = {}  #  NOUVEAU : Dict au lieu d'une seule liste
     has_carto_fields = False
 
+    def add_repetable_block(descriptor: Dict[str, Any], block_label: str) -> None:
+        """Crée la table d'un bloc répétable à partir de ses sous-champs (une seule visite)"""
+        nonlocal has_carto_fields
+        normalized_block_label = _normalize_label(block_label)
+        
+        # Colonnes de base pour ce bloc
+        block_columns = _column_dicts(REPETABLE_BASE_COLUMNS)
+        block_ids = {col["id"] for col in block_columns}
+        
+        block_has_carto = False  #  Pour suivre si CE bloc a des champs carto
+        
+        # Traiter les sous-champs du bloc répétable
+        for inner_descriptor in descriptor["champDescriptors"]:
+            inner_type = inner_descriptor.get("type")
+            inner_label = inner_descriptor.get("label")
+            inner_typename = inner_descriptor.get("__typename")
+            
+            # Relever les sous-champs problématiques (filtrés à l'extraction)
+            is_problematic(inner_typename, inner_type, inner_descriptor.get("id"))
+            
+            # Détecter les champs cartographiques
+            if inner_type == "carte":
+                has_carto_fields = True
+                block_has_carto = True
+            
+            # Ajouter le champ normalisé à la table des blocs répétables
+            normalized_label = _normalize_label(inner_label)
+            column_type = determine_column_type(inner_type, inner_typename)
+            
+            #  GESTION DES DOUBLONS pour ce bloc (IDs de block_columns)
+            normalized_label = _unique_column_id(normalized_label, block_ids)
+            
+            block_columns.append({
+                "id": normalized_label,
+                "type": column_type
+            })
+        
+        #  Ajouter les colonnes géographiques si nécessaire pour CE bloc
+        if block_has_carto:
+            for geo_id, geo_type in GEO_COLUMNS:
+                if geo_id not in block_ids:
+                    block_ids.add(geo_id)
+                    block_columns.append({"id": geo_id, "type": geo_type})
+        
+        #  STOCKER dans le dict avec le label normalisé comme clé
+        repetable_blocks[normalized_block_label] = {
+            "original_label": block_label,
+            "columns": block_columns
+        }
+
     # Traiter les descripteurs de champs
     if demarche_schema.get("activeRevision") and demarche_schema["activeRevision"].get("champDescriptors"):
         for descriptor in demarche_schema["activeRevision"]["champDescriptors"]:
             champ_type = descriptor.get("type")
             champ_label = descriptor.get("label")
+            typename = descriptor.get("__typename")
             
             #  CORRECTION MAJEURE : Traiter les PieceJustificativeChamp AVANT le filtrage
-            if descriptor.get("__typename") == "PieceJustificativeChampDescriptor":
-                normalized_label = normalize_column_name(champ_label)
+            if typename == "PieceJustificativeChampDescriptor":
+                normalized_label = _normalize_label(champ_label)
                 
                 # Détecter si c'est un champ RIB
                 if "rib" in champ_label.lower() or "iban" in champ_label.lower():
                     rib_suffixes = ["titulaire", "iban", "bic", "nom_de_la_banque"]
                     for suffix in rib_suffixes:
                         rib_col_id = f"{normalized_label}_{suffix}"
-                        if not any(col["id"] == rib_col_id for col in champ_columns):
+                        if rib_col_id not in champ_ids:
+                            champ_ids.add(rib_col_id)
                             # ✅ FORMAT AVEC FIELDS
                             champ_columns.append({
                                 "id": rib_col_id,
@@ -498,11 +627,7 @@ def create_columns_from_schema(demarche_schema, demarche_number=None):
                 
                 # Ajouter aussi la colonne principale pour le nom du fichier
                 #  GESTION DES DOUBLONS
-                base_label = normalized_label
-                counter = 1
-                while any(col["id"] == normalized_label for col in champ_columns):
-                    normalized_label = f"{base_label}_{counter}"
-                    counter += 1
+                normalized_label = _unique_column_id(normalized_label, champ_ids)
                 
                 # ✅ FORMAT AVEC FIELDS
                 champ_columns.append({
@@ -514,80 +639,14 @@ def create_columns_from_schema(demarche_schema, demarche_number=None):
                 })
             
             # Maintenant filtrer les types problématiques
-            if descriptor["__typename"] in ["HeaderSectionChampDescriptor", "ExplicationChampDescriptor"] or \
-               descriptor.get("type") in ["header_section", "explication"] or \
-               descriptor.get("id") in problematic_ids:
+            descriptor_id = descriptor.get("id")
+            if is_problematic(typename, champ_type, descriptor_id) or descriptor_id in problematic_ids:
                 continue
             
             # Traitement spécial pour les blocs répétables
-            if descriptor.get("__typename") == "RepetitionChampDescriptor" and "champDescriptors" in descriptor:
+            if typename == "RepetitionChampDescriptor" and "champDescriptors" in descriptor:
                 has_repetable_blocks = True
-
-                #  NOUVEAU : Créer une entrée par bloc
-                block_label = descriptor.get("label")
-                normalized_block_label = normalize_column_name(block_label)
-                
-                # Colonnes de base pour ce bloc
-                block_columns = [
-                    {"id": "dossier_number", "type": "Int"},
-                    {"id": "block_id", "type": "Text"}, 
-                    {"id": "block_row_index", "type": "Int"},
-                    {"id": "block_row_id", "type": "Text"},
-                ]
-                
-                block_has_carto = False  #  Pour suivre si CE bloc a des champs carto
-                
-                # Traiter les sous-champs du bloc répétable
-                for inner_descriptor in descriptor["champDescriptors"]:
-                    inner_type = inner_descriptor.get("type")
-                    inner_label = inner_descriptor.get("label")
-                    
-                    # Détecter les champs cartographiques
-                    if inner_type == "carte":
-                        has_carto_fields = True
-                        block_has_carto = True
-                    
-                    # Ajouter le champ normalisé à la table des blocs répétables
-                    normalized_label = normalize_column_name(inner_label)
-                    column_type = determine_column_type(inner_type, inner_descriptor.get("__typename"))
-                    
-                    #  GESTION DES DOUBLONS pour ce bloc (utiliser block_columns)
-                    base_label = normalized_label
-                    counter = 1
-                    while any(col["id"] == normalized_label for col in block_columns):
-                        normalized_label = f"{base_label}_{counter}"
-                        counter += 1
-                    
-                    block_columns.append({
-                        "id": normalized_label,
-                        "type": column_type
-                    })
-                
-                #  Ajouter les colonnes géographiques si nécessaire pour CE bloc
-                if block_has_carto:
-                    geo_columns = [
-                        {"id": "geo_id", "type": "Text"},
-                        {"id": "geo_source", "type": "Text"},
-                        {"id": "geo_description", "type": "Text"},
-                        {"id": "geo_type", "type": "Text"},
-                        {"id": "geo_coordinates", "type": "Text"},
-                        {"id": "geo_wkt", "type": "Text"},
-                        {"id": "geo_commune", "type": "Text"},
-                        {"id": "geo_numero", "type": "Text"},
-                        {"id": "geo_section", "type": "Text"},
-                        {"id": "geo_prefixe", "type": "Text"},
-                        {"id": "geo_surface", "type": "Numeric"}
-                    ]
-                    
-                    for geo_col in geo_columns:
-                        if not any(col["id"] == geo_col["id"] for col in block_columns):
-                            block_columns.append(geo_col)
-                
-                #  STOCKER dans le dict avec le label normalisé comme clé
-                repetable_blocks[normalized_block_label] = {
-                    "original_label": block_label,
-                    "columns": block_columns
-                }
+                add_repetable_block(descriptor, champ_label)
             
             # Détecter les champs cartographiques au niveau principal
             elif champ_type == "carte":
@@ -595,16 +654,12 @@ def create_columns_from_schema(demarche_schema, demarche_number=None):
             
             # Ajouter le champ normalisé à la table des champs
             # MAIS PAS pour les PieceJustificativeChamp car déjà traités ci-dessus
-            if descriptor.get("__typename") != "PieceJustificativeChampDescriptor":
-                normalized_label = normalize_column_name(champ_label)
-                column_type = determine_column_type(champ_type, descriptor.get("__typename"))
+            if typename != "PieceJustificativeChampDescriptor":
+                normalized_label = _normalize_label(champ_label)
+                column_type = determine_column_type(champ_type, typename)
                 
                 #  GESTION DES DOUBLONS
-                base_label = normalized_label
-                counter = 1
-                while any(col["id"] == normalized_label for col in champ_columns):
-                    normalized_label = f"{base_label}_{counter}"
-                    counter += 1
+                normalized_label = _unique_column_id(normalized_label, champ_ids)
                 
                 # ✅ FORMAT AVEC FIELDS
                 champ_columns.append({
@@ -616,18 +671,14 @@ def create_columns_from_schema(demarche_schema, demarche_number=None):
                 })
             
             # ✨ Colonnes Commune
-            if descriptor.get("__typename") == "CommuneChampDescriptor":
-                normalized_label = normalize_column_name(champ_label)
+            if typename == "CommuneChampDescriptor":
+                normalized_label = _normalize_label(champ_label)
                 commune_suffixes = ["nom", "code_postal", "departement", "code_insee", "code_departement"]
                 for suffix in commune_suffixes:
                     commune_col_id = f"{normalized_label}_{suffix}"
                     
                     #  GESTION DES DOUBLONS pour colonnes communes
-                    base_col = commune_col_id
-                    counter = 1
-                    while any(col["id"] == commune_col_id for col in champ_columns):
-                        commune_col_id = f"{base_col}_{counter}"
-                        counter += 1
+                    commune_col_id = _unique_column_id(commune_col_id, champ_ids)
                     
                     # ✅ FORMAT AVEC FIELDS
                     champ_columns.append({
@@ -639,18 +690,14 @@ def create_columns_from_schema(demarche_schema, demarche_number=None):
                     })
             
             # ✨ Colonnes Pays (nom et code)
-            if descriptor.get("__typename") == "PaysChampDescriptor":
-                normalized_label = normalize_column_name(champ_label)
+            if typename == "PaysChampDescriptor":
+                normalized_label = _normalize_label(champ_label)
                 pays_suffixes = ["nom", "code"]
                 for suffix in pays_suffixes:
                     pays_col_id = f"{normalized_label}_{suffix}"
                     
                     # Gestion des doublons
-                    base_col = pays_col_id
-                    counter = 1
-                    while any(col["id"] == pays_col_id for col in champ_columns):
-                        pays_col_id = f"{base_col}_{counter}"
-                        counter += 1
+                    pays_col_id = _unique_column_id(pays_col_id, champ_ids)
                     
                     # ✅ FORMAT AVEC FIELDS
                     champ_columns.append({
@@ -662,18 +709,14 @@ def create_columns_from_schema(demarche_schema, demarche_number=None):
                     })
             
             # ✨ Colonnes Région (nom et code)
-            if descriptor.get("__typename") == "RegionChampDescriptor":
-                normalized_label = normalize_column_name(champ_label)
+            if typename == "RegionChampDescriptor":
+                normalized_label = _normalize_label(champ_label)
                 region_suffixes = ["nom", "code"]
                 for suffix in region_suffixes:
                     region_col_id = f"{normalized_label}_{suffix}"
                     
                     # Gestion des doublons
-                    base_col = region_col_id
-                    counter = 1
-                    while any(col["id"] == region_col_id for col in champ_columns):
-                        region_col_id = f"{base_col}_{counter}"
-                        counter += 1
+                    region_col_id = _unique_column_id(region_col_id, champ_ids)
                     
                     # ✅ FORMAT AVEC FIELDS
                     champ_columns.append({
@@ -685,18 +728,14 @@ def create_columns_from_schema(demarche_schema, demarche_number=None):
                     })
 
             # ✨ Colonnes Département (nom et code)
-            if descriptor.get("__typename") == "DepartementChampDescriptor":
-                normalized_label = normalize_column_name(champ_label)
+            if typename == "DepartementChampDescriptor":
+                normalized_label = _normalize_label(champ_label)
                 dept_suffixes = ["nom", "code"]
                 for suffix in dept_suffixes:
                     dept_col_id = f"{normalized_label}_{suffix}"
                     
                     # Gestion des doublons
-                    base_col = dept_col_id
-                    counter = 1
-                    while any(col["id"] == dept_col_id for col in champ_columns):
-                        dept_col_id = f"{base_col}_{counter}"
-                        counter += 1
+                    dept_col_id = _unique_column_id(dept_col_id, champ_ids)
                     
                     # ✅ FORMAT AVEC FIELDS
                     champ_columns.append({
@@ -710,103 +749,32 @@ def create_columns_from_schema(demarche_schema, demarche_number=None):
     # Traiter les descripteurs d'annotations
     if demarche_schema.get("activeRevision") and demarche_schema["activeRevision"].get("annotationDescriptors"):
         for descriptor in demarche_schema["activeRevision"]["annotationDescriptors"]:
-            # Ignorer les types problématiques
-            if descriptor["__typename"] in ["HeaderSectionChampDescriptor", "ExplicationChampDescriptor"] or \
-            descriptor.get("type") in ["header_section", "explication"] or \
-            descriptor.get("id") in problematic_ids:
-                continue
-                
             champ_type = descriptor.get("type")
             champ_label = descriptor.get("label")
+            typename = descriptor.get("__typename")
+            descriptor_id = descriptor.get("id")
+            
+            # Ignorer les types problématiques
+            if is_problematic(typename, champ_type, descriptor_id) or descriptor_id in problematic_ids:
+                continue
             
             # ✅ NOUVEAU : Traitement des blocs répétables dans les annotations
-            if descriptor.get("__typename") == "RepetitionChampDescriptor" and "champDescriptors" in descriptor:
+            if typename == "RepetitionChampDescriptor" and "champDescriptors" in descriptor:
                 has_repetable_blocks = True
-
                 # Préfixe pour les blocs d'annotations
-                block_label = f"annotation_{descriptor.get('label')}"
-                normalized_block_label = normalize_column_name(block_label)
-                
-                # Colonnes de base pour ce bloc
-                block_columns = [
-                    {"id": "dossier_number", "type": "Int"},
-                    {"id": "block_id", "type": "Text"}, 
-                    {"id": "block_row_index", "type": "Int"},
-                    {"id": "block_row_id", "type": "Text"},
-                ]
-                
-                block_has_carto = False
-                
-                # Traiter les sous-champs du bloc répétable
-                for inner_descriptor in descriptor["champDescriptors"]:
-                    inner_type = inner_descriptor.get("type")
-                    inner_label = inner_descriptor.get("label")
-                    
-                    # Détecter les champs cartographiques
-                    if inner_type == "carte":
-                        has_carto_fields = True
-                        block_has_carto = True
-                    
-                    # Ajouter le champ normalisé
-                    normalized_label = normalize_column_name(inner_label)
-                    column_type = determine_column_type(inner_type, inner_descriptor.get("__typename"))
-                    
-                    # Gestion des doublons
-                    base_label = normalized_label
-                    counter = 1
-                    while any(col["id"] == normalized_label for col in block_columns):
-                        normalized_label = f"{base_label}_{counter}"
-                        counter += 1
-                    
-                    block_columns.append({
-                        "id": normalized_label,
-                        "type": column_type
-                    })
-                
-                # Ajouter les colonnes géographiques si nécessaire
-                if block_has_carto:
-                    geo_columns = [
-                        {"id": "geo_id", "type": "Text"},
-                        {"id": "geo_source", "type": "Text"},
-                        {"id": "geo_description", "type": "Text"},
-                        {"id": "geo_type", "type": "Text"},
-                        {"id": "geo_coordinates", "type": "Text"},
-                        {"id": "geo_wkt", "type": "Text"},
-                        {"id": "geo_commune", "type": "Text"},
-                        {"id": "geo_numero", "type": "Text"},
-                        {"id": "geo_section", "type": "Text"},
-                        {"id": "geo_prefixe", "type": "Text"},
-                        {"id": "geo_surface", "type": "Numeric"}
-                    ]
-                    
-                    for geo_col in geo_columns:
-                        if not any(col["id"] == geo_col["id"] for col in block_columns):
-                            block_columns.append(geo_col)
-                
-                # Stocker dans le dict avec le label normalisé comme clé
-                repetable_blocks[normalized_block_label] = {
-                    "original_label": block_label,
-                    "columns": block_columns
-                }
+                add_repetable_block(descriptor, f"annotation_{champ_label}")
                 continue  # Passer au descripteur suivant
             
             # Pour les annotations simples (non répétables)
             # Pour les annotations, enlever le préfixe "annotation_" pour le nom de colonne
-            if champ_label.startswith("annotation_"):
-                annotation_label = normalize_column_name(champ_label[11:])  # enlever "annotation_"
-                display_label = champ_label[11:]  # Label sans préfixe pour affichage
-            else:
-                annotation_label = normalize_column_name(champ_label)
-                display_label = champ_label
+            # et pour l'affichage (un label absent reste tel quel)
+            display_label = champ_label.removeprefix("annotation_") if champ_label else champ_label
+            annotation_label = _normalize_label(display_label)
             
-            column_type = determine_column_type(champ_type, descriptor.get("__typename"))
+            column_type = determine_column_type(champ_type, typename)
             
             #  GESTION DES DOUBLONS pour annotations
-            base_label = annotation_label
-            counter = 1
-            while any(col["id"] == annotation_label for col in annotation_columns):
-                annotation_label = f"{base_label}_{counter}"
-                counter += 1
+            annotation_label = _unique_column_id(annotation_label, annotation_ids)
             
             # ✅ FORMAT AVEC FIELDS
             annotation_columns.append({
@@ -817,6 +785,10 @@ def create_columns_from_schema(demarche_schema, demarche_number=None):
                 }
             })
 
+    if not ids_from_metadata:
+        problematic_ids = frozenset(found_problematic_ids)
+        log(f"Identificateurs de {len(problematic_ids)} descripteurs problématiques à filtrer")
+
     # Préparer le résultat
     result = {
         "dossier": dossier_columns,
@@ -826,11 +798,53 @@ def create_columns_from_schema(demarche_schema, demarche_number=None):
         "has_carto_fields": has_carto_fields
     }
     
+    # Type de demandeur récupéré dans la même requête que le schéma
+    if demarche_schema.get("dossiers") is not None:
+        result["demandeur_type"] = demandeur_type_from_dossiers(
+            demarche_schema["dossiers"].get("nodes", []), demarche_number
+        )
+    
     if has_repetable_blocks:
         result["repetable_blocks"] = repetable_blocks  #  NOUVEAU : dict au lieu d'une liste
     
     return result, problematic_ids
 
+# Colonnes installées par table Grist, relevées à la création, à la lecture et à l'ajout :
+# {(base_url, doc_id, table_id): (horodatage, ids)}. Évite le GET /columns de chaque table
+# aux mises à jour suivantes ; relu depuis l'API après GRIST_COLUMNS_CACHE_TTL secondes.
+GRIST_COLUMNS_CACHE_TTL = float(os.getenv("GRIST_COLUMNS_CACHE_TTL", "300"))
+_installed_columns: Dict[Tuple[str, str, str], Tuple[float, Set[str]]] = {}
+_installed_columns_lock = threading.Lock()
+
+def _get_installed_columns(client, table_id: str) -> Optional[Set[str]]:
+    """
+    Retourne une copie des IDs de colonnes connus pour la table, ou None si absents/expirés.
+    """
+    with _installed_columns_lock:
+        cached = _installed_columns.get((client.base_url, client.doc_id, table_id))
+        if cached and time.time() - cached[0] < GRIST_COLUMNS_CACHE_TTL:
+            return set(cached[1])
+    return None
+
+def _record_installed_columns(client, table_id: str, column_ids, replace: bool = True) -> None:
+    """
+    Mémorise les colonnes d'une table (replace) ou complète l'entrée existante.
+    """
+    key = (client.base_url, client.doc_id, table_id)
+    with _installed_columns_lock:
+        cached = _installed_columns.get(key)
+        if cached and not replace:
+            cached[1].update(column_ids)
+        elif replace:
+            _installed_columns[key] = (time.time(), set(column_ids))
+
+def clear_installed_columns_cache() -> None:
+    """
+    Vide le cache des colonnes installées (ex : après une modification manuelle dans Grist).
+    """
+    with _installed_columns_lock:
+        _installed_columns.clear()
+
 def update_grist_tables_from_schema(client, demarche_number, column_types, problematic_ids=None):
     """
     Met à jour les tables Grist existantes en fonction du schéma actuel de la démarche,
@@ -870,6 +884,9 @@ def update_grist_tables_from_schema(client, demarche_number, column_types, probl
         champ_table = None
         annotation_table = None
         
+        # Index des tables par ID en minuscules (recherches des blocs et demandeurs en O(1))
+        tables_by_lower_id = {table.get('id', '').lower(): table for table in tables}
+        
         for table in tables:
             table_id = table.get('id', '').lower()
             if table_id == dossier_table_id.lower():
@@ -885,25 +902,39 @@ def update_grist_tables_from_schema(client, demarche_number, column_types, probl
                 annotation_table_id = table.get('id')
                 log(f"Table annotations existante trouvée avec l'ID {annotation_table_id}")
         
+        # Session du client Grist (pool de connexions), sinon session partagée
+        session = getattr(client, "session", None) or get_session_with_retries()
+
+        # Création de table : les colonnes fournies sont mémorisées (pas de GET /columns ensuite)
+        def create_table(table_id, columns):
+            table_result = client.create_table(table_id, columns)
+            _record_installed_columns(client, table_result['tables'][0].get('id'), [col["id"] for col in columns])
+            return table_result
+
         # Fonction pour ajouter les colonnes manquantes à une table
         def add_missing_columns(table_id, all_columns):
+            """Retourne False si Grist a refusé la lecture ou l'ajout des colonnes"""
             if not table_id:
-                return
+                return True
                 
-            # Récupérer les colonnes existantes
             url = f"{client.base_url}/docs/{client.doc_id}/tables/{table_id}/columns"
-            response = requests.get(url, headers=client.headers)
             
-            if response.status_code != 200:
-                log_error(f"Erreur lors de la récupération des colonnes: {response.status_code}")
-                return
+            # Colonnes existantes : connues depuis une création/lecture récente, sinon lues dans Grist
+            existing_columns = _get_installed_columns(client, table_id)
+            if existing_columns is None:
+                response = session.get(url, headers=client.headers, timeout=HTTP_TIMEOUT)
                 
-            columns_data = response.json()
-            existing_columns = set()
-            
-            if "columns" in columns_data:
-                for col in columns_data["columns"]:
-                    existing_columns.add(col.get("id"))
+                if not response.ok:
+                    log_error(f"Erreur lors de la récupération des colonnes: {response.status_code}")
+                    return False
+                    
+                columns_data = parse_json_response(response)
+                existing_columns = set()
+                
+                if "columns" in columns_data:
+                    for col in columns_data["columns"]:
+                        existing_columns.add(col.get("id"))
+                _record_installed_columns(client, table_id, existing_columns)
             
             # Trouver les colonnes manquantes
             missing_columns = []
@@ -915,55 +946,59 @@ def update_grist_tables_from_schema(client, demarche_number, column_types, probl
             if missing_columns:
                 log(f"Ajout de {len(missing_columns)} colonnes manquantes à la table {table_id}")
                 add_payload = {"columns": missing_columns}
-                add_response = requests.post(url, headers=client.headers, json=add_payload)
+                add_response = session.post(url, headers=client.headers, json=add_payload, timeout=HTTP_TIMEOUT)
                 
-                if add_response.status_code == 200:
+                if add_response.ok:
+                    _record_installed_columns(client, table_id, [col["id"] for col in missing_columns], replace=False)
                     log(f"Colonnes ajoutées avec succès")
                 else:
                     log_error(f"Erreur lors de l'ajout des colonnes: {add_response.status_code}")
+                    return False
+            return True
+
+        # Mises à jour de colonnes (table_id, colonnes) exécutées ensemble à la fin :
+        # chaque table a son propre endpoint, les appels sont donc indépendants
+        column_updates = []
         
         # Créer ou mettre à jour la table des dossiers
         if not dossier_table:
             log(f"Création de la table {dossier_table_id}")
-            dossier_table_result = client.create_table(dossier_table_id, column_types["dossier"])
+            dossier_table_result = create_table(dossier_table_id, column_types["dossier"])
             dossier_table = dossier_table_result['tables'][0]
             dossier_table_id = dossier_table.get('id')
         else:
-            add_missing_columns(dossier_table_id, column_types["dossier"])
+            column_updates.append((dossier_table_id, column_types["dossier"]))
         
         # Créer ou mettre à jour la table des champs
         if not champ_table:
             log(f"Création de la table {champ_table_id}")
-            base_columns = [
-                {"id": "dossier_number", "type": "Int"},
-                {"id": "champ_id", "type": "Text"}
-            ]
-            champ_table_result = client.create_table(champ_table_id, base_columns)
+            base_columns = _column_dicts(CHAMP_BASE_COLUMNS)
+            champ_table_result = create_table(champ_table_id, base_columns)
             champ_table = champ_table_result['tables'][0]
             champ_table_id = champ_table.get('id')
             
             # Ajouter toutes les colonnes spécifiques
-            add_missing_columns(champ_table_id, column_types["champs"])
+            column_updates.append((champ_table_id, column_types["champs"]))
         else:
-            add_missing_columns(champ_table_id, column_types["champs"])
+            column_updates.append((champ_table_id, column_types["champs"]))
         
         # Créer ou mettre à jour la table des annotations
         if not annotation_table:
             # ✅ NOUVELLE CONDITION : Ne créer que s'il y a des annotations
             if len(column_types["annotations"]) > 1:  # > 1 car il y a toujours dossier_number
                 log(f"Création de la table {annotation_table_id}")
-                base_columns = [{"id": "dossier_number", "type": "Int"}]
-                annotation_table_result = client.create_table(annotation_table_id, base_columns)
+                base_columns = _column_dicts(ANNOTATION_BASE_COLUMNS)
+                annotation_table_result = create_table(annotation_table_id, base_columns)
                 annotation_table = annotation_table_result['tables'][0]
                 annotation_table_id = annotation_table.get('id')
                 
                 # Ajouter toutes les colonnes spécifiques
-                add_missing_columns(annotation_table_id, column_types["annotations"])
+                column_updates.append((annotation_table_id, column_types["annotations"]))
             else:
                 log(f"Aucune annotation - table {annotation_table_id} non créée")
                 annotation_table_id = None
         else:
-            add_missing_columns(annotation_table_id, column_types["annotations"])
+            column_updates.append((annotation_table_id, column_types["annotations"]))
         
         #  NOUVEAU : Créer ou mettre à jour les tables des blocs répétables (une par bloc)
         repetable_table_ids = {}
@@ -972,21 +1007,18 @@ def update_grist_tables_from_schema(client, demarche_number, column_types, probl
                 table_id = f"Demarche_{demarche_number}_repetable_{block_key}"
                 
                 # Chercher si la table existe déjà
-                existing_table = None
-                for table in tables:
-                    if table.get('id', '').lower() == table_id.lower():
-                        existing_table = table
-                        table_id = table.get('id')
-                        log(f"Table répétable '{block_info['original_label']}' existante trouvée: {table_id}")
-                        break
+                existing_table = tables_by_lower_id.get(table_id.lower())
+                if existing_table:
+                    table_id = existing_table.get('id')
+                    log(f"Table répétable '{block_info['original_label']}' existante trouvée: {table_id}")
                 
                 if not existing_table:
                     log(f"Création de la table {table_id} pour le bloc '{block_info['original_label']}'")
-                    table_result = client.create_table(table_id, block_info["columns"])
+                    table_result = create_table(table_id, block_info["columns"])
                     table_id = table_result['tables'][0].get('id')
                 else:
                     # Ajouter les colonnes manquantes
-                    add_missing_columns(table_id, block_info["columns"])
+                    column_updates.append((table_id, block_info["columns"]))
 
                 repetable_table_ids[block_key] = table_id
         
@@ -995,27 +1027,27 @@ def update_grist_tables_from_schema(client, demarche_number, column_types, probl
         demandeurs_table_id = f"Demarche_{demarche_number}_demandeurs"
         
         # Détecter le type et créer les colonnes
-        demandeurs_columns, demandeur_type = create_demandeurs_columns(demarche_number)
+        demandeurs_columns, demandeur_type = create_demandeurs_columns(
+            demarche_number,
+            demandeur_type=column_types.get("demandeur_type") if column_types else None
+        )
         log(f"Type de demandeur: {demandeur_type} - {len(demandeurs_columns)} colonnes")
         
         # Chercher si la table existe
-        demandeurs_table = None
-        for table in tables:
-            if table.get('id', '').lower() == demandeurs_table_id.lower():
-                demandeurs_table = table
-                demandeurs_table_id = table.get('id')
-                log(f"Table demandeurs existante trouvée: {demandeurs_table_id}")
-                break
+        demandeurs_table = tables_by_lower_id.get(demandeurs_table_id.lower())
+        if demandeurs_table:
+            demandeurs_table_id = demandeurs_table.get('id')
+            log(f"Table demandeurs existante trouvée: {demandeurs_table_id}")
         
         # Créer ou mettre à jour
         if not demandeurs_table:
             log(f"Création de la table {demandeurs_table_id} (type: {demandeur_type})")
-            demandeurs_table_result = client.create_table(demandeurs_table_id, demandeurs_columns)
+            demandeurs_table_result = create_table(demandeurs_table_id, demandeurs_columns)
             demandeurs_table = demandeurs_table_result['tables'][0]
             demandeurs_table_id = demandeurs_table.get('id')
         else:
             log(f"Mise à jour des colonnes de la table demandeurs")
-            add_missing_columns(demandeurs_table_id, demandeurs_columns)
+            column_updates.append((demandeurs_table_id, demandeurs_columns))
 
         # Créer/mettre à jour la table instructeurs
         log(f"Création/mise à jour de la table instructeurs...")
@@ -1025,13 +1057,13 @@ def update_grist_tables_from_schema(client, demarche_number, column_types, probl
         if not instructeurs_table:
             log(f"Création de la table {instructeurs_table_id}")
             instructeurs_columns = create_instructeurs_columns()
-            instructeurs_table_result = client.create_table(instructeurs_table_id, instructeurs_columns)
+            instructeurs_table_result = create_table(instructeurs_table_id, instructeurs_columns)
             instructeurs_table = instructeurs_table_result['tables'][0]
             instructeurs_table_id = instructeurs_table.get('id')
         else:
             log(f"Mise à jour des colonnes de la table instructeurs")
             instructeurs_columns = create_instructeurs_columns()
-            add_missing_columns(instructeurs_table_id, instructeurs_columns)
+            column_updates.append((instructeurs_table_id, instructeurs_columns))
 
         # Retourner les IDs des tables
         result = {
@@ -1062,19 +1094,34 @@ def update_grist_tables_from_schema(client, demarche_number, column_types, probl
             {"id": "last_sync_duration", "type": "Numeric"},
         ]
         
-        # Recharger la liste des tables pour inclure celles créées pendant cette exécution
+        # Liste des tables incluant celles créées pendant cette exécution
+        # (GristClient.list_tables : cache par document tenu à jour par create_table)
         fresh_tables = client.list_tables()
         if isinstance(fresh_tables, dict) and 'tables' in fresh_tables:
             fresh_tables = fresh_tables['tables']
         sync_table = next((t for t in fresh_tables if t.get('id') == sync_metadata_table_id), None)
         if not sync_table:
             log(f"Création de la table {sync_metadata_table_id}")
-            client.create_table(sync_metadata_table_id, sync_metadata_columns)
+            create_table(sync_metadata_table_id, sync_metadata_columns)
         else:
-            add_missing_columns(sync_metadata_table_id, sync_metadata_columns)
+            column_updates.append((sync_metadata_table_id, sync_metadata_columns))
 
         result["sync_metadata"] = sync_metadata_table_id
 
+        # Ajouter les colonnes manquantes des différentes tables en parallèle
+        if column_updates:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+                futures = {
+                    executor.submit(contextvars.copy_context().run, add_missing_columns, table_id, columns): table_id
+                    for table_id, columns in column_updates
+                }
+                failed_tables = [
+                    futures[future] for future in concurrent.futures.as_completed(futures)
+                    if not future.result()
+                ]
+            if failed_tables:
+                log_error(f"Colonnes non mises à jour pour les tables: {', '.join(sorted(failed_tables))}")
+
         log(f"Mise à jour des tables terminée avec succès")
         return result
         
@@ -1086,7 +1133,7 @@ def update_grist_tables_from_schema(client, demarche_number, column_types, probl
 # FONCTIONS OPTIMISÉES (Version robuste)
 # ========================================
 
-def get_demarche_schema_robust(demarche_number: int) -> Dict[str, Any]:
+def get_demarche_schema_robust(demarche_number: int, api_token: str = None, api_url: str = None) -> Dict[str, Any]:
     """
     Version robuste et optimisée de get_demarche_schema.
     
@@ -1098,13 +1145,15 @@ def get_demarche_schema_robust(demarche_number: int) -> Dict[str, Any]:
     
     Args:
         demarche_number: Numéro de la démarche
+        api_token: Token explicite de la démarche (sinon configuration courante)
+        api_url: URL explicite de l'API (sinon configuration courante)
         
     Returns:
         dict: Schéma robuste avec métadonnées
     """
     try:
         # Utiliser la fonction de base
-        demarche = get_demarche_schema(demarche_number)
+        demarche = get_demarche_schema(demarche_number, api_token=api_token, api_url=api_url)
         
         active_revision = demarche.get("activeRevision")
         if not active_revision:
@@ -1149,8 +1198,8 @@ def auto_clean_schema_descriptors(demarche: Dict[str, Any]) -> Dict[str, Any]:
             descriptor_type = descriptor.get("type", "")
             
             # Filtrer les types problématiques (SANS piece_justificative)
-            if typename in ["HeaderSectionChampDescriptor", "ExplicationChampDescriptor"] or \
-               descriptor_type in ["header_section", "explication"]:
+            if typename in PROBLEMATIC_TYPENAMES or \
+               descriptor_type in PROBLEMATIC_TYPES:
                 problematic_count += 1
                 continue
             
@@ -1189,15 +1238,236 @@ def auto_clean_schema_descriptors(demarche: Dict[str, Any]) -> Dict[str, Any]:
     
     return cleaned_demarche
 
-def get_demarche_schema_enhanced(demarche_number: int, prefer_robust: bool = True):
+def get_demarche_schema_enhanced(demarche_number: int, prefer_robust: bool = True, api_token: str = None, api_url: str = None):
     """
     Point d'entrée principal pour obtenir le schéma avec choix de version.
+    api_token / api_url permettent de passer explicitement la configuration de la démarche.
     """
     if prefer_robust:
         try:
-            return get_demarche_schema_robust(demarche_number)
+            return get_demarche_schema_robust(demarche_number, api_token=api_token, api_url=api_url)
         except Exception as e:
             print(f"Fallback vers version classique suite à: {e}")
-            return get_demarche_schema(demarche_number)
+            return get_demarche_schema(demarche_number, api_token=api_token, api_url=api_url)
     else:
-        return get_demarche_schema(demarche_number)
\ No newline at end of file
+        return get_demarche_schema(demarche_number, api_token=api_token, api_url=api_url)
+
+# ========================================
+# CACHE PERSISTANT DES SCHÉMAS
+# ========================================
+
+# Durée de validité d'un schéma en cache (secondes), surchargeable par l'environnement
+SCHEMA_CACHE_TTL = int(os.getenv("SCHEMA_CACHE_TTL", "3600"))
+# Fraction du TTL au-delà de laquelle le schéma est rafraîchi en arrière-plan
+SCHEMA_CACHE_REFRESH_RATIO = 0.8
+
+# Fichier JSON dans un répertoire de cache propre à l'utilisateur (droits 0700) :
+# jamais de désérialisation d'un fichier déposé par un tiers dans un /tmp partagé
+_schema_cache_path = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "dger" / "schema_cache.json"
+_schema_cache: Dict[Tuple[int, str], Dict[str, Any]] = {}
+_schema_cache_lock = threading.Lock()
+_schema_cache_mtime = None  # mtime du fichier lu/écrit en dernier par ce processus
+_schema_refreshing: Set[Tuple[int, str]] = set()
+# Un verrou par clé : des workers qui manquent le cache en même temps ne
+# déclenchent qu'une seule requête GraphQL ("single-flight")
+_schema_fetch_locks: Dict[Tuple[int, str], threading.Lock] = {}
+
+
+def _token_fingerprint(api_token: Optional[str]) -> str:
+    """Empreinte courte du token : le token lui-même n'est jamais écrit sur disque."""
+    return hashlib.blake2s((api_token or "").encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _make_cache_entry(schema: Dict[str, Any], timestamp: float, ttl: float) -> Dict[str, Any]:
+    """
+    Construit une entrée de cache. L'heure murale (timestamp) sert à l'affichage
+    et à la persistance ; les échéances sont en temps monotone, précalculées.
+    """
+    remaining = ttl - (time.time() - timestamp)
+    now = time.monotonic()
+    return {
+        "schema": schema,
+        "timestamp": timestamp,
+        "ttl": ttl,
+        "expires_at": now + remaining,
+        "refresh_at": now + remaining - (1 - SCHEMA_CACHE_REFRESH_RATIO) * ttl,
+        "version": schema.get("metadata", {}).get("revision_id"),
+    }
+
+
+def _load_persisted_schema_cache() -> None:
+    """
+    (Re)charge le cache disque s'il a été modifié depuis la dernière lecture ou
+    écriture de ce processus : une mise à jour faite par un autre processus est
+    ainsi prise en compte (erreurs ignorées).
+    """
+    global _schema_cache_mtime
+    try:
+        mtime = os.stat(_schema_cache_path).st_mtime_ns
+    except FileNotFoundError:
+        return
+    if mtime == _schema_cache_mtime:
+        return
+    _schema_cache_mtime = mtime
+    try:
+        with open(_schema_cache_path, "rb") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            _schema_cache.clear()
+            # Les échéances monotones d'un autre processus n'ont pas de sens : les recalculer
+            for entry in data:
+                schema = entry["schema"]
+                metadata = schema.get("metadata")
+                if metadata and "problematic_ids" in metadata:
+                    metadata["problematic_ids"] = frozenset(metadata["problematic_ids"])
+                cache_key = (int(entry["demarche_number"]), entry["token"])
+                _schema_cache[cache_key] = _make_cache_entry(
+                    schema, entry["timestamp"], entry.get("ttl", SCHEMA_CACHE_TTL)
+                )
+    except Exception as e:
+        print(f"Cache de schémas illisible, ignoré: {e}")
+
+
+def _json_default(value):
+    """Sérialise les ensembles (IDs problématiques des métadonnées) en listes triées."""
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+def _persist_schema_cache() -> None:
+    """
+    Écrit le cache sur disque de façon atomique (fichier temporaire + os.replace),
+    dans un répertoire en 0700 et un fichier en 0600.
+    """
+    global _schema_cache_mtime
+    tmp_path = _schema_cache_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    entries = [
+        {"demarche_number": demarche_number, "token": token,
+         "schema": entry["schema"], "timestamp": entry["timestamp"], "ttl": entry["ttl"]}
+        for (demarche_number, token), entry in _schema_cache.items()
+    ]
+    try:
+        _schema_cache_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        os.chmod(_schema_cache_path.parent, 0o700)
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, default=_json_default)
+        os.replace(tmp_path, _schema_cache_path)
+        _schema_cache_mtime = os.stat(_schema_cache_path).st_mtime_ns
+    except Exception as e:
+        print(f"Impossible d'écrire le cache de schémas: {e}")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def _fetch_and_cache_schema(demarche_number: int, api_token: str, api_url: str,
+                            cache_key: Tuple[int, str], ttl: float) -> Dict[str, Any]:
+    """Récupère le schéma depuis l'API et met à jour le cache (mémoire + disque)."""
+    schema = get_demarche_schema_enhanced(demarche_number, prefer_robust=True, api_token=api_token, api_url=api_url)
+    with _schema_cache_lock:
+        previous = _schema_cache.get(cache_key)
+        if previous is not None and previous.get("version") != schema.get("metadata", {}).get("revision_id"):
+            changes = detect_schema_changes(previous["schema"], schema)
+            print(f"Nouvelle révision du schéma {demarche_number}: "
+                  f"{len(changes['added'])} champ(s) ajouté(s), {len(changes['removed'])} supprimé(s)")
+        _schema_cache[cache_key] = _make_cache_entry(schema, time.time(), ttl)
+        _persist_schema_cache()
+    return schema
+
+
+def detect_schema_changes(old_schema: Dict[str, Any], new_schema: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Compare les descripteurs (champs et annotations) de deux schémas.
+    
+    Returns:
+        dict: {"added": [labels], "removed": [labels]}
+    """
+    def descriptors(schema):
+        revision = schema.get("activeRevision") or {}
+        return {
+            descriptor.get("id"): descriptor.get("label", "")
+            for key in ("champDescriptors", "annotationDescriptors")
+            for descriptor in revision.get(key) or []
+        }
+    
+    old_descriptors = descriptors(old_schema)
+    new_descriptors = descriptors(new_schema)
+    return {
+        "added": [new_descriptors[d] for d in new_descriptors.keys() - old_descriptors.keys()],
+        "removed": [old_descriptors[d] for d in old_descriptors.keys() - new_descriptors.keys()],
+    }
+
+
+def _refresh_schema(demarche_number: int, api_token: str, api_url: str,
+                    cache_key: Tuple[int, str], ttl: float) -> None:
+    """Rafraîchissement en arrière-plan d'une entrée proche de l'expiration."""
+    try:
+        _fetch_and_cache_schema(demarche_number, api_token, api_url, cache_key, ttl)
+    except Exception as e:
+        print(f"Rafraîchissement du schéma {demarche_number} échoué: {e}")
+    finally:
+        with _schema_cache_lock:
+            _schema_refreshing.discard(cache_key)
+
+
+def get_demarche_schema_cached(demarche_number: int, api_token: str = None, api_url: str = None,
+                               ttl: int = SCHEMA_CACHE_TTL) -> Dict[str, Any]:
+    """
+    Schéma de la démarche avec cache persistant entre les exécutions.
+
+    Les entrées sont indexées par (numéro de démarche, empreinte du token). Une
+    entrée valide est renvoyée sans requête GraphQL ; au-delà de 80 % du TTL,
+    elle est renvoyée immédiatement et rafraîchie dans un thread d'arrière-plan.
+    """
+    api_token, api_url = get_api_config(api_token, api_url)
+    cache_key = (int(demarche_number), _token_fingerprint(api_token))
+
+    with _schema_cache_lock:
+        _load_persisted_schema_cache()
+        entry = _schema_cache.get(cache_key)
+        now = time.monotonic()
+        valid = entry is not None and now < entry["expires_at"]
+        refresh = valid and now >= entry["refresh_at"] and cache_key not in _schema_refreshing
+        if refresh:
+            _schema_refreshing.add(cache_key)
+
+    if valid:
+        print(f"Schéma de la démarche {demarche_number} servi depuis le cache ({int(time.time() - entry['timestamp'])}s)")
+        if refresh:
+            threading.Thread(
+                target=_refresh_schema,
+                args=(demarche_number, api_token, api_url, cache_key, ttl),
+                daemon=True,
+            ).start()
+        # Copie : les appelants enrichissent parfois le schéma reçu
+        return copy.deepcopy(entry["schema"])
+
+    with _schema_cache_lock:
+        fetch_lock = _schema_fetch_locks.setdefault(cache_key, threading.Lock())
+    with fetch_lock:
+        # Un autre thread a pu remplir le cache pendant l'attente du verrou
+        with _schema_cache_lock:
+            entry = _schema_cache.get(cache_key)
+            fresh = entry is not None and time.monotonic() < entry["expires_at"]
+        if fresh:
+            return copy.deepcopy(entry["schema"])
+        return copy.deepcopy(_fetch_and_cache_schema(demarche_number, api_token, api_url, cache_key, ttl))
+
+
+def clear_schema_cache() -> None:
+    """
+    Vide entièrement le cache des schémas (mémoire et fichier disque).
+    """
+    global _schema_cache_mtime
+    with _schema_cache_lock:
+        _schema_cache.clear()
+        _schema_cache_mtime = None
+        try:
+            os.remove(_schema_cache_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Impossible de supprimer le cache de schémas: {e}")